@@ -1,13 +1,22 @@
 #!/bin/sh
 set -e
 
+# Com um comando (ex.: `python manage.py run_worker`), o container executa só ele:
+# é assim que o serviço de worker usa a mesma imagem do backend
+if [ "$#" -gt 0 ]; then
+    exec "$@"
+fi
+
+# Falha o deploy em configurações que quebrariam em produção (ex.: fila de jobs sem worker)
+python manage.py check --deploy --fail-level ERROR
+
 python manage.py migrate --noinput
+python manage.py criar_particoes
+python manage.py createcachetable
 python manage.py collectstatic --noinput
 
 # Garantir que existe um admin (rodar sempre, é idempotente)
 python manage.py ensure_admin
 
-exec gunicorn reserveaqui.wsgi:application \
-  --bind 0.0.0.0:8000 \
-  --workers 3 \
-  --timeout 120
+# Modo dos workers, quantidade de workers/threads, reciclagem e preload: gunicorn.conf.py
+exec gunicorn -c gunicorn.conf.py
@@ -0,0 +1,95 @@
+"""
+Configuração do gunicorn (carregada automaticamente do diretório de trabalho).
+
+GUNICORN_WORKER_CLASS escolhe o modo:
+
+- gthread (padrão): workers WSGI com threads; as threads cobrem a espera de
+  I/O. Núcleos + 1 workers com GUNICORN_THREADS threads cada.
+- uvicorn: workers ASGI; as views assíncronas esperam o banco sem ocupar o
+  worker e as síncronas rodam em threads. Um worker por núcleo.
+- sync: workers WSGI de uma requisição por vez (comportamento antigo).
+  2 x núcleos + 1 workers.
+
+Os núcleos respeitam a cota de CPU do cgroup; workers e threads podem ser
+fixados por GUNICORN_WORKERS e GUNICORN_THREADS.
+Para comparar os modos com a carga real use `python manage.py teste_carga`.
+"""
+
+import math
+import os
+
+import decouple
+
+MODOS = {
+    'sync': ('sync', 'reserveaqui.wsgi:application'),
+    'gthread': ('gthread', 'reserveaqui.wsgi:application'),
+    'uvicorn': ('uvicorn_worker.UvicornWorker', 'reserveaqui.asgi:application'),
+}
+
+
+def _cota_cgroup():
+    """Núcleos da cota de CPU do cgroup (v2: cpu.max; v1: cfs_quota/cfs_period) ou None sem limite"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as arquivo:
+            cota, periodo = arquivo.read().split()[:2]
+    except (OSError, ValueError):
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as arquivo:
+                cota = arquivo.read().strip()
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as arquivo:
+                periodo = arquivo.read().strip()
+        except OSError:
+            return None
+    if cota == 'max' or int(cota) <= 0 or int(periodo) <= 0:
+        return None
+    return max(1, math.ceil(int(cota) / int(periodo)))
+
+
+def nucleos():
+    """
+    Núcleos disponíveis para o processo: afinidade de CPU limitada pela cota do
+    cgroup (num container os dois primeiros mostram as CPUs do host)
+    """
+    try:
+        disponiveis = len(os.sched_getaffinity(0))
+    except AttributeError:
+        disponiveis = os.cpu_count() or 1
+    cota = _cota_cgroup()
+    return min(disponiveis, cota) if cota else disponiveis
+
+
+modo = decouple.config('GUNICORN_WORKER_CLASS', default='gthread').lower()
+if modo not in MODOS:
+    raise ValueError(f'GUNICORN_WORKER_CLASS inválido: {modo} (use {", ".join(MODOS)})')
+worker_class, wsgi_app = MODOS[modo]
+
+_workers_padrao = {
+    'sync': 2 * nucleos() + 1,
+    'gthread': nucleos() + 1,
+    'uvicorn': nucleos(),
+}[modo]
+workers = decouple.config('GUNICORN_WORKERS', default=_workers_padrao, cast=int)
+# Só o gthread usa threads por worker (no sync, threads > 1 viraria gthread); com pool
+# de conexões, POSTGRES_POOL_MAX_SIZE deve ser pelo menos o número de threads
+threads = decouple.config('GUNICORN_THREADS', default=4, cast=int) if modo == 'gthread' else 1
+
+bind = decouple.config('GUNICORN_BIND', default='0.0.0.0:8000')
+timeout = decouple.config('GUNICORN_TIMEOUT', default=120, cast=int)
+graceful_timeout = decouple.config('GUNICORN_GRACEFUL_TIMEOUT', default=30, cast=int)
+keepalive = decouple.config('GUNICORN_KEEPALIVE', default=5, cast=int)
+
+# Recicla cada worker após N requisições (contra crescimento de memória); o jitter
+# evita que todos os workers reiniciem ao mesmo tempo
+max_requests = decouple.config('GUNICORN_MAX_REQUESTS', default=1000, cast=int)
+max_requests_jitter = decouple.config('GUNICORN_MAX_REQUESTS_JITTER', default=100, cast=int)
+
+# Carrega a aplicação no processo mestre antes do fork: os workers compartilham a
+# memória do código importado (copy-on-write) e sobem mais rápido
+preload_app = decouple.config('GUNICORN_PRELOAD', default=True, cast=bool)
+
+
+def post_fork(server, worker):
+    """Conexões abertas no mestre durante o preload não podem ser compartilhadas entre workers"""
+    if preload_app:
+        from django.db import connections
+        connections.close_all()
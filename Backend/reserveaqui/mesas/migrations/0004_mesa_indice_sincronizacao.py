@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-19 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mesas', '0003_alter_mesa_status'),
+        ('restaurantes', '0004_horarios_estruturados'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mesa',
+            index=models.Index(fields=['restaurante', 'data_atualizacao'], name='mesas_mesa_restaur_4ddec3_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
-from restaurantes.models import Restaurante
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from restaurantes.models import Restaurante, NAMESPACE_RESTAURANTES_PUBLICOS
 
 
 class Mesa(models.Model):
@@ -40,6 +42,10 @@ class Mesa(models.Model):
         verbose_name_plural = "Mesas"
         unique_together = ('restaurante', 'numero')
         ordering = ['numero']
+        indexes = [
+            # Sincronização incremental (GET /api/reservas/mudancas/)
+            models.Index(fields=['restaurante', 'data_atualizacao']),
+        ]
     
     def __str__(self):
         return f"Mesa {self.numero} - {self.restaurante.nome} ({self.get_status_display()})"
@@ -52,3 +58,12 @@ class Mesa(models.Model):
     def pode_reservar(self):
         """Verifica se mesa pode ser reservada"""
         return self.status == 'disponivel' and self.ativa
+
+
+@receiver([post_save, post_delete], sender=Mesa)
+def invalidar_cache_mesas(sender, instance, **kwargs):
+    """Signal para descartar a disponibilidade e a listagem pública em cache quando uma mesa muda"""
+    from reservas.alocacao import invalidar_disponibilidade
+    from utils.cache import invalidar
+    invalidar_disponibilidade(instance.restaurante_id)
+    invalidar(NAMESPACE_RESTAURANTES_PUBLICOS)
@@ -8,7 +8,155 @@ from datetime import datetime, timedelta, timezone as dt_timezone
 from .models import Mesa
 from .serializers import MesaSerializer, MesaListSerializer
 from .permissions import IsAdminForWriteOrReadOnly, IsAdminOrProprietarioRestaurante, IsFuncionarioOrHigher
-from restaurantes.models import RestauranteUsuario
+from restaurantes.models import Restaurante, RestauranteUsuario
+from utils.assincrono import exigir_usuario, requisicao_drf, resposta_json, view_assincrona
+
+
+ERRO_RESTAURANTE_FECHADO = "O restaurante não está aberto neste horário."
+
+
+def ler_consulta_disponibilidade(dados):
+    """
+    Valida o corpo de verificar_disponibilidade (views síncrona e assíncrona).
+    Retorna (consulta, None) ou (None, mensagem de erro).
+    """
+    restaurante_id = dados.get('restaurante')
+    data_str = dados.get('data_reserva')
+    horario_str = dados.get('horario')
+    
+    # Validações
+    if not restaurante_id:
+        return None, "O campo 'restaurante' é obrigatório."
+    
+    if not data_str:
+        return None, "O campo 'data_reserva' é obrigatório (formato: YYYY-MM-DD)."
+    
+    if not horario_str:
+        return None, "O campo 'horario' é obrigatório (formato: HH:MM)."
+    
+    try:
+        # Aceitar ambos os formatos: YYYY-MM-DD e DD/MM/YYYY
+        try:
+            data_reserva = datetime.strptime(data_str, '%Y-%m-%d').date()
+        except ValueError:
+            data_reserva = datetime.strptime(data_str, '%d/%m/%Y').date()
+        
+        horario_reserva = datetime.strptime(horario_str, '%H:%M').time()
+    except ValueError:
+        return None, "Formato de data ou horário inválido. Use YYYY-MM-DD ou DD/MM/YYYY para data e HH:MM para horário."
+    
+    # Verificar se a data/horário é no futuro (mínimo 2 horas)
+    data_hora_reserva = datetime.combine(data_reserva, horario_reserva, tzinfo=dt_timezone.utc)
+    tempo_minimo = timezone.now() + timedelta(minutes=120)
+    
+    if data_hora_reserva < tempo_minimo:
+        return None, "A reserva deve ser no mínimo 2 horas no futuro."
+    
+    try:
+        restaurante_chave = int(restaurante_id)
+    except (TypeError, ValueError):
+        return None, "O campo 'restaurante' deve ser o ID numérico do restaurante."
+    try:
+        pessoas_chave = int(dados.get('quantidade_pessoas'))
+    except (TypeError, ValueError):
+        pessoas_chave = None
+    
+    return {
+        'restaurante_id': restaurante_id,
+        'data_str': data_str,
+        'horario_str': horario_str,
+        'data_reserva': data_reserva,
+        'horario_reserva': horario_reserva,
+        'quantidade_pessoas': dados.get('quantidade_pessoas'),
+        # Chave normalizada das consultas idênticas (coalescencia_disponibilidade)
+        'chave': (restaurante_chave, data_reserva, horario_reserva, pessoas_chave),
+    }, None
+
+
+def disponibilidade_do_horario(consulta):
+    """
+    Parte de verificar_disponibilidade que não depende do usuário, calculada uma vez
+    para consultas idênticas simultâneas: None se o restaurante está fechado no
+    horário; senão as mesas livres (serializadas) e os bloqueios do dia.
+    """
+    from restaurantes.horarios import esta_aberto, grade_do_restaurante
+    from reservas.alocacao import mesas_livres_em_cache
+    from reservas.bloqueios import bloqueios_do_dia
+    
+    restaurante_id, data_reserva, horario, _ = consulta['chave']
+    
+    # Horário de funcionamento: a grade do restaurante fica em cache, então horários
+    # fechados são recusados sem consultar a ocupação
+    restaurante = Restaurante.objects.filter(id=restaurante_id).first()
+    if restaurante and not esta_aberto(grade_do_restaurante(restaurante), data_reserva, horario):
+        return None
+    
+    # Mesas livres (sem reservas pendentes/confirmadas em ±1h), pelo mapa de ocupação
+    # do dia em uma única consulta, guardadas no cache da aplicação até a próxima
+    # alocação no restaurante
+    return {
+        'mesas': list(MesaSerializer(mesas_livres_em_cache(restaurante_id, data_reserva, horario), many=True).data),
+        'bloqueios': bloqueios_do_dia(restaurante_id, data_reserva),
+    }
+
+
+async def adisponibilidade_do_horario(consulta):
+    """Versão assíncrona de `disponibilidade_do_horario` (ORM assíncrono)"""
+    from restaurantes.horarios import agrade_do_restaurante, esta_aberto
+    from reservas.alocacao import amesas_livres_em_cache
+    from reservas.bloqueios import abloqueios_do_dia
+    
+    restaurante_id, data_reserva, horario, _ = consulta['chave']
+    
+    restaurante = await Restaurante.objects.filter(id=restaurante_id).afirst()
+    if restaurante and not esta_aberto(await agrade_do_restaurante(restaurante), data_reserva, horario):
+        return None
+    
+    return {
+        'mesas': list(MesaSerializer(
+            await amesas_livres_em_cache(restaurante_id, data_reserva, horario), many=True
+        ).data),
+        'bloqueios': await abloqueios_do_dia(restaurante_id, data_reserva),
+    }
+
+
+def resultado_disponibilidade(consulta, disponibilidade, usuario_id):
+    """
+    Corpo da resposta de verificar_disponibilidade a partir da parte compartilhada.
+    Mesas bloqueadas por outros clientes em checkout contam como ocupadas; as do
+    próprio usuário, não.
+    """
+    from reservas.alocacao import calcular_mesas_necessarias
+    from reservas.bloqueios import mesas_em_conflito
+    
+    bloqueadas = mesas_em_conflito(
+        disponibilidade['bloqueios'], consulta['data_reserva'], consulta['horario_reserva'],
+        ignorar_usuario_id=usuario_id
+    )
+    mesas_disponiveis = [mesa for mesa in disponibilidade['mesas'] if mesa['id'] not in bloqueadas]
+    
+    # Se quantidade_pessoas foi informada, calcular quantas mesas são necessárias
+    info_adicional = {}
+    if consulta['quantidade_pessoas']:
+        try:
+            qtd_pessoas = int(consulta['quantidade_pessoas'])
+            mesas_necessarias = calcular_mesas_necessarias(qtd_pessoas)
+            info_adicional = {
+                "quantidade_pessoas": qtd_pessoas,
+                "mesas_necessarias": mesas_necessarias,
+                "mesas_disponiveis_suficientes": len(mesas_disponiveis) >= mesas_necessarias
+            }
+        except ValueError:
+            pass
+    
+    return {
+        "restaurante": consulta['restaurante_id'],
+        "data_reserva": consulta['data_str'],
+        "horario": consulta['horario_str'],
+        "total_mesas_disponiveis": len(mesas_disponiveis),
+        **info_adicional,
+        "mesas": mesas_disponiveis
+    }
 
 
 class MesaViewSet(viewsets.ModelViewSet):
@@ -123,109 +271,146 @@ class MesaViewSet(viewsets.ModelViewSet):
         Retorna mesas disponíveis que não possuem reservas confirmadas
         no horário especificado.
         """
-        restaurante_id = request.data.get('restaurante')
-        data_str = request.data.get('data_reserva')
-        horario_str = request.data.get('horario')
-        quantidade_pessoas = request.data.get('quantidade_pessoas')
+        consulta, erro = ler_consulta_disponibilidade(request.data)
+        if erro:
+            return Response({"error": erro}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Consultas idênticas simultâneas (mesmo restaurante, data, horário e pessoas)
+        # compartilham um único cálculo, reaproveitado por um micro-TTL
+        from reservas.alocacao import coalescencia_disponibilidade
+        disponibilidade = coalescencia_disponibilidade.executar(
+            consulta['chave'], lambda: disponibilidade_do_horario(consulta)
+        )
+        if disponibilidade is None:
+            return Response({"error": ERRO_RESTAURANTE_FECHADO}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Validações
-        if not restaurante_id:
-            return Response(
-                {"error": "O campo 'restaurante' é obrigatório."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        return Response(resultado_disponibilidade(consulta, disponibilidade, request.user.id))
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def segurar(self, request):
+        """
+        Bloqueia temporariamente as mesas para uma reserva em andamento (checkout).
+        Enquanto o bloqueio vale, as mesas contam como ocupadas para os demais clientes.
         
-        if not data_str:
-            return Response(
-                {"error": "O campo 'data_reserva' é obrigatório (formato: YYYY-MM-DD)."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        Body:
+        - restaurante, data_reserva, horario, quantidade_pessoas (mesmas regras da reserva)
         
-        if not horario_str:
-            return Response(
-                {"error": "O campo 'horario' é obrigatório (formato: HH:MM)."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        Retorna o token do bloqueio, que deve ser enviado no campo 'bloqueio'
+        do POST /api/reservas/ para usar as mesas bloqueadas.
+        """
+        from reservas.alocacao import MesasInsuficientes, segurar_mesas
+        from reservas.serializers import BloqueioMesasSerializer
+        from reservas.sugestoes import erro_com_sugestoes
+        
+        serializer = BloqueioMesasSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        dados = serializer.validated_data
         
         try:
-            # Aceitar ambos os formatos: YYYY-MM-DD e DD/MM/YYYY
-            try:
-                data_reserva = datetime.strptime(data_str, '%Y-%m-%d').date()
-            except ValueError:
-                data_reserva = datetime.strptime(data_str, '%d/%m/%Y').date()
-            
-            horario_reserva = datetime.strptime(horario_str, '%H:%M').time()
-        except ValueError:
-            return Response(
-                {"error": "Formato de data ou horário inválido. Use YYYY-MM-DD ou DD/MM/YYYY para data e HH:MM para horário."},
-                status=status.HTTP_400_BAD_REQUEST
+            bloqueio, mesas = segurar_mesas(
+                dados['restaurante'].id,
+                dados['data_reserva'],
+                dados['horario'],
+                dados['quantidade_pessoas'],
+                request.user.id
             )
+        except MesasInsuficientes as erro:
+            return Response(erro_com_sugestoes(erro, request.user.id), status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'message': 'Mesas reservadas temporariamente. Conclua a reserva antes do prazo.',
+            'bloqueio': bloqueio['token'],
+            'expira_em': bloqueio['expira_em'],
+            'mesas': [{'id': mesa.id, 'numero': mesa.numero, 'capacidade': mesa.capacidade} for mesa in mesas]
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def capacidade(self, request):
+        """
+        Capacidade do restaurante no dia, para o widget de reserva.
+        Uma única leitura da ocupação responde a todos os tamanhos de grupo.
+        
+        Body:
+        - restaurante, data_reserva
+        - horario (opcional): retorna mesas livres e o maior grupo que cabe nesse horário
+        - granularidade_minutos (opcional): passo da curva do dia (padrão: 15)
+        
+        Retorna total_mesas, os dados do horário informado e a curva
+        (mesas_disponiveis e capacidade_maxima em cada horário reservável do dia).
+        """
+        from reservas.capacidade import OcupacaoDoDia
+        from reservas.serializers import CapacidadeConsultaSerializer, CapacidadeHorarioSerializer
         
-        # Verificar se a data/horário é no futuro (mínimo 2 horas)
-        data_hora_reserva = datetime.combine(data_reserva, horario_reserva, tzinfo=dt_timezone.utc)
-        tempo_minimo = timezone.now() + timedelta(minutes=120)
+        serializer = CapacidadeConsultaSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        dados = serializer.validated_data
+        
+        restaurante = Restaurante.objects.filter(id=dados['restaurante'], ativo=True).first()
+        if restaurante is None:
+            return Response(
+                {"error": "Restaurante não encontrado ou inativo."},
+                status=status.HTTP_404_NOT_FOUND
+            )
         
-        if data_hora_reserva < tempo_minimo:
+        ocupacao = OcupacaoDoDia(restaurante, dados['data_reserva'], usuario_id=request.user.id)
+        if dados.get('horario') and not ocupacao.esta_aberto(dados['horario']):
             return Response(
-                {"error": "A reserva deve ser no mínimo 2 horas no futuro."},
+                {"error": "O restaurante não está aberto neste horário."},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        resposta = {
+            "restaurante": dados['restaurante'],
+            "data_reserva": dados['data_reserva'],
+            "total_mesas": ocupacao.total_mesas,
+        }
+        if dados.get('horario'):
+            resposta.update(CapacidadeHorarioSerializer(ocupacao.capacidade(dados['horario'])).data)
+        resposta["curva"] = CapacidadeHorarioSerializer(
+            ocupacao.curva(dados['granularidade_minutos']), many=True
+        ).data
+        
+        return Response(resposta)
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def sugestoes(self, request):
+        """
+        Horários viáveis mais próximos do pedido, no mesmo dia e nos seguintes.
         
-        # Buscar mesas do restaurante que estão disponíveis
-        mesas_disponiveis = Mesa.objects.filter(
-            restaurante_id=restaurante_id,
-            status='disponivel',
-            ativa=True
-        )
+        Body:
+        - restaurante, data_reserva, horario, quantidade_pessoas
+        - quantidade (opcional): quantos horários sugerir (padrão: SUGESTOES_QUANTIDADE)
+        - horizonte_dias (opcional): dias após a data pedida (padrão: SUGESTOES_HORIZONTE_DIAS)
+        - granularidade_minutos (opcional): passo entre horários (padrão: SUGESTOES_GRANULARIDADE_MINUTOS)
+        """
+        from reservas.serializers import SugestaoHorariosSerializer, SugestaoHorarioSerializer
+        from reservas.sugestoes import sugerir_horarios
         
-        # Importar Reserva para verificar conflitos
-        from reservas.models import Reserva, ReservaMesa
+        serializer = SugestaoHorariosSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        dados = serializer.validated_data
         
-        # Buscar reservas confirmadas ou pendentes para essa data/horário
-        # Considera um intervalo de 2 horas (1h antes e 1h depois)
-        horario_inicio = (datetime.combine(data_reserva, horario_reserva) - timedelta(hours=1)).time()
-        horario_fim = (datetime.combine(data_reserva, horario_reserva) + timedelta(hours=1)).time()
+        restaurante = Restaurante.objects.filter(id=dados['restaurante'], ativo=True).first()
+        if restaurante is None:
+            return Response(
+                {"error": "Restaurante não encontrado ou inativo."},
+                status=status.HTTP_404_NOT_FOUND
+            )
         
-        reservas_ativas = Reserva.objects.filter(
-            restaurante_id=restaurante_id,
-            data_reserva=data_reserva,
-            horario__gte=horario_inicio,
-            horario__lte=horario_fim,
-            status__in=['pendente', 'confirmada']
+        sugestoes = sugerir_horarios(
+            restaurante,
+            dados['data_reserva'],
+            dados['horario'],
+            dados['quantidade_pessoas'],
+            usuario_id=request.user.id,
+            quantidade=dados.get('quantidade'),
+            horizonte_dias=dados.get('horizonte_dias'),
+            granularidade_minutos=dados.get('granularidade_minutos'),
         )
         
-        # IDs das mesas ocupadas nessas reservas
-        mesas_ocupadas_ids = ReservaMesa.objects.filter(
-            reserva__in=reservas_ativas
-        ).values_list('mesa_id', flat=True)
-        
-        # Excluir mesas ocupadas
-        mesas_disponiveis = mesas_disponiveis.exclude(id__in=mesas_ocupadas_ids)
-        
-        # Se quantidade_pessoas foi informada, calcular quantas mesas são necessárias
-        info_adicional = {}
-        if quantidade_pessoas:
-            try:
-                qtd_pessoas = int(quantidade_pessoas)
-                import math
-                mesas_necessarias = math.ceil(qtd_pessoas / 4)
-                info_adicional = {
-                    "quantidade_pessoas": qtd_pessoas,
-                    "mesas_necessarias": mesas_necessarias,
-                    "mesas_disponiveis_suficientes": mesas_disponiveis.count() >= mesas_necessarias
-                }
-            except ValueError:
-                pass
-        
-        serializer = MesaSerializer(mesas_disponiveis, many=True)
-        
         return Response({
-            "restaurante": restaurante_id,
-            "data_reserva": data_str,
-            "horario": horario_str,
-            "total_mesas_disponiveis": mesas_disponiveis.count(),
-            **info_adicional,
-            "mesas": serializer.data
+            "restaurante": dados['restaurante'],
+            "quantidade_pessoas": dados['quantidade_pessoas'],
+            "sugestoes": SugestaoHorarioSerializer(sugestoes, many=True).data
         })
     
     @action(detail=True, methods=['patch'])
@@ -322,3 +507,27 @@ class MesaViewSet(viewsets.ModelViewSet):
         
         serializer = self.get_serializer(mesa)
         return Response(serializer.data)
+
+
+@view_assincrona(
+    MesaViewSet.as_view({'post': 'verificar_disponibilidade'}, basename='mesa', detail=False),
+    metodos=('POST',),
+)
+async def verificar_disponibilidade_assincrona(request):
+    """
+    POST /api/mesas/verificar_disponibilidade/ com o ORM assíncrono (ASGI).
+    Mesmas regras e resposta de MesaViewSet.verificar_disponibilidade.
+    """
+    from reservas.alocacao import coalescencia_disponibilidade
+
+    usuario = await exigir_usuario(request)
+    consulta, erro = ler_consulta_disponibilidade(requisicao_drf(request).data)
+    if erro:
+        return resposta_json({"error": erro}, status=status.HTTP_400_BAD_REQUEST)
+
+    disponibilidade = await coalescencia_disponibilidade.aexecutar(
+        consulta['chave'], lambda: adisponibilidade_do_horario(consulta)
+    )
+    if disponibilidade is None:
+        return resposta_json({"error": ERRO_RESTAURANTE_FECHADO}, status=status.HTTP_400_BAD_REQUEST)
+    return resposta_json(resultado_disponibilidade(consulta, disponibilidade, usuario.id))
@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import Reserva, ReservaMesa, Notificacao
+from .models import (
+    Reserva, ReservaMesa, Notificacao, RelatorioAssincrono, ListaEspera,
+    ArquivoReservasDia, ArquivoReservasHorario
+)
+from .alocacao import liberar_ocupacao
 
 
 class ReservaMesaInline(admin.TabularInline):
@@ -80,6 +84,23 @@ class ReservaAdmin(admin.ModelAdmin):
             return f"{obj.calcular_mesas_necessarias()} mesa(s)"
         return "-"
     calcular_mesas_necessarias.short_description = "Mesas Necessárias"
+    
+    def save_related(self, request, form, formsets, change):
+        """Atualiza o mapa de ocupação após editar a reserva e as mesas vinculadas"""
+        super().save_related(request, form, formsets, change)
+        dias = [(form.instance.restaurante_id, form.instance.data_reserva)]
+        if change:
+            dias += [(form.initial['restaurante'], form.initial['data_reserva'])]
+        liberar_ocupacao(dias)
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        liberar_ocupacao([(obj.restaurante_id, obj.data_reserva)])
+    
+    def delete_queryset(self, request, queryset):
+        dias = list(queryset.values_list('restaurante_id', 'data_reserva').distinct())
+        super().delete_queryset(request, queryset)
+        liberar_ocupacao(dias)
 
 
 @admin.register(ReservaMesa)
@@ -104,6 +125,27 @@ class ReservaMesaAdmin(admin.ModelAdmin):
     ]
     
     readonly_fields = ['data_vinculacao']
+    
+    @staticmethod
+    def _dia(reserva_id):
+        return tuple(Reserva.objects.filter(id=reserva_id).values_list('restaurante_id', 'data_reserva')[0])
+    
+    def save_model(self, request, obj, form, change):
+        """Recalcula o mapa de ocupação do dia da reserva (e do dia da anterior, se trocada)"""
+        dias = [self._dia(obj.reserva_id)]
+        if change and 'reserva' in form.changed_data:
+            dias.append(self._dia(form.initial['reserva']))
+        super().save_model(request, obj, form, change)
+        liberar_ocupacao(dias)
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        liberar_ocupacao([(obj.reserva.restaurante_id, obj.reserva.data_reserva)])
+    
+    def delete_queryset(self, request, queryset):
+        dias = list(queryset.values_list('reserva__restaurante_id', 'reserva__data_reserva').distinct())
+        super().delete_queryset(request, queryset)
+        liberar_ocupacao(dias)
 
 @admin.register(Notificacao)
 class NotificacaoAdmin(admin.ModelAdmin):
@@ -162,4 +204,103 @@ class NotificacaoAdmin(admin.ModelAdmin):
         for notificacao in queryset:
             notificacao.marcar_como_lida()
         self.message_user(request, f'{count} notificação(ões) marcada(s) como lida(s).')
-    marcar_como_lidas.short_description = "Marcar selecionadas como lidas"
\ No newline at end of file
+    marcar_como_lidas.short_description = "Marcar selecionadas como lidas"
+
+
+@admin.register(RelatorioAssincrono)
+class RelatorioAssincronoAdmin(admin.ModelAdmin):
+    """Admin para o modelo RelatorioAssincrono"""
+    
+    list_display = [
+        'id',
+        'usuario',
+        'tipo',
+        'status',
+        'progresso',
+        'data_criacao',
+        'data_conclusao'
+    ]
+    
+    list_filter = [
+        'tipo',
+        'status',
+        'data_criacao'
+    ]
+    
+    search_fields = [
+        'usuario__email'
+    ]
+    
+    readonly_fields = [
+        'data_criacao',
+        'data_conclusao',
+        'resultado'
+    ]
+
+
+@admin.register(ListaEspera)
+class ListaEsperaAdmin(admin.ModelAdmin):
+    """Admin para o modelo ListaEspera"""
+    
+    list_display = [
+        'id',
+        'nome_cliente',
+        'restaurante',
+        'data_reserva',
+        'horario_inicio',
+        'horario_fim',
+        'quantidade_pessoas',
+        'status',
+        'data_criacao'
+    ]
+    
+    list_filter = [
+        'status',
+        'data_reserva',
+        'restaurante'
+    ]
+    
+    search_fields = [
+        'nome_cliente',
+        'telefone_cliente',
+        'usuario__email'
+    ]
+    
+    readonly_fields = [
+        'reserva',
+        'data_criacao',
+        'data_atualizacao'
+    ]
+
+
+@admin.register(ArquivoReservasDia)
+class ArquivoReservasDiaAdmin(admin.ModelAdmin):
+    """Admin (somente leitura) dos dias arquivados"""
+    
+    list_display = ['data', 'restaurante', 'reservas_arquivadas', 'mesas_ocupadas', 'data_arquivamento']
+    list_filter = ['restaurante']
+    date_hierarchy = 'data'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArquivoReservasHorario)
+class ArquivoReservasHorarioAdmin(admin.ModelAdmin):
+    """Admin (somente leitura) dos totais arquivados por horário"""
+    
+    list_display = [
+        'data', 'horario', 'restaurante', 'reservas_concluidas', 'reservas_canceladas',
+        'pessoas_concluidas', 'pessoas_canceladas'
+    ]
+    list_filter = ['restaurante']
+    date_hierarchy = 'data'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,293 @@
+"""
+Alocação de mesas para reservas.
+
+Concentra a regra de disponibilidade (mesas ativas e disponíveis do restaurante
+que não estejam vinculadas a reservas pendentes/confirmadas na janela de ±1h)
+e a criação da reserva com suas mesas em uma transação:
+
+1. trava a linha do restaurante (serializa alocações concorrentes no mesmo restaurante);
+2. busca as mesas com o mapa de ocupação do dia (reservas.ocupacao) em uma única
+   consulta e descarta as ocupadas no horário e as bloqueadas temporariamente;
+3. insere a reserva e os vínculos ReservaMesa com bulk_create e marca o horário
+   no mapa de ocupação das mesas alocadas.
+
+Uma reserva criada a partir de um bloqueio (`segurar_mesas`) usa as mesas
+bloqueadas sem recalcular a disponibilidade.
+"""
+
+import math
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from rest_framework import serializers
+
+from mesas.models import Mesa
+from restaurantes.models import Restaurante
+from utils.cache import em_cache, invalidar
+from utils.coalescencia import Coalescedor
+from .bloqueios import liberar_bloqueio, mesas_bloqueadas, obter_bloqueio, registrar_bloqueio
+from .models import Reserva, ReservaMesa
+
+STATUS_ATIVOS = ['pendente', 'confirmada']
+PESSOAS_POR_MESA = 4
+JANELA_CONFLITO = timedelta(hours=1)
+
+
+class MesasInsuficientes(serializers.ValidationError):
+    """Não há mesas livres suficientes no horário (guarda o pedido para sugerir outros horários)"""
+
+    def __init__(self, restaurante_id, data_reserva, horario, quantidade_pessoas, disponiveis):
+        self.restaurante_id = restaurante_id
+        self.data_reserva = data_reserva
+        self.horario = horario
+        self.quantidade_pessoas = quantidade_pessoas
+        necessarias = calcular_mesas_necessarias(quantidade_pessoas)
+        super().__init__(
+            f'Não há mesas suficientes disponíveis. '
+            f'Necessárias: {necessarias}, Disponíveis: {disponiveis}'
+        )
+
+
+def calcular_mesas_necessarias(quantidade_pessoas):
+    """Quantidade de mesas de 4 lugares necessárias para o grupo"""
+    return math.ceil(quantidade_pessoas / PESSOAS_POR_MESA)
+
+
+def janela_conflito(data_reserva, horario):
+    """Intervalo de horários (início, fim) que conflita com uma reserva no horário informado"""
+    data_hora = datetime.combine(data_reserva, horario)
+    return (data_hora - JANELA_CONFLITO).time(), (data_hora + JANELA_CONFLITO).time()
+
+
+def _consulta_mesas_livres(restaurante_id, data_reserva):
+    from .ocupacao import anotar_ocupacao
+
+    return anotar_ocupacao(
+        Mesa.objects.filter(
+            restaurante_id=restaurante_id, ativa=True, status='disponivel'
+        ).select_related('restaurante'),
+        data_reserva,
+    ).order_by('numero')
+
+
+def mesas_livres(restaurante_id, data_reserva, horario):
+    """
+    Mesas livres no horário, ordenadas por número.
+    Executa uma única consulta (mesas com o mapa de ocupação do dia); cada mesa
+    retornada traz `slots_dia`, usado por `ocupar` ao alocá-la.
+    """
+    from .ocupacao import de_bytes, mascara
+
+    bits_horario = mascara(horario)
+    mesas = _consulta_mesas_livres(restaurante_id, data_reserva)
+    return [mesa for mesa in mesas if not de_bytes(mesa.slots_dia) & bits_horario]
+
+
+async def amesas_livres(restaurante_id, data_reserva, horario):
+    """Versão assíncrona de `mesas_livres` (ORM assíncrono, views ASGI)"""
+    from .ocupacao import de_bytes, mascara
+
+    bits_horario = mascara(horario)
+    return [
+        mesa async for mesa in _consulta_mesas_livres(restaurante_id, data_reserva)
+        if not de_bytes(mesa.slots_dia) & bits_horario
+    ]
+
+
+def namespace_disponibilidade(restaurante_id, *args):
+    return f'disponibilidade:{restaurante_id}'
+
+
+# Consultas de disponibilidade (verificar_disponibilidade) pelo cache da aplicação.
+# A alocação continua usando `mesas_livres`, lido com o restaurante travado.
+mesas_livres_em_cache = em_cache(namespace_disponibilidade)(mesas_livres)
+amesas_livres_em_cache = em_cache(namespace_disponibilidade)(amesas_livres)
+
+
+# Consultas idênticas simultâneas de verificar_disponibilidade (mesas.views), pela chave
+# (restaurante, data, horário, pessoas) normalizada
+coalescencia_disponibilidade = Coalescedor()
+
+
+def invalidar_disponibilidade(restaurante_id, data_reserva=None):
+    """
+    Descarta a disponibilidade em cache do restaurante e as consultas coalescidas do
+    dia (ou de todos os dias, sem `data_reserva`) quando o mapa de ocupação ou as
+    mesas mudam; o painel do restaurante também mostra ambos. Repete a invalidação
+    após o commit, para descartar valores lidos por outras requisições antes de a
+    transação terminar.
+    """
+    from restaurantes.painel import namespace_painel
+
+    def descartar():
+        invalidar(namespace_disponibilidade(restaurante_id))
+        invalidar(namespace_painel(restaurante_id))
+        if data_reserva is None:
+            coalescencia_disponibilidade.invalidar(int(restaurante_id))
+        else:
+            coalescencia_disponibilidade.invalidar(int(restaurante_id), data_reserva)
+
+    descartar()
+    transaction.on_commit(descartar)
+
+
+def selecionar_mesas(restaurante_id, data_reserva, horario, quantidade_pessoas, usuario_id=None):
+    """
+    Retorna as mesas que serão alocadas para a reserva.
+    Mesas bloqueadas contam como ocupadas, exceto as do bloqueio de `usuario_id`
+    (usado ao renovar o próprio bloqueio).
+    Lança MesasInsuficientes se não houver mesas suficientes.
+    """
+    necessarias = calcular_mesas_necessarias(quantidade_pessoas)
+    bloqueadas = mesas_bloqueadas(restaurante_id, data_reserva, horario, ignorar_usuario_id=usuario_id)
+    mesas = [
+        mesa for mesa in mesas_livres(restaurante_id, data_reserva, horario)
+        if mesa.id not in bloqueadas
+    ][:necessarias]
+
+    if len(mesas) < necessarias:
+        raise MesasInsuficientes(restaurante_id, data_reserva, horario, quantidade_pessoas, len(mesas))
+
+    return mesas
+
+
+def travar_restaurante(restaurante_id):
+    """Trava a linha do restaurante até o fim da transação corrente"""
+    list(Restaurante.objects.select_for_update().filter(id=restaurante_id).values_list('id', flat=True))
+
+
+def _vincular_mesas(reserva, mesas):
+    vinculos = ReservaMesa.objects.bulk_create(
+        [ReservaMesa(reserva=reserva, mesa=mesa) for mesa in mesas]
+    )
+    # Evita que a serialização da resposta consulte os vínculos recém-criados
+    reserva._prefetched_objects_cache = getattr(reserva, '_prefetched_objects_cache', {})
+    reserva._prefetched_objects_cache['reservamesa_set'] = vinculos
+    return vinculos
+
+
+def _mesas_do_bloqueio(token, dados):
+    """
+    Mesas de um bloqueio válido para os dados da reserva (ou None).
+    O bloqueio precisa ser do mesmo usuário, restaurante, data e horário e
+    ter mesas suficientes para a quantidade de pessoas.
+    """
+    bloqueio = obter_bloqueio(token)
+    usuario = dados.get('usuario')
+    necessarias = calcular_mesas_necessarias(dados['quantidade_pessoas'])
+
+    compativel = bloqueio and (
+        bloqueio['usuario_id'] == (usuario.id if usuario else None)
+        and bloqueio['restaurante_id'] == dados['restaurante'].id
+        and bloqueio['data_reserva'] == dados['data_reserva']
+        and bloqueio['horario'] == dados['horario']
+        and len(bloqueio['mesas']) >= necessarias
+    )
+    if not compativel:
+        return None, None
+
+    from .ocupacao import anotar_ocupacao
+
+    mesas = list(
+        anotar_ocupacao(Mesa.objects.filter(id__in=bloqueio['mesas']), dados['data_reserva'])
+        .order_by('numero')[:necessarias]
+    )
+    return bloqueio, mesas
+
+
+def criar_reserva(dados, bloqueio=None):
+    """
+    Cria a reserva com as mesas alocadas em uma única transação.
+    `dados` deve vir de um serializer já validado (a validação do modelo não é repetida).
+    Com o token de um bloqueio válido, as mesas bloqueadas são usadas e o bloqueio é consumido;
+    caso contrário (expirado, de outro usuário ou incompatível), as mesas são alocadas normalmente.
+    """
+    from .ocupacao import ocupar
+
+    restaurante = dados['restaurante']
+
+    with transaction.atomic():
+        travar_restaurante(restaurante.id)
+
+        registro, mesas = _mesas_do_bloqueio(bloqueio, dados) if bloqueio else (None, None)
+        if registro is None:
+            mesas = selecionar_mesas(
+                restaurante.id, dados['data_reserva'], dados['horario'], dados['quantidade_pessoas']
+            )
+
+        reserva = Reserva(**dados)
+        reserva.save(skip_validation=True)
+        _vincular_mesas(reserva, mesas)
+        ocupar(restaurante.id, dados['data_reserva'], dados['horario'], mesas)
+
+        if registro:
+            liberar_bloqueio(registro)
+
+    return reserva
+
+
+def segurar_mesas(restaurante_id, data_reserva, horario, quantidade_pessoas, usuario_id):
+    """
+    Bloqueia temporariamente as mesas que seriam alocadas para a reserva.
+    Substitui bloqueios anteriores do usuário no mesmo restaurante/dia
+    (as mesas desses bloqueios podem ser bloqueadas de novo).
+    """
+    with transaction.atomic():
+        travar_restaurante(restaurante_id)
+        mesas = selecionar_mesas(
+            restaurante_id, data_reserva, horario, quantidade_pessoas, usuario_id=usuario_id
+        )
+        bloqueio = registrar_bloqueio(
+            restaurante_id, data_reserva, horario, [mesa.id for mesa in mesas], usuario_id
+        )
+
+    return bloqueio, mesas
+
+
+def realocar_mesas(reserva, alteracoes):
+    """
+    Aplica as alterações validadas (data, horário, quantidade de pessoas...) e
+    substitui as mesas da reserva pelas mesas livres no novo horário.
+    Tudo acontece em uma transação com os restaurantes travados: os vínculos atuais
+    são removidos antes da busca (a reserva não conflita consigo mesma) e a reserva
+    é salva antes de ocupar o novo horário, para que um recálculo do mapa nunca a
+    veja com as mesas novas e a data/horário antigos. As alterações já vêm validadas
+    pelo serializer (como em `criar_reserva`, o save não repete o full_clean). Se não
+    houver mesas suficientes ou a gravação falhar, a transação desfaz a remoção.
+    """
+    from .ocupacao import ocupar, recalcular
+
+    restaurante = alteracoes.get('restaurante', reserva.restaurante)
+    data_reserva = alteracoes.get('data_reserva', reserva.data_reserva)
+    horario = alteracoes.get('horario', reserva.horario)
+    quantidade_pessoas = alteracoes.get('quantidade_pessoas', reserva.quantidade_pessoas)
+
+    with transaction.atomic():
+        for restaurante_id in sorted({restaurante.id, reserva.restaurante_id}):
+            travar_restaurante(restaurante_id)
+
+        ReservaMesa.objects.filter(reserva=reserva).delete()
+        recalcular(reserva.restaurante_id, reserva.data_reserva)
+
+        mesas = selecionar_mesas(restaurante.id, data_reserva, horario, quantidade_pessoas)
+        for campo, valor in alteracoes.items():
+            setattr(reserva, campo, valor)
+        reserva.save(skip_validation=True)
+        _vincular_mesas(reserva, mesas)
+        ocupar(restaurante.id, data_reserva, horario, mesas)
+
+    return mesas
+
+
+def liberar_ocupacao(dias):
+    """
+    Atualiza o mapa de ocupação depois que mesas foram liberadas (cancelamento,
+    conclusão ou exclusão de reservas). `dias` é um iterável de (restaurante_id, data);
+    os restaurantes são travados em ordem para não perder alocações concorrentes.
+    """
+    from .ocupacao import recalcular
+
+    with transaction.atomic():
+        for restaurante_id, data_reserva in sorted(set(dias)):
+            travar_restaurante(restaurante_id)
+            recalcular(restaurante_id, data_reserva)
@@ -0,0 +1,147 @@
+"""
+Arquivo frio das reservas históricas.
+
+Reservas concluídas e canceladas de meses atrás só servem aos relatórios, mas
+continuam ocupando Reserva, ReservaMesa, Notificacao e OcupacaoMesaDia (e os
+índices usados pela disponibilidade). O arquivamento trabalha por dia inteiro
+de um restaurante: quando todas as reservas do dia são finais (concluída ou
+cancelada) e anteriores ao corte, o dia é resumido em
+
+- ArquivoReservasDia: mesas distintas ocupadas no dia;
+- ArquivoReservasHorario: reservas e pessoas concluídas/canceladas por horário;
+
+e as linhas originais são removidas. Arquivar o dia inteiro mantém os totais
+exatos (inclusive a contagem de mesas distintas, que não é somável), e os
+relatórios (reservas/reports.py) somam o arquivo às reservas vivas.
+
+O comando `arquivar_reservas` processa os dias em lotes, uma transação por lote.
+"""
+
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Sum
+
+from .models import (
+    ArquivoReservasDia,
+    ArquivoReservasHorario,
+    ListaEspera,
+    Notificacao,
+    OcupacaoMesaDia,
+    Reserva,
+    ReservaMesa,
+)
+
+STATUS_FINAIS = ('concluida', 'cancelada')
+
+
+def data_de_corte(meses, hoje):
+    """Primeiro dia do mês `meses` meses antes do mês de `hoje`"""
+    total = hoje.year * 12 + hoje.month - 1 - meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def dias_arquivaveis(corte, limite=None):
+    """
+    (restaurante_id, data) anteriores ao corte cujas reservas são todas finais
+    e que ainda não foram arquivados, em ordem de data.
+    """
+    dias = (
+        Reserva.objects.filter(data_reserva__lt=corte)
+        .values('restaurante_id', 'data_reserva')
+        .annotate(nao_finais=Count('id', filter=~Q(status__in=STATUS_FINAIS)))
+        .filter(nao_finais=0)
+        .exclude(Exists(ArquivoReservasDia.objects.filter(
+            restaurante_id=OuterRef('restaurante_id'), data=OuterRef('data_reserva')
+        )))
+        .order_by('data_reserva', 'restaurante_id')
+        .values_list('restaurante_id', 'data_reserva')
+    )
+    return list(dias[:limite] if limite else dias)
+
+
+def arquivar_dias(dias):
+    """
+    Resume e remove as reservas dos dias informados (lista de (restaurante_id, data)).
+    Retorna quantas reservas foram arquivadas.
+    """
+    if not dias:
+        return 0
+    selecionados = set(dias)
+    periodo = (min(data for _, data in dias), max(data for _, data in dias))
+
+    with transaction.atomic():
+        reservas = [
+            (reserva_id, restaurante_id, data)
+            for reserva_id, restaurante_id, data in Reserva.objects.select_for_update().filter(
+                data_reserva__range=periodo, status__in=STATUS_FINAIS
+            ).values_list('id', 'restaurante_id', 'data_reserva')
+            if (restaurante_id, data) in selecionados
+        ]
+        ids = [reserva_id for reserva_id, _, _ in reservas]
+
+        # Totais por horário (uma agregação para o lote)
+        horarios = defaultdict(ArquivoReservasHorario)
+        for restaurante_id, data, horario, status, quantidade, pessoas in (
+            Reserva.objects.filter(id__in=ids)
+            .values('restaurante_id', 'data_reserva', 'horario', 'status')
+            .annotate(quantidade=Count('id'), pessoas=Sum('quantidade_pessoas'))
+            .values_list('restaurante_id', 'data_reserva', 'horario', 'status', 'quantidade', 'pessoas')
+        ):
+            resumo = horarios[(restaurante_id, data, horario)]
+            resumo.restaurante_id, resumo.data, resumo.horario = restaurante_id, data, horario
+            if status == 'concluida':
+                resumo.reservas_concluidas, resumo.pessoas_concluidas = quantidade, pessoas
+            else:
+                resumo.reservas_canceladas, resumo.pessoas_canceladas = quantidade, pessoas
+
+        # Mesas distintas usadas no dia (apenas reservas concluídas ocupam mesa no relatório)
+        mesas_por_dia = dict(
+            ((restaurante_id, data), quantidade)
+            for restaurante_id, data, quantidade in ReservaMesa.objects.filter(
+                reserva_id__in=ids, reserva__status='concluida'
+            ).values('reserva__restaurante_id', 'reserva__data_reserva')
+            .annotate(quantidade=Count('mesa_id', distinct=True))
+            .values_list('reserva__restaurante_id', 'reserva__data_reserva', 'quantidade')
+        )
+        reservas_por_dia = defaultdict(int)
+        for _, restaurante_id, data in reservas:
+            reservas_por_dia[(restaurante_id, data)] += 1
+
+        ArquivoReservasDia.objects.bulk_create([
+            ArquivoReservasDia(
+                restaurante_id=restaurante_id,
+                data=data,
+                mesas_ocupadas=mesas_por_dia.get((restaurante_id, data), 0),
+                reservas_arquivadas=reservas_por_dia[(restaurante_id, data)],
+            )
+            for restaurante_id, data in dias
+        ])
+        ArquivoReservasHorario.objects.bulk_create(horarios.values())
+
+        # Remoção das linhas originais; os vínculos não têm FOREIGN KEY no banco
+        # (tabela de reservas particionada), então cada tabela é limpa explicitamente
+        Notificacao.objects.filter(reserva_id__in=ids).delete()
+        ReservaMesa.objects.filter(reserva_id__in=ids).delete()
+        ListaEspera.objects.filter(reserva_id__in=ids).update(reserva=None)
+        Reserva.objects.filter(id__in=ids).delete()
+        OcupacaoMesaDia.objects.filter(id__in=[
+            ocupacao_id
+            for ocupacao_id, restaurante_id, data in OcupacaoMesaDia.objects.filter(
+                data__range=periodo
+            ).values_list('id', 'restaurante_id', 'data')
+            if (restaurante_id, data) in selecionados
+        ]).delete()
+
+    return len(ids)
+
+
+def arquivo_do_periodo(data_inicio, data_fim, restaurante_id=None):
+    """QuerySets (dias, horários) do arquivo no período, para os relatórios"""
+    dias = ArquivoReservasDia.objects.filter(data__gte=data_inicio, data__lte=data_fim)
+    horarios = ArquivoReservasHorario.objects.filter(data__gte=data_inicio, data__lte=data_fim)
+    if restaurante_id:
+        dias = dias.filter(restaurante_id=restaurante_id)
+        horarios = horarios.filter(restaurante_id=restaurante_id)
+    return dias, horarios
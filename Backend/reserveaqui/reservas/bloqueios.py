@@ -0,0 +1,133 @@
+"""
+Bloqueios temporários de mesas (reserva em andamento no checkout).
+
+Os bloqueios ficam no cache `BLOQUEIOS_CACHE_ALIAS` (em produção um backend
+compartilhado entre processos; nos testes o LocMemCache em memória) e expiram
+sozinhos após BLOQUEIO_MESAS_TTL_SEGUNDOS. Cada bloqueio tem uma chave própria
+(consultada pelo token) e entra no índice do restaurante/dia, que as verificações
+de disponibilidade leem com um único `get` para tratar as mesas como ocupadas.
+
+As escritas no índice são feitas com a linha do restaurante travada
+(ver reservas.alocacao), o que evita atualizações concorrentes perdidas.
+"""
+
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+
+def _cache():
+    return caches[settings.BLOQUEIOS_CACHE_ALIAS]
+
+
+def _chave_indice(restaurante_id, data_reserva):
+    return f'bloqueios:{restaurante_id}:{data_reserva.isoformat()}'
+
+
+def _chave_bloqueio(token):
+    return f'bloqueio:{token}'
+
+
+def _ativos(indice):
+    agora = timezone.now()
+    return {token: bloqueio for token, bloqueio in (indice or {}).items() if bloqueio['expira_em'] > agora}
+
+
+def bloqueios_do_dia(restaurante_id, data_reserva):
+    """Bloqueios ativos do restaurante na data, por token"""
+    return _ativos(_cache().get(_chave_indice(restaurante_id, data_reserva)))
+
+
+def _invalidar_consultas(restaurante_id, data_reserva):
+    """Consultas de disponibilidade coalescidas do dia deixam de valer (leem os bloqueios)"""
+    from .alocacao import coalescencia_disponibilidade
+    coalescencia_disponibilidade.invalidar(int(restaurante_id), data_reserva)
+
+
+def mesas_em_conflito(bloqueios, data_reserva, horario, ignorar_usuario_id=None):
+    """IDs das mesas dos `bloqueios` em horários que conflitam com o informado"""
+    from .alocacao import janela_conflito
+
+    inicio, fim = janela_conflito(data_reserva, horario)
+    return {
+        mesa_id
+        for bloqueio in bloqueios.values()
+        if bloqueio['usuario_id'] != ignorar_usuario_id and inicio <= bloqueio['horario'] <= fim
+        for mesa_id in bloqueio['mesas']
+    }
+
+
+def mesas_bloqueadas(restaurante_id, data_reserva, horario, ignorar_usuario_id=None):
+    """
+    IDs das mesas bloqueadas em horários que conflitam com o informado.
+    Bloqueios do próprio usuário (`ignorar_usuario_id`) não contam como ocupação.
+    """
+    return mesas_em_conflito(
+        bloqueios_do_dia(restaurante_id, data_reserva), data_reserva, horario, ignorar_usuario_id
+    )
+
+
+async def abloqueios_do_dia(restaurante_id, data_reserva):
+    """Versão assíncrona de `bloqueios_do_dia`"""
+    return _ativos(await _cache().aget(_chave_indice(restaurante_id, data_reserva)))
+
+
+async def amesas_bloqueadas(restaurante_id, data_reserva, horario, ignorar_usuario_id=None):
+    """Versão assíncrona de `mesas_bloqueadas`"""
+    return mesas_em_conflito(
+        await abloqueios_do_dia(restaurante_id, data_reserva), data_reserva, horario, ignorar_usuario_id
+    )
+
+
+def obter_bloqueio(token):
+    """Dados do bloqueio ativo (ou None se expirou ou não existe)"""
+    bloqueio = _cache().get(_chave_bloqueio(token))
+    if bloqueio and bloqueio['expira_em'] > timezone.now():
+        return bloqueio
+    return None
+
+
+def registrar_bloqueio(restaurante_id, data_reserva, horario, mesas_ids, usuario_id):
+    """
+    Grava um novo bloqueio e substitui bloqueios anteriores do mesmo usuário
+    no restaurante/dia. Deve ser chamado com o restaurante travado.
+    """
+    ttl = settings.BLOQUEIO_MESAS_TTL_SEGUNDOS
+    bloqueio = {
+        'token': secrets.token_urlsafe(16),
+        'restaurante_id': restaurante_id,
+        'data_reserva': data_reserva,
+        'horario': horario,
+        'mesas': list(mesas_ids),
+        'usuario_id': usuario_id,
+        'expira_em': timezone.now() + timedelta(seconds=ttl),
+    }
+
+    indice = bloqueios_do_dia(restaurante_id, data_reserva)
+    for token in [token for token, anterior in indice.items() if anterior['usuario_id'] == usuario_id]:
+        del indice[token]
+        _cache().delete(_chave_bloqueio(token))
+    indice[bloqueio['token']] = bloqueio
+
+    _cache().set(_chave_bloqueio(bloqueio['token']), bloqueio, timeout=ttl)
+    _cache().set(_chave_indice(restaurante_id, data_reserva), indice, timeout=ttl)
+    _invalidar_consultas(restaurante_id, data_reserva)
+    return bloqueio
+
+
+def liberar_bloqueio(bloqueio):
+    """Remove o bloqueio (consumido por uma reserva). Deve ser chamado com o restaurante travado."""
+    chave_indice = _chave_indice(bloqueio['restaurante_id'], bloqueio['data_reserva'])
+    indice = bloqueios_do_dia(bloqueio['restaurante_id'], bloqueio['data_reserva'])
+    indice.pop(bloqueio['token'], None)
+
+    _cache().delete(_chave_bloqueio(bloqueio['token']))
+    if indice:
+        restante = max(bloqueio['expira_em'] for bloqueio in indice.values()) - timezone.now()
+        _cache().set(chave_indice, indice, timeout=max(int(restante.total_seconds()) + 1, 1))
+    else:
+        _cache().delete(chave_indice)
+    _invalidar_consultas(bloqueio['restaurante_id'], bloqueio['data_reserva'])
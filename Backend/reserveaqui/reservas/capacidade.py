@@ -0,0 +1,68 @@
+"""
+Curva de capacidade de um restaurante em um dia.
+
+Com uma única leitura da ocupação (mesas com o mapa do dia, mais os bloqueios
+temporários de outros clientes), responde para qualquer horário quantas mesas
+estão livres e o maior grupo que cabe nelas, sem uma consulta por tamanho de
+grupo ou por horário.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+from mesas.models import Mesa
+from restaurantes import horarios
+from .alocacao import PESSOAS_POR_MESA
+from .bloqueios import bloqueios_do_dia
+from .models import Reserva
+from .ocupacao import MINUTOS_POR_SLOT, anotar_ocupacao, de_bytes, mascara
+
+
+class OcupacaoDoDia:
+    """Mapas de ocupação das mesas disponíveis do restaurante em um dia"""
+
+    def __init__(self, restaurante, data_reserva, usuario_id=None):
+        restaurante_id = restaurante.id
+        self.data_reserva = data_reserva
+        self.grade = horarios.grade_do_restaurante(restaurante)
+        mesas = anotar_ocupacao(
+            Mesa.objects.filter(restaurante_id=restaurante_id, ativa=True, status='disponivel'),
+            data_reserva,
+        ).values_list('id', 'slots_dia')
+        self.mapas = {mesa_id: de_bytes(slots) for mesa_id, slots in mesas}
+
+        for bloqueio in bloqueios_do_dia(restaurante_id, data_reserva).values():
+            if bloqueio['usuario_id'] != usuario_id:
+                for mesa_id in bloqueio['mesas']:
+                    if mesa_id in self.mapas:
+                        self.mapas[mesa_id] |= mascara(bloqueio['horario'])
+
+    @property
+    def total_mesas(self):
+        return len(self.mapas)
+
+    def esta_aberto(self, horario):
+        return horarios.esta_aberto(self.grade, self.data_reserva, horario)
+
+    def capacidade(self, horario):
+        """Mesas livres e maior grupo que cabe nelas no horário"""
+        bits_horario = mascara(horario)
+        livres = sum(1 for bits in self.mapas.values() if not bits & bits_horario)
+        return {
+            'horario': horario,
+            'mesas_disponiveis': livres,
+            'capacidade_maxima': livres * PESSOAS_POR_MESA,
+        }
+
+    def curva(self, granularidade_minutos=MINUTOS_POR_SLOT):
+        """
+        Capacidade em cada horário reservável do dia
+        (dentro do horário de funcionamento e respeitando a antecedência mínima)
+        """
+        limite_minimo = timezone.now() + timedelta(minutes=Reserva.ANTECEDENCIA_MINIMA_MINUTOS)
+        return [
+            self.capacidade(horario)
+            for horario in horarios.horarios_do_dia(self.grade, self.data_reserva, granularidade_minutos)
+            if datetime.combine(self.data_reserva, horario, tzinfo=dt_timezone.utc) >= limite_minimo
+        ]
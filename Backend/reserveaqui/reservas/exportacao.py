@@ -0,0 +1,51 @@
+"""
+Exportação em streaming de reservas (CSV e NDJSON).
+As linhas são lidas do banco em blocos e escritas uma a uma, mantendo o uso
+de memória constante independentemente do volume exportado.
+"""
+
+import csv
+import json
+
+CAMPOS_EXPORTACAO = [
+    ('id', 'id'),
+    ('restaurante_id', 'restaurante_id'),
+    ('restaurante__nome', 'restaurante_nome'),
+    ('data_reserva', 'data_reserva'),
+    ('horario', 'horario'),
+    ('quantidade_pessoas', 'quantidade_pessoas'),
+    ('nome_cliente', 'nome_cliente'),
+    ('telefone_cliente', 'telefone_cliente'),
+    ('email_cliente', 'email_cliente'),
+    ('status', 'status'),
+    ('data_criacao', 'data_criacao'),
+]
+
+TAMANHO_BLOCO = 2000
+
+
+class _Eco:
+    """Pseudo-buffer: csv.writer escreve e recebemos a linha de volta para o streaming"""
+
+    def write(self, valor):
+        return valor
+
+
+def _linhas(queryset):
+    colunas = [coluna for coluna, _ in CAMPOS_EXPORTACAO]
+    return queryset.values_list(*colunas).iterator(chunk_size=TAMANHO_BLOCO)
+
+
+def gerar_csv(queryset):
+    """Gera o CSV linha a linha, começando pelo cabeçalho"""
+    writer = csv.writer(_Eco())
+    yield writer.writerow([nome for _, nome in CAMPOS_EXPORTACAO])
+    for linha in _linhas(queryset):
+        yield writer.writerow(linha)
+
+
+def gerar_ndjson(queryset):
+    """Gera um objeto JSON por linha (NDJSON)"""
+    nomes = [nome for _, nome in CAMPOS_EXPORTACAO]
+    for linha in _linhas(queryset):
+        yield json.dumps(dict(zip(nomes, linha)), default=str, ensure_ascii=False) + '\n'
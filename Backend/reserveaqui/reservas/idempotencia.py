@@ -0,0 +1,134 @@
+"""
+Suporte ao cabeçalho Idempotency-Key nas ações de reservas.
+
+A primeira requisição com uma chave grava um registro "em andamento"
+(a restrição única (usuario, chave) impede que duas requisições simultâneas
+executem a operação) e, ao terminar, guarda o status e o corpo da resposta.
+Repetições dentro de IDEMPOTENCIA_TTL_HORAS custam uma consulta pelo índice
+único e devolvem a resposta guardada com o cabeçalho Idempotent-Replayed.
+
+Respostas 5xx e exceções não são guardadas: a chave é liberada para nova tentativa.
+Se o processo morrer no meio (OOM, timeout ou reciclagem do worker), o registro
+"em andamento" é retomado após IDEMPOTENCIA_ANDAMENTO_SEGUNDOS (padrão: o timeout do
+gunicorn, depois do qual a requisição original com certeza não está mais rodando).
+
+Arquivos enviados (ex.: importação) entram no hash pelo conteúdo, não só pelo nome.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import ChaveIdempotencia
+
+CABECALHO = 'Idempotency-Key'
+TAMANHO_MAXIMO_CHAVE = 255
+
+
+def _valor_para_hash(valor):
+    if isinstance(valor, UploadedFile):
+        resumo = hashlib.sha256()
+        for bloco in valor.chunks():
+            resumo.update(bloco)
+        valor.seek(0)
+        return f'arquivo {valor.name} {resumo.hexdigest()}'
+    return str(valor)
+
+
+def _hash_requisicao(request):
+    corpo = json.dumps(request.data, sort_keys=True, default=_valor_para_hash)
+    return hashlib.sha256(f'{request.method} {request.path}\n{corpo}'.encode()).hexdigest()
+
+
+def _abandonado(registro, agora):
+    """Registro em andamento além do tempo máximo de uma requisição (processo morto)"""
+    limite = registro.data_criacao + timedelta(seconds=settings.IDEMPOTENCIA_ANDAMENTO_SEGUNDOS)
+    return registro.status_code is None and limite <= agora
+
+
+def _em_andamento():
+    return Response(
+        {'error': f'Uma requisição com este {CABECALHO} ainda está em processamento.'},
+        status=status.HTTP_409_CONFLICT
+    )
+
+
+def _repetir(registro):
+    response = Response(registro.resposta, status=registro.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotente(view_func):
+    """
+    Decorator para métodos de ViewSet que alteram estado.
+    Sem o cabeçalho Idempotency-Key a ação é executada normalmente.
+    """
+    @wraps(view_func)
+    def wrapper(self, request, *args, **kwargs):
+        chave = request.headers.get(CABECALHO)
+        if not chave or not request.user.is_authenticated:
+            return view_func(self, request, *args, **kwargs)
+
+        if len(chave) > TAMANHO_MAXIMO_CHAVE:
+            return Response(
+                {'error': f'O cabeçalho {CABECALHO} deve ter no máximo {TAMANHO_MAXIMO_CHAVE} caracteres.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        agora = timezone.now()
+        hash_requisicao = _hash_requisicao(request)
+        registro = ChaveIdempotencia.objects.filter(usuario=request.user, chave=chave).first()
+
+        if registro and (registro.expira_em <= agora or _abandonado(registro, agora)):
+            # O filtro evita apagar a resposta gravada por uma requisição que acabou de terminar
+            ChaveIdempotencia.objects.filter(id=registro.id, status_code=registro.status_code).delete()
+            registro = None
+
+        if registro:
+            if registro.status_code is None:
+                return _em_andamento()
+            if registro.hash_requisicao != hash_requisicao:
+                return Response(
+                    {'error': f'O {CABECALHO} informado já foi usado em uma requisição diferente.'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            return _repetir(registro)
+
+        try:
+            with transaction.atomic():
+                registro = ChaveIdempotencia.objects.create(
+                    usuario=request.user,
+                    chave=chave,
+                    rota=f'{request.method} {request.path}'[:255],
+                    hash_requisicao=hash_requisicao,
+                    expira_em=agora + timedelta(hours=settings.IDEMPOTENCIA_TTL_HORAS),
+                )
+        except IntegrityError:
+            # Outra requisição com a mesma chave chegou primeiro
+            return _em_andamento()
+
+        try:
+            response = view_func(self, request, *args, **kwargs)
+        except Exception:
+            registro.delete()
+            raise
+
+        if response.status_code >= 500:
+            registro.delete()
+        else:
+            ChaveIdempotencia.objects.filter(id=registro.id).update(
+                status_code=response.status_code,
+                resposta=response.data,
+            )
+        return response
+
+    return wrapper
@@ -0,0 +1,185 @@
+"""
+Importação em lote de reservas (parceiros e eventos).
+
+As linhas (CSV ou JSON Lines) são validadas individualmente e agrupadas por
+(restaurante, data_reserva); linhas fora do horário de funcionamento são
+recusadas pela grade do restaurante. Para cada grupo, dentro de uma transação que trava
+o restaurante, as mesas e o mapa de ocupação do dia são carregados uma única vez,
+as mesas de todas as linhas são alocadas em memória e as reservas, os vínculos e
+os mapas atualizados são gravados com bulk_create.
+"""
+
+import csv
+import io
+import json
+from collections import defaultdict
+
+from django.db import transaction
+
+from mesas.models import Mesa
+from restaurantes.horarios import esta_aberto, grade_do_restaurante
+from restaurantes.models import Restaurante
+from .bloqueios import bloqueios_do_dia
+from .alocacao import calcular_mesas_necessarias, travar_restaurante
+from .models import Reserva, ReservaMesa
+from .ocupacao import gravar, mapa_do_dia, mascara
+from .serializers import ReservaImportacaoSerializer
+
+FORMATOS = ('csv', 'jsonl', 'ndjson')
+LIMITE_LINHAS = 5000
+
+
+class ArquivoInvalido(ValueError):
+    """Arquivo de importação que não pôde ser lido"""
+
+
+def ler_linhas(arquivo, formato):
+    """
+    Lê o arquivo enviado e retorna uma lista de dicionários (um por linha de dados).
+    Lança ArquivoInvalido se o conteúdo não puder ser interpretado.
+    """
+    try:
+        texto = arquivo.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise ArquivoInvalido('O arquivo deve estar codificado em UTF-8.')
+
+    if formato == 'csv':
+        linhas = list(csv.DictReader(io.StringIO(texto)))
+    else:
+        linhas = []
+        for numero, conteudo in enumerate(texto.splitlines(), start=1):
+            if not conteudo.strip():
+                continue
+            try:
+                linha = json.loads(conteudo)
+            except json.JSONDecodeError:
+                raise ArquivoInvalido(f'Linha {numero}: JSON inválido.')
+            if not isinstance(linha, dict):
+                raise ArquivoInvalido(f'Linha {numero}: cada linha deve ser um objeto JSON.')
+            linhas.append(linha)
+
+    if len(linhas) > LIMITE_LINHAS:
+        raise ArquivoInvalido(f'O arquivo excede o limite de {LIMITE_LINHAS} linhas.')
+
+    return linhas
+
+
+def importar_reservas(linhas, restaurantes_permitidos=None):
+    """
+    Valida, aloca e grava as reservas. Retorna o relatório por linha, na ordem do arquivo.
+    `restaurantes_permitidos` é um conjunto de IDs (None = qualquer restaurante).
+    """
+    resultados = {}
+    grupos = defaultdict(list)
+
+    for numero, linha in enumerate(linhas, start=1):
+        serializer = ReservaImportacaoSerializer(data=linha)
+        if serializer.is_valid():
+            dados = serializer.validated_data
+            grupos[(dados['restaurante'], dados['data_reserva'])].append((numero, dados))
+        else:
+            resultados[numero] = {'linha': numero, 'status': 'erro', 'erros': serializer.errors}
+
+    restaurantes = Restaurante.objects.in_bulk({restaurante_id for restaurante_id, _ in grupos})
+
+    for (restaurante_id, data_reserva), itens in grupos.items():
+        restaurante = restaurantes.get(restaurante_id)
+        erro = None
+        if restaurante is None:
+            erro = 'Restaurante não encontrado.'
+        elif restaurantes_permitidos is not None and restaurante_id not in restaurantes_permitidos:
+            erro = 'Você não tem permissão para importar reservas deste restaurante.'
+        elif not restaurante.ativo:
+            erro = 'Este restaurante não está disponível para reservas.'
+
+        if erro:
+            for numero, _ in itens:
+                resultados[numero] = {'linha': numero, 'status': 'erro', 'erros': {'restaurante': [erro]}}
+            continue
+
+        # Linhas fora do horário de funcionamento são recusadas sem ir ao banco
+        grade = grade_do_restaurante(restaurante)
+        abertas = []
+        for numero, dados in itens:
+            if esta_aberto(grade, data_reserva, dados['horario']):
+                abertas.append((numero, dados))
+            else:
+                resultados[numero] = {
+                    'linha': numero,
+                    'status': 'erro',
+                    'erros': {'horario': ['O restaurante não está aberto neste horário.']},
+                }
+
+        if abertas:
+            resultados.update(_importar_grupo(restaurante_id, data_reserva, abertas))
+
+    return [resultados[numero] for numero in sorted(resultados)]
+
+
+def _importar_grupo(restaurante_id, data_reserva, itens):
+    """Aloca e grava as reservas de um restaurante em uma data"""
+    resultados = {}
+
+    with transaction.atomic():
+        travar_restaurante(restaurante_id)
+
+        mesas = list(
+            Mesa.objects.filter(restaurante_id=restaurante_id, ativa=True, status='disponivel')
+            .order_by('numero')
+        )
+        # Mapa de ocupação do dia (inclui as reservas deste lote à medida que são alocadas)
+        ocupacao = mapa_do_dia(restaurante_id, data_reserva)
+        # Mesas bloqueadas temporariamente (checkout em andamento) também estão ocupadas,
+        # mas os bloqueios não são gravados no mapa
+        bloqueadas = defaultdict(int)
+        for bloqueio in bloqueios_do_dia(restaurante_id, data_reserva).values():
+            for mesa_id in bloqueio['mesas']:
+                bloqueadas[mesa_id] |= mascara(bloqueio['horario'])
+
+        novas = []
+        alteradas = set()
+        for numero, dados in itens:
+            bits_horario = mascara(dados['horario'])
+            livres = [
+                mesa for mesa in mesas
+                if not (ocupacao.get(mesa.id, 0) | bloqueadas[mesa.id]) & bits_horario
+            ]
+            necessarias = calcular_mesas_necessarias(dados['quantidade_pessoas'])
+
+            if len(livres) < necessarias:
+                resultados[numero] = {
+                    'linha': numero,
+                    'status': 'erro',
+                    'erros': {'non_field_errors': [
+                        f'Não há mesas suficientes disponíveis. '
+                        f'Necessárias: {necessarias}, Disponíveis: {len(livres)}'
+                    ]},
+                }
+                continue
+
+            alocadas = livres[:necessarias]
+            for mesa in alocadas:
+                ocupacao[mesa.id] = ocupacao.get(mesa.id, 0) | bits_horario
+                alteradas.add(mesa.id)
+            campos = {campo: valor for campo, valor in dados.items() if campo != 'restaurante'}
+            reserva = Reserva(restaurante_id=restaurante_id, **campos)
+            novas.append((numero, reserva, alocadas))
+
+        if novas:
+            Reserva.objects.bulk_create([reserva for _, reserva, _ in novas])
+            ReservaMesa.objects.bulk_create([
+                ReservaMesa(reserva=reserva, mesa=mesa)
+                for _, reserva, alocadas in novas
+                for mesa in alocadas
+            ])
+            gravar(restaurante_id, data_reserva, {mesa_id: ocupacao[mesa_id] for mesa_id in alteradas})
+
+    for numero, reserva, alocadas in novas:
+        resultados[numero] = {
+            'linha': numero,
+            'status': 'criada',
+            'reserva_id': reserva.id,
+            'mesas': [mesa.numero for mesa in alocadas],
+        }
+
+    return resultados
@@ -0,0 +1,184 @@
+"""
+Lista de espera por mesas.
+
+Quando uma reserva é cancelada, as mesas liberadas abrem vaga na janela de ±1h
+do horário cancelado. O atendimento da lista (executado pela fila de jobs):
+
+1. trava a linha do restaurante (mesma serialização da alocação normal);
+2. busca as entradas compatíveis com uma única consulta pelo índice
+   (restaurante, data_reserva, status, horario_inicio): janela de horários que
+   cruza a janela liberada e grupo que cabe no restaurante, por ordem de chegada;
+3. carrega o mapa de ocupação do dia uma vez e aloca as mesas em memória;
+4. grava reservas, vínculos, mapas, entradas atendidas e notificações com
+   bulk_create/bulk_update.
+
+O custo é fixo em consultas, independente do tamanho da lista.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.utils import timezone
+
+from mesas.models import Mesa
+from restaurantes.horarios import esta_aberto, grade_do_restaurante
+from .alocacao import (
+    JANELA_CONFLITO,
+    PESSOAS_POR_MESA,
+    calcular_mesas_necessarias,
+    janela_conflito,
+    travar_restaurante,
+)
+from .bloqueios import bloqueios_do_dia
+from .models import ListaEspera, Notificacao, Reserva, ReservaMesa
+from .ocupacao import gravar, mapa_do_dia, mascara
+
+# Entradas avaliadas por vaga aberta (as mais antigas primeiro)
+LIMITE_ENTRADAS = 200
+
+
+def _horario_candidato(entrada, horario):
+    """Horário da janela da entrada mais próximo do horário liberado"""
+    if entrada.horario_inicio <= horario <= entrada.horario_fim:
+        return horario
+    return entrada.horario_inicio if horario < entrada.horario_inicio else entrada.horario_fim
+
+
+def ha_espera(restaurante_id, data_reserva):
+    """Indica se há entradas aguardando no restaurante/dia (consulta pelo índice)"""
+    return ListaEspera.objects.filter(
+        restaurante_id=restaurante_id,
+        data_reserva=data_reserva,
+        status='aguardando',
+    ).exists()
+
+
+def agendar_atendimento(vagas):
+    """
+    Enfileira o atendimento da lista de espera para cada vaga aberta.
+    `vagas` é um iterável de (restaurante_id, data_reserva, horario);
+    vagas repetidas e restaurantes/dias sem ninguém aguardando são ignorados.
+    """
+    from utils.jobs import enfileirar
+
+    for restaurante_id, data_reserva, horario in dict.fromkeys(vagas):
+        if ha_espera(restaurante_id, data_reserva):
+            enfileirar('reservas.atender_lista_espera', {
+                'restaurante_id': restaurante_id,
+                'data_reserva': data_reserva.isoformat(),
+                'horario': horario.isoformat(),
+            })
+
+
+def atender_lista_espera(restaurante_id, data_reserva, horario, antecedencia_minutos=None):
+    """
+    Aloca as mesas livres próximas ao horário para as entradas da lista de espera.
+    Retorna a lista de entradas atendidas (com a reserva criada).
+    """
+    if antecedencia_minutos is None:
+        antecedencia_minutos = Reserva.ANTECEDENCIA_MINIMA_MINUTOS
+    limite_minimo = timezone.now() + timedelta(minutes=antecedencia_minutos)
+    inicio, fim = janela_conflito(data_reserva, horario)
+    if datetime.combine(data_reserva, horario, tzinfo=dt_timezone.utc) + JANELA_CONFLITO < limite_minimo:
+        return []
+
+    atendidas = []
+    with transaction.atomic():
+        travar_restaurante(restaurante_id)
+
+        mesas = list(
+            Mesa.objects.filter(restaurante_id=restaurante_id, ativa=True, status='disponivel')
+            .order_by('numero')
+        )
+        if not mesas:
+            return []
+
+        entradas = list(
+            ListaEspera.objects.select_related('restaurante').filter(
+                restaurante_id=restaurante_id,
+                data_reserva=data_reserva,
+                status='aguardando',
+                horario_inicio__lte=fim,
+                horario_fim__gte=inicio,
+                quantidade_pessoas__lte=len(mesas) * PESSOAS_POR_MESA,
+            ).order_by('data_criacao', 'id')[:LIMITE_ENTRADAS]
+        )
+        if not entradas:
+            return []
+
+        # Mapa de ocupação do dia; bloqueios temporários contam como ocupação, sem ir para o mapa
+        ocupacao = mapa_do_dia(restaurante_id, data_reserva)
+        bloqueadas = defaultdict(int)
+        for bloqueio in bloqueios_do_dia(restaurante_id, data_reserva).values():
+            for mesa_id in bloqueio['mesas']:
+                bloqueadas[mesa_id] |= mascara(bloqueio['horario'])
+
+        grade = grade_do_restaurante(entradas[0].restaurante)
+        novas = []
+        alteradas = set()
+        for entrada in entradas:
+            candidato = _horario_candidato(entrada, horario)
+            if datetime.combine(data_reserva, candidato, tzinfo=dt_timezone.utc) < limite_minimo:
+                continue
+            if not esta_aberto(grade, data_reserva, candidato):
+                continue
+
+            bits_horario = mascara(candidato)
+            livres = [
+                mesa for mesa in mesas
+                if not (ocupacao.get(mesa.id, 0) | bloqueadas[mesa.id]) & bits_horario
+            ]
+            necessarias = calcular_mesas_necessarias(entrada.quantidade_pessoas)
+            if len(livres) < necessarias:
+                continue
+
+            alocadas = livres[:necessarias]
+            for mesa in alocadas:
+                ocupacao[mesa.id] = ocupacao.get(mesa.id, 0) | bits_horario
+                alteradas.add(mesa.id)
+            reserva = Reserva(
+                usuario_id=entrada.usuario_id,
+                restaurante_id=restaurante_id,
+                data_reserva=data_reserva,
+                horario=candidato,
+                quantidade_pessoas=entrada.quantidade_pessoas,
+                nome_cliente=entrada.nome_cliente,
+                telefone_cliente=entrada.telefone_cliente,
+                observacoes='Reserva gerada pela lista de espera.',
+            )
+            novas.append((entrada, reserva, alocadas))
+
+        if not novas:
+            return []
+
+        Reserva.objects.bulk_create([reserva for _, reserva, _ in novas])
+        ReservaMesa.objects.bulk_create([
+            ReservaMesa(reserva=reserva, mesa=mesa)
+            for _, reserva, alocadas in novas
+            for mesa in alocadas
+        ])
+        gravar(restaurante_id, data_reserva, {mesa_id: ocupacao[mesa_id] for mesa_id in alteradas})
+
+        for entrada, reserva, _ in novas:
+            entrada.status = 'atendida'
+            entrada.reserva = reserva
+            entrada.data_atualizacao = timezone.now()
+            atendidas.append(entrada)
+        ListaEspera.objects.bulk_update(atendidas, ['status', 'reserva', 'data_atualizacao'])
+
+        Notificacao.objects.bulk_create([
+            Notificacao(
+                usuario_id=entrada.usuario_id,
+                reserva=reserva,
+                tipo='atualizacao',
+                titulo=f'Vaga Disponível - {entrada.restaurante.nome}',
+                mensagem=f'Abriu uma vaga em {entrada.restaurante.nome}! Reservamos '
+                         f'{len(alocadas)} mesa(s) para {reserva.quantidade_pessoas} pessoas em '
+                         f'{reserva.data_reserva} às {reserva.horario}. '
+                         f'Mesas: {", ".join(str(mesa.numero) for mesa in alocadas)}'
+            )
+            for entrada, reserva, alocadas in novas
+        ])
+
+    return atendidas
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-19 03:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0002_notificacao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatorioAssincrono',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('ocupacao', 'Ocupação de Mesas'), ('horarios_movimentados', 'Horários Mais Movimentados'), ('estatisticas_periodo', 'Estatísticas por Período')], max_length=30, verbose_name='Tipo de Relatório')),
+                ('parametros', models.JSONField(blank=True, default=dict, verbose_name='Parâmetros')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('concluido', 'Concluído'), ('erro', 'Erro')], default='pendente', max_length=20, verbose_name='Status')),
+                ('progresso', models.PositiveSmallIntegerField(default=0, verbose_name='Progresso (%)')),
+                ('job_id', models.BigIntegerField(blank=True, null=True, verbose_name='ID do Job')),
+                ('resultado', models.JSONField(blank=True, null=True, verbose_name='Resultado')),
+                ('erro', models.TextField(blank=True, verbose_name='Erro')),
+                ('data_criacao', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('data_conclusao', models.DateTimeField(blank=True, null=True, verbose_name='Data de Conclusão')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relatorios', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Relatório Assíncrono',
+                'verbose_name_plural': 'Relatórios Assíncronos',
+                'ordering': ['-data_criacao'],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.2 on 2026-10-19 00:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0004_chaveidempotencia'),
+        ('restaurantes', '0003_restaurante_horario_funcionamento'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListaEspera',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_reserva', models.DateField(verbose_name='Data da Reserva')),
+                ('horario_inicio', models.TimeField(verbose_name='Horário Inicial')),
+                ('horario_fim', models.TimeField(verbose_name='Horário Final')),
+                ('quantidade_pessoas', models.PositiveIntegerField(verbose_name='Quantidade de Pessoas')),
+                ('nome_cliente', models.CharField(max_length=200, verbose_name='Nome do Cliente')),
+                ('telefone_cliente', models.CharField(max_length=20, verbose_name='Telefone do Cliente')),
+                ('status', models.CharField(choices=[('aguardando', 'Aguardando'), ('atendida', 'Atendida'), ('cancelada', 'Cancelada'), ('expirada', 'Expirada')], default='aguardando', max_length=20, verbose_name='Status')),
+                ('data_criacao', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('data_atualizacao', models.DateTimeField(auto_now=True, verbose_name='Data de Atualização')),
+                ('reserva', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reservas.reserva', verbose_name='Reserva Gerada')),
+                ('restaurante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lista_espera', to='restaurantes.restaurante', verbose_name='Restaurante')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listas_espera', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Lista de Espera',
+                'verbose_name_plural': 'Listas de Espera',
+                'ordering': ['data_criacao'],
+                'indexes': [models.Index(fields=['restaurante', 'data_reserva', 'status', 'horario_inicio'], name='reservas_li_restaur_872635_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 6.0.2 on 2026-10-19 01:10
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Cópia congelada das regras de reservas.alocacao/reservas.ocupacao na data desta
+# migração: mudanças posteriores nesses módulos não alteram o que ela grava
+STATUS_ATIVOS = ('pendente', 'confirmada')
+MINUTOS_POR_SLOT = 15
+SLOTS_POR_DIA = 24 * 60 // MINUTOS_POR_SLOT
+TAMANHO_BYTES = SLOTS_POR_DIA // 8
+MINUTOS_OCUPADOS = 60
+
+
+def mascara(horario):
+    """Bits das faixas ocupadas por uma reserva no horário informado"""
+    minuto = horario.hour * 60 + horario.minute
+    inicio = minuto // MINUTOS_POR_SLOT
+    fim = min((minuto + MINUTOS_OCUPADOS) // MINUTOS_POR_SLOT, SLOTS_POR_DIA - 1)
+    return ((1 << (fim - inicio + 1)) - 1) << inicio
+
+
+def preencher_ocupacao(apps, schema_editor):
+    """
+    Monta os mapas de hoje em diante a partir dos vínculos das reservas ativas
+    (mesma regra de ocupacao.recalcular). Sem isso, a disponibilidade ignoraria
+    as reservas existentes e as mesas delas seriam alocadas de novo.
+    """
+    ReservaMesa = apps.get_model('reservas', 'ReservaMesa')
+    OcupacaoMesaDia = apps.get_model('reservas', 'OcupacaoMesaDia')
+
+    mapas = defaultdict(int)
+    vinculos = ReservaMesa.objects.filter(
+        reserva__data_reserva__gte=timezone.now().date(),
+        reserva__status__in=STATUS_ATIVOS,
+    ).values_list('reserva__restaurante_id', 'reserva__data_reserva', 'mesa_id', 'reserva__horario')
+    for restaurante_id, data, mesa_id, horario in vinculos.iterator():
+        mapas[(restaurante_id, data, mesa_id)] |= mascara(horario)
+
+    OcupacaoMesaDia.objects.bulk_create(
+        [
+            OcupacaoMesaDia(restaurante_id=restaurante_id, data=data, mesa_id=mesa_id, slots=bits.to_bytes(TAMANHO_BYTES, 'big'))
+            for (restaurante_id, data, mesa_id), bits in mapas.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mesas', '0003_alter_mesa_status'),
+        ('reservas', '0005_listaespera'),
+        ('restaurantes', '0003_restaurante_horario_funcionamento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcupacaoMesaDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('slots', models.BinaryField(max_length=12, verbose_name='Faixas Ocupadas')),
+                ('mesa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ocupacoes', to='mesas.mesa', verbose_name='Mesa')),
+                ('restaurante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='restaurantes.restaurante', verbose_name='Restaurante')),
+            ],
+            options={
+                'verbose_name': 'Ocupação de Mesa',
+                'verbose_name_plural': 'Ocupações de Mesas',
+                'indexes': [models.Index(fields=['restaurante', 'data'], name='reservas_oc_restaur_95c29d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('mesa', 'data'), name='ocupacao_unica_por_mesa_dia')],
+            },
+        ),
+        migrations.RunPython(preencher_ocupacao, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 6.0.2 on 2026-10-19 03:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _recriar_tabela(cursor, particionada):
+    """
+    Recria reservas_reserva (particionada por mês de data_reserva ou comum) com os
+    mesmos dados, índices e chaves estrangeiras. A sequência de IDs é preservada.
+    """
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() "
+        "AND tablename = 'reservas_reserva' AND indexname <> 'reservas_reserva_pkey'"
+    )
+    indices = [linha[0] for linha in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = 'reservas_reserva'::regclass AND contype = 'f'"
+    )
+    chaves_estrangeiras = cursor.fetchall()
+    cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM reservas_reserva")
+    proximo_id = cursor.fetchone()[0]
+
+    cursor.execute('ALTER TABLE reservas_reserva RENAME TO reservas_reserva_legado')
+    if particionada:
+        cursor.execute(
+            'CREATE TABLE reservas_reserva '
+            '(LIKE reservas_reserva_legado INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            'PARTITION BY RANGE (data_reserva)'
+        )
+        cursor.execute('CREATE TABLE reservas_reserva_padrao PARTITION OF reservas_reserva DEFAULT')
+    else:
+        cursor.execute('ALTER SEQUENCE reservas_reserva_id_seq OWNED BY NONE')
+        cursor.execute(
+            'CREATE TABLE reservas_reserva '
+            '(LIKE reservas_reserva_legado INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        )
+    cursor.execute('INSERT INTO reservas_reserva SELECT * FROM reservas_reserva_legado')
+    # Remove também a sequência da coluna identity original e, na volta, as partições
+    cursor.execute('DROP TABLE reservas_reserva_legado')
+
+    if particionada:
+        cursor.execute('CREATE SEQUENCE reservas_reserva_id_seq')
+        cursor.execute(
+            "ALTER TABLE reservas_reserva ALTER COLUMN id SET DEFAULT nextval('reservas_reserva_id_seq')"
+        )
+    cursor.execute('ALTER SEQUENCE reservas_reserva_id_seq OWNED BY reservas_reserva.id')
+    cursor.execute("SELECT setval('reservas_reserva_id_seq', %s, false)", [proximo_id])
+
+    # A chave primária de uma tabela particionada precisa incluir a chave de partição
+    if particionada:
+        cursor.execute('ALTER TABLE reservas_reserva ADD PRIMARY KEY (id, data_reserva)')
+    else:
+        cursor.execute('ALTER TABLE reservas_reserva ADD PRIMARY KEY (id)')
+    for indice in indices:
+        cursor.execute(indice)
+    for nome, definicao in chaves_estrangeiras:
+        cursor.execute(f'ALTER TABLE reservas_reserva ADD CONSTRAINT {nome} {definicao}')
+
+
+def particionar(apps, schema_editor):
+    """Converte reservas_reserva em tabela particionada (apenas PostgreSQL)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        _recriar_tabela(cursor, particionada=True)
+
+
+def desparticionar(apps, schema_editor):
+    """Volta reservas_reserva a ser uma tabela comum (apenas PostgreSQL)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        _recriar_tabela(cursor, particionada=False)
+
+
+class Migration(migrations.Migration):
+    """
+    Particiona as reservas por mês de data_reserva. Todas as linhas existentes vão
+    para a partição padrão; `python manage.py criar_particoes` cria as partições
+    mensais e move as linhas para elas.
+    """
+
+    dependencies = [
+        ('reservas', '0006_ocupacaomesadia'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='listaespera',
+            name='reserva',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reservas.reserva', verbose_name='Reserva Gerada'),
+        ),
+        migrations.AlterField(
+            model_name='notificacao',
+            name='reserva',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='notificacoes', to='reservas.reserva', verbose_name='Reserva'),
+        ),
+        migrations.AlterField(
+            model_name='reservamesa',
+            name='reserva',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='reservas.reserva', verbose_name='Reserva'),
+        ),
+        migrations.RunPython(particionar, desparticionar),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 6.0.2 on 2026-10-19 04:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0007_particionamento_reserva'),
+        ('restaurantes', '0004_horarios_estruturados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArquivoReservasDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('mesas_ocupadas', models.PositiveIntegerField(default=0, verbose_name='Mesas Ocupadas')),
+                ('reservas_arquivadas', models.PositiveIntegerField(default=0, verbose_name='Reservas Arquivadas')),
+                ('data_arquivamento', models.DateTimeField(auto_now_add=True, verbose_name='Data de Arquivamento')),
+                ('restaurante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='restaurantes.restaurante', verbose_name='Restaurante')),
+            ],
+            options={
+                'verbose_name': 'Dia Arquivado',
+                'verbose_name_plural': 'Dias Arquivados',
+                'ordering': ['-data'],
+                'indexes': [models.Index(fields=['data'], name='reservas_ar_data_5f7e1e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('restaurante', 'data'), name='arquivo_unico_por_restaurante_dia')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArquivoReservasHorario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('horario', models.TimeField(verbose_name='Horário')),
+                ('reservas_concluidas', models.PositiveIntegerField(default=0, verbose_name='Reservas Concluídas')),
+                ('reservas_canceladas', models.PositiveIntegerField(default=0, verbose_name='Reservas Canceladas')),
+                ('pessoas_concluidas', models.PositiveIntegerField(default=0, verbose_name='Pessoas (Concluídas)')),
+                ('pessoas_canceladas', models.PositiveIntegerField(default=0, verbose_name='Pessoas (Canceladas)')),
+                ('restaurante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='restaurantes.restaurante', verbose_name='Restaurante')),
+            ],
+            options={
+                'verbose_name': 'Horário Arquivado',
+                'verbose_name_plural': 'Horários Arquivados',
+                'ordering': ['-data', 'horario'],
+                'indexes': [models.Index(fields=['data', 'restaurante'], name='reservas_ar_data_2be90d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('restaurante', 'data', 'horario'), name='arquivo_unico_por_restaurante_dia_horario')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-19 05:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0008_arquivo_reservas'),
+        ('restaurantes', '0004_horarios_estruturados'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['restaurante', 'data_atualizacao'], name='reservas_re_restaur_846bae_idx'),
+        ),
+        migrations.CreateModel(
+            name='Remocao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('reserva', 'Reserva'), ('mesa', 'Mesa')], max_length=10, verbose_name='Tipo')),
+                ('objeto_id', models.PositiveBigIntegerField(verbose_name='ID Removido')),
+                ('data_remocao', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data de Remoção')),
+                ('restaurante', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='restaurantes.restaurante', verbose_name='Restaurante')),
+            ],
+            options={
+                'verbose_name': 'Remoção',
+                'verbose_name_plural': 'Remoções',
+                'indexes': [
+                    models.Index(fields=['restaurante', 'data_remocao'], name='reservas_re_restaur_ee2187_idx'),
+                    models.Index(fields=['data_remocao'], name='reservas_re_data_re_657a2f_idx'),
+                ],
+            },
+        ),
+    ]
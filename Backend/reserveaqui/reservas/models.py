@@ -1,5 +1,8 @@
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils import timezone
 from datetime import datetime, timedelta, timezone as dt_timezone
 import math
@@ -76,6 +79,8 @@ class Reserva(models.Model):
         indexes = [
             models.Index(fields=['restaurante', 'data_reserva', 'horario']),
             models.Index(fields=['status']),
+            # Sincronização incremental (GET /api/reservas/mudancas/)
+            models.Index(fields=['restaurante', 'data_atualizacao']),
         ]
     
     def __str__(self):
@@ -128,9 +133,11 @@ class ReservaMesa(models.Model):
     Permite rastrear quais mesas estão alocadas para cada reserva.
     """
     
+    # Sem FOREIGN KEY no banco: a tabela de reservas é particionada (ver reservas/particionamento.py)
     reserva = models.ForeignKey(
         Reserva,
         on_delete=models.CASCADE,
+        db_constraint=False,
         verbose_name='Reserva'
     )
     mesa = models.ForeignKey(
@@ -174,6 +181,7 @@ class Notificacao(models.Model):
     reserva = models.ForeignKey(
         Reserva,
         on_delete=models.CASCADE,
+        db_constraint=False,
         related_name='notificacoes',
         verbose_name='Reserva'
     )
@@ -209,4 +217,322 @@ class Notificacao(models.Model):
         """Marca a notificação como lida"""
         self.lido = True
         self.data_leitura = timezone.now()
-        self.save()
\ No newline at end of file
+        self.save()
+
+
+class RelatorioAssincrono(models.Model):
+    """
+    Relatório gerado em segundo plano pela fila de jobs.
+    Guarda parâmetros, progresso e o resultado para download posterior.
+    """
+    
+    TIPO_CHOICES = [
+        ('ocupacao', 'Ocupação de Mesas'),
+        ('horarios_movimentados', 'Horários Mais Movimentados'),
+        ('estatisticas_periodo', 'Estatísticas por Período'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('processando', 'Processando'),
+        ('concluido', 'Concluído'),
+        ('erro', 'Erro'),
+    ]
+    
+    usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='relatorios',
+        verbose_name='Usuário'
+    )
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES, verbose_name='Tipo de Relatório')
+    parametros = models.JSONField(default=dict, blank=True, verbose_name='Parâmetros')
+    
+    # Execução
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pendente',
+        verbose_name='Status'
+    )
+    progresso = models.PositiveSmallIntegerField(default=0, verbose_name='Progresso (%)')
+    job_id = models.BigIntegerField(null=True, blank=True, verbose_name='ID do Job')
+    resultado = models.JSONField(null=True, blank=True, verbose_name='Resultado')
+    erro = models.TextField(blank=True, verbose_name='Erro')
+    
+    # Timestamps
+    data_criacao = models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')
+    data_conclusao = models.DateTimeField(null=True, blank=True, verbose_name='Data de Conclusão')
+    
+    class Meta:
+        verbose_name = 'Relatório Assíncrono'
+        verbose_name_plural = 'Relatórios Assíncronos'
+        ordering = ['-data_criacao']
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.id} ({self.get_status_display()})"
+
+
+class ChaveIdempotencia(models.Model):
+    """
+    Resposta armazenada para uma requisição com cabeçalho Idempotency-Key.
+    Repetições da mesma chave (pelo mesmo usuário) devolvem a resposta guardada
+    sem executar novamente a operação. `status_code` nulo indica requisição em andamento.
+    """
+    
+    usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='chaves_idempotencia',
+        verbose_name='Usuário'
+    )
+    chave = models.CharField(max_length=255, verbose_name='Chave')
+    rota = models.CharField(max_length=255, verbose_name='Rota')
+    hash_requisicao = models.CharField(max_length=64, verbose_name='Hash da Requisição')
+    
+    # Resposta armazenada
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Status HTTP')
+    resposta = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name='Resposta')
+    
+    # Timestamps
+    data_criacao = models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')
+    expira_em = models.DateTimeField(db_index=True, verbose_name='Expira em')
+    
+    class Meta:
+        verbose_name = 'Chave de Idempotência'
+        verbose_name_plural = 'Chaves de Idempotência'
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'chave'], name='chave_idempotencia_unica_por_usuario'),
+        ]
+    
+    def __str__(self):
+        return f"{self.chave} ({self.rota})"
+
+
+class ListaEspera(models.Model):
+    """
+    Entrada na lista de espera de um restaurante para uma data e janela de horários.
+    Quando uma reserva é cancelada, as mesas liberadas são alocadas automaticamente
+    para as entradas compatíveis, por ordem de chegada.
+    """
+    
+    STATUS_CHOICES = [
+        ('aguardando', 'Aguardando'),
+        ('atendida', 'Atendida'),
+        ('cancelada', 'Cancelada'),
+        ('expirada', 'Expirada'),
+    ]
+    
+    # Relações
+    usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='listas_espera',
+        verbose_name='Usuário'
+    )
+    restaurante = models.ForeignKey(
+        Restaurante,
+        on_delete=models.CASCADE,
+        related_name='lista_espera',
+        verbose_name='Restaurante'
+    )
+    reserva = models.ForeignKey(
+        Reserva,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_constraint=False,
+        related_name='+',
+        verbose_name='Reserva Gerada'
+    )
+    
+    # Pedido
+    data_reserva = models.DateField(verbose_name='Data da Reserva')
+    horario_inicio = models.TimeField(verbose_name='Horário Inicial')
+    horario_fim = models.TimeField(verbose_name='Horário Final')
+    quantidade_pessoas = models.PositiveIntegerField(verbose_name='Quantidade de Pessoas')
+    nome_cliente = models.CharField(max_length=200, verbose_name='Nome do Cliente')
+    telefone_cliente = models.CharField(max_length=20, verbose_name='Telefone do Cliente')
+    
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='aguardando',
+        verbose_name='Status'
+    )
+    
+    # Timestamps
+    data_criacao = models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')
+    data_atualizacao = models.DateTimeField(auto_now=True, verbose_name='Data de Atualização')
+    
+    class Meta:
+        verbose_name = 'Lista de Espera'
+        verbose_name_plural = 'Listas de Espera'
+        ordering = ['data_criacao']
+        indexes = [
+            # Busca das entradas compatíveis com as mesas liberadas (faixa de horário)
+            models.Index(fields=['restaurante', 'data_reserva', 'status', 'horario_inicio']),
+        ]
+    
+    def __str__(self):
+        return f"{self.nome_cliente} - {self.restaurante.nome} ({self.data_reserva} {self.horario_inicio}-{self.horario_fim})"
+
+
+class OcupacaoMesaDia(models.Model):
+    """
+    Ocupação de uma mesa em um dia, em faixas de 15 minutos (96 bits).
+    Cada reserva ativa marca as faixas de [horário, horário + 1h], de modo que
+    duas reservas conflitam (±1h) quando suas faixas se sobrepõem.
+    Mantida por reservas.ocupacao a cada alocação ou liberação de mesas.
+    """
+    
+    restaurante = models.ForeignKey(
+        Restaurante,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Restaurante'
+    )
+    mesa = models.ForeignKey(
+        Mesa,
+        on_delete=models.CASCADE,
+        related_name='ocupacoes',
+        verbose_name='Mesa'
+    )
+    data = models.DateField(verbose_name='Data')
+    slots = models.BinaryField(max_length=12, verbose_name='Faixas Ocupadas')
+    
+    class Meta:
+        verbose_name = 'Ocupação de Mesa'
+        verbose_name_plural = 'Ocupações de Mesas'
+        constraints = [
+            models.UniqueConstraint(fields=['mesa', 'data'], name='ocupacao_unica_por_mesa_dia'),
+        ]
+        indexes = [
+            models.Index(fields=['restaurante', 'data']),
+        ]
+    
+    def __str__(self):
+        return f"Mesa {self.mesa_id} - {self.data}"
+
+
+class ArquivoReservasDia(models.Model):
+    """
+    Dia arquivado de um restaurante (ver reservas/arquivo.py).
+    Guarda o que os relatórios precisam do dia inteiro, como as mesas distintas
+    ocupadas; os totais por horário ficam em ArquivoReservasHorario.
+    """
+    
+    restaurante = models.ForeignKey(
+        Restaurante,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Restaurante'
+    )
+    data = models.DateField(verbose_name='Data')
+    mesas_ocupadas = models.PositiveIntegerField(default=0, verbose_name='Mesas Ocupadas')
+    reservas_arquivadas = models.PositiveIntegerField(default=0, verbose_name='Reservas Arquivadas')
+    data_arquivamento = models.DateTimeField(auto_now_add=True, verbose_name='Data de Arquivamento')
+    
+    class Meta:
+        verbose_name = 'Dia Arquivado'
+        verbose_name_plural = 'Dias Arquivados'
+        ordering = ['-data']
+        constraints = [
+            models.UniqueConstraint(fields=['restaurante', 'data'], name='arquivo_unico_por_restaurante_dia'),
+        ]
+        indexes = [
+            models.Index(fields=['data']),
+        ]
+    
+    def __str__(self):
+        return f"Arquivo {self.restaurante_id} - {self.data}"
+
+
+class ArquivoReservasHorario(models.Model):
+    """Totais das reservas arquivadas de um restaurante por dia e horário"""
+    
+    restaurante = models.ForeignKey(
+        Restaurante,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Restaurante'
+    )
+    data = models.DateField(verbose_name='Data')
+    horario = models.TimeField(verbose_name='Horário')
+    reservas_concluidas = models.PositiveIntegerField(default=0, verbose_name='Reservas Concluídas')
+    reservas_canceladas = models.PositiveIntegerField(default=0, verbose_name='Reservas Canceladas')
+    pessoas_concluidas = models.PositiveIntegerField(default=0, verbose_name='Pessoas (Concluídas)')
+    pessoas_canceladas = models.PositiveIntegerField(default=0, verbose_name='Pessoas (Canceladas)')
+    
+    class Meta:
+        verbose_name = 'Horário Arquivado'
+        verbose_name_plural = 'Horários Arquivados'
+        ordering = ['-data', 'horario']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['restaurante', 'data', 'horario'], name='arquivo_unico_por_restaurante_dia_horario'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['data', 'restaurante']),
+        ]
+    
+    def __str__(self):
+        return f"Arquivo {self.restaurante_id} - {self.data} {self.horario}"
+
+
+class Remocao(models.Model):
+    """
+    Registro de uma reserva ou mesa removida (tombstone), para que a sincronização
+    incremental (GET /api/reservas/mudancas/) informe as exclusões aos clientes.
+    Descartado pela varredura depois de MUDANCAS_RETENCAO_DIAS.
+    """
+    
+    TIPO_CHOICES = [
+        ('reserva', 'Reserva'),
+        ('mesa', 'Mesa'),
+    ]
+    
+    # Sem chave estrangeira no banco: os registros são criados enquanto o próprio
+    # restaurante pode estar sendo excluído (cascata) e expiram pela retenção
+    restaurante = models.ForeignKey(
+        Restaurante,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name='Restaurante'
+    )
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES, verbose_name='Tipo')
+    objeto_id = models.PositiveBigIntegerField(verbose_name='ID Removido')
+    data_remocao = models.DateTimeField(default=timezone.now, verbose_name='Data de Remoção')
+    
+    class Meta:
+        verbose_name = 'Remoção'
+        verbose_name_plural = 'Remoções'
+        indexes = [
+            models.Index(fields=['restaurante', 'data_remocao']),
+            models.Index(fields=['data_remocao']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.objeto_id} removida em {self.data_remocao}"
+
+
+@receiver([post_save, post_delete], sender=Reserva)
+def invalidar_painel_reserva(sender, instance, **kwargs):
+    """Signal para descartar o painel em cache do restaurante quando uma reserva muda"""
+    from restaurantes.painel import invalidar_painel
+    invalidar_painel(instance.restaurante_id)
+
+
+@receiver(post_delete, sender=Reserva)
+def registrar_remocao_reserva(sender, instance, **kwargs):
+    """Signal para registrar a remoção de reservas de hoje em diante (as antigas saem pelo arquivo)"""
+    if instance.data_reserva >= timezone.now().date():
+        Remocao.objects.create(restaurante_id=instance.restaurante_id, tipo='reserva', objeto_id=instance.id)
+
+
+@receiver(post_delete, sender=Mesa)
+def registrar_remocao_mesa(sender, instance, **kwargs):
+    """Signal para registrar a remoção de mesas (sincronização incremental)"""
+    Remocao.objects.create(restaurante_id=instance.restaurante_id, tipo='mesa', objeto_id=instance.id)
@@ -0,0 +1,114 @@
+"""
+Mapa de ocupação das mesas por dia (OcupacaoMesaDia).
+
+Cada mesa tem, por dia, um mapa de 96 bits (faixas de 15 minutos). Uma reserva
+ativa no horário H marca as faixas que cruzam [H, H + 1h]; assim, duas reservas
+conflitam pela regra de ±1h exatamente quando os mapas se sobrepõem (para
+horários fora da grade de 15 minutos o teste é conservador: pode acusar conflito
+até 15 minutos além da janela, nunca menos).
+
+A disponibilidade passa a ser uma consulta pelo índice (mesa, data) e um AND
+por mesa. O mapa é atualizado de forma incremental na alocação (OR com a
+máscara da reserva) e recalculado a partir dos vínculos ReservaMesa quando
+mesas são liberadas (cancelamento, conclusão, edição ou exclusão), sempre com
+o restaurante travado. `python manage.py reconstruir_ocupacao` reconstrói os mapas.
+Toda atualização descarta a disponibilidade em cache do restaurante (utils.cache).
+"""
+
+from collections import defaultdict
+
+from django.db.models import OuterRef, Subquery
+
+from .alocacao import JANELA_CONFLITO, STATUS_ATIVOS, invalidar_disponibilidade
+from .models import OcupacaoMesaDia, ReservaMesa
+
+MINUTOS_POR_SLOT = 15
+SLOTS_POR_DIA = 24 * 60 // MINUTOS_POR_SLOT
+TAMANHO_BYTES = SLOTS_POR_DIA // 8
+MINUTOS_OCUPADOS = int(JANELA_CONFLITO.total_seconds() // 60)
+
+
+def mascara(horario):
+    """Bits das faixas ocupadas por uma reserva no horário informado"""
+    minuto = horario.hour * 60 + horario.minute
+    inicio = minuto // MINUTOS_POR_SLOT
+    fim = min((minuto + MINUTOS_OCUPADOS) // MINUTOS_POR_SLOT, SLOTS_POR_DIA - 1)
+    return ((1 << (fim - inicio + 1)) - 1) << inicio
+
+
+def de_bytes(valor):
+    """Converte o conteúdo do campo `slots` (ou None) em inteiro"""
+    return int.from_bytes(bytes(valor), 'big') if valor else 0
+
+
+def para_bytes(bits):
+    return bits.to_bytes(TAMANHO_BYTES, 'big')
+
+
+def anotar_ocupacao(mesas, data):
+    """Anota `slots_dia` (bytes do mapa do dia) em um QuerySet de mesas, sem consulta extra"""
+    return mesas.annotate(
+        slots_dia=Subquery(
+            OcupacaoMesaDia.objects.filter(mesa=OuterRef('pk'), data=data).values('slots')[:1]
+        )
+    )
+
+
+def mapa_do_dia(restaurante_id, data):
+    """Mapa {mesa_id: bits} do restaurante no dia, com uma consulta pelo índice"""
+    return {
+        mesa_id: de_bytes(slots)
+        for mesa_id, slots in OcupacaoMesaDia.objects.filter(
+            restaurante_id=restaurante_id, data=data
+        ).values_list('mesa_id', 'slots')
+    }
+
+
+def gravar(restaurante_id, data, mapa):
+    """Grava (insere ou atualiza) os mapas informados com um único comando"""
+    if not mapa:
+        return
+    OcupacaoMesaDia.objects.bulk_create(
+        [
+            OcupacaoMesaDia(restaurante_id=restaurante_id, mesa_id=mesa_id, data=data, slots=para_bytes(bits))
+            for mesa_id, bits in mapa.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['mesa', 'data'],
+        update_fields=['slots'],
+    )
+    invalidar_disponibilidade(restaurante_id, data)
+
+
+def ocupar(restaurante_id, data, horario, mesas):
+    """
+    Marca o horário como ocupado nas mesas alocadas.
+    As mesas devem vir de `anotar_ocupacao` (mapa lido com o restaurante travado).
+    """
+    bits_reserva = mascara(horario)
+    gravar(restaurante_id, data, {
+        mesa.id: de_bytes(mesa.slots_dia) | bits_reserva for mesa in mesas
+    })
+
+
+def recalcular(restaurante_id, data):
+    """
+    Reconstrói os mapas do restaurante no dia a partir das reservas ativas.
+    Deve ser chamado com o restaurante travado (ver alocacao.liberar_ocupacao).
+    """
+    mapa = defaultdict(int)
+    for mesa_id, horario in ReservaMesa.objects.filter(
+        reserva__restaurante_id=restaurante_id,
+        reserva__data_reserva=data,
+        reserva__status__in=STATUS_ATIVOS,
+    ).values_list('mesa_id', 'reserva__horario'):
+        mapa[mesa_id] |= mascara(horario)
+
+    OcupacaoMesaDia.objects.filter(restaurante_id=restaurante_id, data=data).exclude(
+        mesa_id__in=list(mapa)
+    ).delete()
+    if mapa:
+        gravar(restaurante_id, data, mapa)
+    else:
+        invalidar_disponibilidade(restaurante_id, data)
+
@@ -0,0 +1,126 @@
+"""
+Particionamento mensal da tabela de reservas (PostgreSQL).
+
+A migração 0007 converte `reservas_reserva` em uma tabela particionada por faixa
+de `data_reserva` (PARTITION BY RANGE), com uma partição padrão
+(`reservas_reserva_padrao`) que recebe as datas sem partição própria. O comando
+`criar_particoes` cria as partições mensais (`reservas_reserva_pAAAA_MM`): as do
+histórico, movendo as linhas que estavam na partição padrão, e as dos próximos
+meses, com antecedência.
+
+Consultas com filtro em `data_reserva` (reservas de hoje, disponibilidade,
+relatórios por período) leem apenas as partições do período (partition pruning).
+
+O PostgreSQL exige que a chave primária de uma tabela particionada inclua a chave
+de partição, então ela passa a ser (id, data_reserva) e nenhuma tabela pode ter
+FOREIGN KEY apontando só para `reservas_reserva.id`. Por isso ReservaMesa,
+Notificacao e ListaEspera referenciam Reserva sem constraint no banco
+(db_constraint=False): a exclusão em cascata continua sendo feita pelo Django e
+`criar_particoes --verificar` aponta vínculos órfãos criados fora do ORM.
+
+Em outros bancos (SQLite em desenvolvimento) a tabela continua comum e o comando
+não faz nada.
+"""
+
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+TABELA = 'reservas_reserva'
+PARTICAO_PADRAO = 'reservas_reserva_padrao'
+
+
+def inicio_do_mes(data):
+    return data.replace(day=1)
+
+
+def mes_seguinte(mes):
+    return (mes.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def meses(inicio, fim):
+    """Primeiro dia de cada mês entre as datas (inclusive)"""
+    mes = inicio_do_mes(inicio)
+    while mes <= fim:
+        yield mes
+        mes = mes_seguinte(mes)
+
+
+def nome_particao(mes):
+    return f'{TABELA}_p{mes:%Y_%m}'
+
+
+def particionada():
+    """Indica se a tabela de reservas está particionada (apenas PostgreSQL)"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))',
+            [TABELA]
+        )
+        return cursor.fetchone()[0]
+
+
+def particoes():
+    """Partições existentes, como lista de (nome, limites)"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) '
+            'FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname',
+            [TABELA]
+        )
+        return cursor.fetchall()
+
+
+def primeira_data_na_padrao():
+    """Data mais antiga guardada na partição padrão (None se estiver vazia)"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN(data_reserva) FROM {PARTICAO_PADRAO}')
+        return cursor.fetchone()[0]
+
+
+def criar_particao(mes):
+    """
+    Cria a partição do mês, movendo para ela as linhas do período que estavam na
+    partição padrão. Retorna quantas linhas foram movidas, ou None se a partição já existia.
+    """
+    nome = nome_particao(mes)
+    inicio, fim = mes.isoformat(), mes_seguinte(mes).isoformat()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [nome])
+        if cursor.fetchone()[0]:
+            return None
+
+        # Bloqueia novas reservas enquanto as linhas saem da partição padrão;
+        # sem linhas no período (meses futuros) o bloqueio dura milissegundos
+        cursor.execute(f'LOCK TABLE {TABELA} IN SHARE ROW EXCLUSIVE MODE')
+        cursor.execute(f'CREATE TABLE {nome} (LIKE {TABELA} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(
+            f'WITH movidas AS ('
+            f'DELETE FROM {PARTICAO_PADRAO} WHERE data_reserva >= %s AND data_reserva < %s RETURNING *'
+            f') INSERT INTO {nome} SELECT * FROM movidas',
+            [inicio, fim]
+        )
+        movidas = cursor.rowcount
+        # Os índices e a chave primária da tabela particionada são criados na partição ao anexá-la
+        cursor.execute(
+            f"ALTER TABLE {TABELA} ATTACH PARTITION {nome} FOR VALUES FROM ('{inicio}') TO ('{fim}')"
+        )
+
+    return movidas
+
+
+def vinculos_orfaos():
+    """Quantidade de vínculos que apontam para reservas inexistentes, por modelo"""
+    from .models import ListaEspera, Notificacao, Reserva, ReservaMesa
+
+    existe = Exists(Reserva.objects.filter(id=OuterRef('reserva_id')))
+    return {
+        'ReservaMesa': ReservaMesa.objects.filter(~existe).count(),
+        'Notificacao': Notificacao.objects.filter(~existe).count(),
+        'ListaEspera': ListaEspera.objects.filter(reserva__isnull=False).filter(~existe).count(),
+    }
@@ -52,3 +52,23 @@ class IsAdminOrReadAuthenticated(permissions.BasePermission):
         return request.user.usuariopapel_set.filter(
             papel__tipo__in=['admin_sistema', 'admin_secundario']
         ).exists()
+
+
+def restaurantes_gerenciados(user):
+    """
+    IDs dos restaurantes cujas reservas o usuário pode gerenciar em lote.
+    Retorna None para admin_sistema (todos os restaurantes).
+    - admin_secundario: restaurantes dos quais é proprietário
+    - funcionario: restaurantes onde está vinculado
+    """
+    from restaurantes.models import Restaurante, RestauranteUsuario
+    
+    if user.usuariopapel_set.filter(papel__tipo='admin_sistema').exists():
+        return None
+    
+    proprios = Restaurante.objects.filter(proprietario=user).values_list('id', flat=True)
+    vinculados = RestauranteUsuario.objects.filter(
+        usuario=user,
+        papel__in=['admin_secundario', 'funcionario']
+    ).values_list('restaurante_id', flat=True)
+    return set(proprios) | set(vinculados)
@@ -1,12 +1,14 @@
 """
 Módulo de Relatórios de ocupação e movimentação.
 Endpoints de relatório de ocupação, horários mais movimentados e estatísticas por período.
+Os dias arquivados (reservas/arquivo.py) entram nos relatórios a partir dos resumos do arquivo.
 """
 
 from django.db.models import Count, Q, F, Case, When, DecimalField, Avg
 from django.utils import timezone
 from datetime import datetime, timedelta, date
 from rest_framework import serializers
+from .arquivo import arquivo_do_periodo
 from .models import Reserva, ReservaMesa
 
 
@@ -48,10 +50,11 @@ class RelatorioHelper:
     """Helper para gerar relatórios"""
     
     @staticmethod
-    def gerar_relatorio_ocupacao(restaurante_id=None, data_inicio=None, data_fim=None):
+    def gerar_relatorio_ocupacao(restaurante_id=None, data_inicio=None, data_fim=None, ao_progredir=None):
         """
         Gera relatório de ocupação de mesas.
         Calcula percentual de ocupação por restaurante/data.
+        `ao_progredir`, se informado, recebe o percentual concluído a cada restaurante.
         """
         from restaurantes.models import Restaurante
         from mesas.models import Mesa
@@ -68,8 +71,19 @@ class RelatorioHelper:
             restaurantes_qs = restaurantes_qs.filter(id=restaurante_id)
         
         relatorio = []
+        restaurantes = list(restaurantes_qs)
         
-        for restaurante in restaurantes_qs:
+        # Mesas ocupadas nos dias arquivados
+        dias_arquivados, _ = arquivo_do_periodo(data_inicio, data_fim, restaurante_id)
+        mesas_arquivadas = {
+            (arquivado_id, data): mesas
+            for arquivado_id, data, mesas in dias_arquivados.values_list('restaurante_id', 'data', 'mesas_ocupadas')
+        }
+        
+        for indice, restaurante in enumerate(restaurantes):
+            if ao_progredir:
+                ao_progredir(int(indice * 100 / len(restaurantes)))
+            
             # Calcular total de mesas
             total_mesas = Mesa.objects.filter(restaurante=restaurante, ativa=True).count()
             
@@ -94,6 +108,7 @@ class RelatorioHelper:
                     reserva__data_reserva=data_atual,
                     reserva__status__in=['pendente', 'confirmada', 'concluida']
                 ).values('mesa_id').distinct().count()
+                mesas_ocupadas += mesas_arquivadas.get((restaurante.id, data_atual), 0)
                 
                 # Contar reservas pendentes
                 reservas_pendentes = Reserva.objects.filter(
@@ -163,6 +178,14 @@ class RelatorioHelper:
             if reserva.status == 'confirmada':
                 horarios[chave]['confirmadas'] += 1
         
+        # Dias arquivados: apenas as reservas concluídas contam como movimento
+        _, horarios_arquivados = arquivo_do_periodo(data_inicio, data_fim, restaurante_id)
+        for arquivado in horarios_arquivados.filter(reservas_concluidas__gt=0).select_related('restaurante'):
+            chave = (arquivado.restaurante_id, arquivado.restaurante.nome, arquivado.horario)
+            stats = horarios.setdefault(chave, {'total_reservas': 0, 'pessoas_total': 0, 'confirmadas': 0})
+            stats['total_reservas'] += arquivado.reservas_concluidas
+            stats['pessoas_total'] += arquivado.pessoas_concluidas
+        
         # Montar resposta
         relatorio = []
         for (restaurante_id, restaurante_nome, horario), stats in horarios.items():
@@ -205,19 +228,19 @@ class RelatorioHelper:
         # Agrupar por período
         stats_por_periodo = {}
         
-        for reserva in reservas_qs:
+        def stats_do_periodo(data):
             if tipo_periodo == 'dia':
-                periodo_chave = str(reserva.data_reserva)
-                periodo_label = reserva.data_reserva.strftime('%d/%m/%Y')
+                periodo_chave = str(data)
+                periodo_label = data.strftime('%d/%m/%Y')
             elif tipo_periodo == 'semana':
-                ano, semana, _ = reserva.data_reserva.isocalendar()
+                ano, semana, _ = data.isocalendar()
                 periodo_chave = f"{ano}-W{semana:02d}"
                 periodo_label = f"Semana {semana}/{ano}"
             elif tipo_periodo == 'mes':
-                periodo_chave = reserva.data_reserva.strftime('%Y-%m')
-                periodo_label = reserva.data_reserva.strftime('%m/%Y')
+                periodo_chave = data.strftime('%Y-%m')
+                periodo_label = data.strftime('%m/%Y')
             else:
-                continue
+                return None
             
             if periodo_chave not in stats_por_periodo:
                 stats_por_periodo[periodo_chave] = {
@@ -228,16 +251,33 @@ class RelatorioHelper:
                     'pendentes': 0,
                     'pessoas': 0,
                 }
+            return stats_por_periodo[periodo_chave]
+        
+        for reserva in reservas_qs:
+            stats = stats_do_periodo(reserva.data_reserva)
+            if stats is None:
+                continue
             
-            stats_por_periodo[periodo_chave]['total'] += 1
-            stats_por_periodo[periodo_chave]['pessoas'] += reserva.quantidade_pessoas
+            stats['total'] += 1
+            stats['pessoas'] += reserva.quantidade_pessoas
             
             if reserva.status == 'confirmada':
-                stats_por_periodo[periodo_chave]['confirmadas'] += 1
+                stats['confirmadas'] += 1
             elif reserva.status == 'cancelada':
-                stats_por_periodo[periodo_chave]['canceladas'] += 1
+                stats['canceladas'] += 1
             elif reserva.status == 'pendente':
-                stats_por_periodo[periodo_chave]['pendentes'] += 1
+                stats['pendentes'] += 1
+        
+        # Dias arquivados (só têm reservas concluídas e canceladas)
+        _, horarios_arquivados = arquivo_do_periodo(data_inicio, data_fim, restaurante_id)
+        for arquivado in horarios_arquivados:
+            stats = stats_do_periodo(arquivado.data)
+            if stats is None:
+                continue
+            
+            stats['total'] += arquivado.reservas_concluidas + arquivado.reservas_canceladas
+            stats['pessoas'] += arquivado.pessoas_concluidas + arquivado.pessoas_canceladas
+            stats['canceladas'] += arquivado.reservas_canceladas
         
         # Montar resposta final
         relatorio = []
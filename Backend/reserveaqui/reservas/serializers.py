@@ -1,10 +1,9 @@
 from rest_framework import serializers
 from django.utils import timezone
 from datetime import timedelta, datetime, timezone as dt_timezone
-import math
-from .models import Reserva, ReservaMesa, Notificacao
-from mesas.models import Mesa
-from restaurantes.models import Restaurante
+from .models import Reserva, ReservaMesa, Notificacao, RelatorioAssincrono, ListaEspera
+from restaurantes.horarios import aberto_na_janela, esta_aberto, grade_do_restaurante
+from .alocacao import criar_reserva, realocar_mesas
 from .reports import (
     RelatorioOcupacaoSerializer,
     HorarioMovimentadoSerializer,
@@ -74,11 +73,14 @@ class ReservaCreateUpdateSerializer(serializers.ModelSerializer):
 
     ANTECEDENCIA_MINIMA_MINUTOS = 120
     
+    # Token retornado por POST /api/mesas/segurar/ (usa as mesas bloqueadas)
+    bloqueio = serializers.CharField(write_only=True, required=False, allow_blank=True)
+    
     class Meta:
         model = Reserva
         fields = [
             'restaurante', 'data_reserva', 'horario', 'quantidade_pessoas',
-            'nome_cliente', 'telefone_cliente', 'email_cliente', 'observacoes'
+            'nome_cliente', 'telefone_cliente', 'email_cliente', 'observacoes', 'bloqueio'
         ]
     
     def validate(self, data):
@@ -109,94 +111,48 @@ class ReservaCreateUpdateSerializer(serializers.ModelSerializer):
                 {'quantidade_pessoas': 'A quantidade de pessoas deve ser maior que zero.'}
             )
         
+        # Horário de funcionamento (grade em cache, antes de qualquer consulta de disponibilidade)
+        restaurante = self._restaurante(data)
+        if restaurante and (data_reserva or horario):
+            data_reserva = data_reserva or self.instance.data_reserva
+            horario = horario or self.instance.horario
+            if not esta_aberto(grade_do_restaurante(restaurante), data_reserva, horario):
+                raise serializers.ValidationError(
+                    {'horario': 'O restaurante não está aberto neste horário.'}
+                )
+        
         return data
     
+    def _restaurante(self, data):
+        return data.get('restaurante', getattr(self.instance, 'restaurante', None))
+    
     def validate_restaurante(self, value):
         """Validar que o restaurante está ativo"""
         if not value.ativo:
             raise serializers.ValidationError('Este restaurante não está disponível para reservas.')
         return value
     
-    def _verificar_disponibilidade(self, restaurante, data_reserva, horario, quantidade_pessoas, reserva_atual=None):
-        """
-        Verifica se há mesas disponíveis para a reserva.
-        Impedir reservas de uma mesma mesa no mesmo horário
-        """
-        # Calcular quantas mesas são necessárias
-        mesas_necessarias = math.ceil(quantidade_pessoas / 4)
-        
-        # Buscar reservas conflitantes (±1h)
-        data_hora = datetime.combine(data_reserva, horario)
-        inicio = (data_hora - timedelta(hours=1)).time()
-        fim = (data_hora + timedelta(hours=1)).time()
-        
-        # Buscar reservas conflitantes
-        reservas_conflitantes = Reserva.objects.filter(
-            restaurante=restaurante,
-            data_reserva=data_reserva,
-            horario__gte=inicio,
-            horario__lte=fim,
-            status__in=['pendente', 'confirmada']
-        )
-        
-        # Excluir a reserva atual em caso de edição
-        if reserva_atual:
-            reservas_conflitantes = reservas_conflitantes.exclude(id=reserva_atual.id)
-        
-        # Obter IDs das mesas ocupadas
-        mesas_ocupadas_ids = ReservaMesa.objects.filter(
-            reserva__in=reservas_conflitantes
-        ).values_list('mesa_id', flat=True)
-        
-        # Buscar mesas disponíveis
-        mesas_disponiveis = Mesa.objects.filter(
-            restaurante=restaurante,
-            ativa=True,
-            status='disponivel'
-        ).exclude(id__in=mesas_ocupadas_ids)
-        
-        if mesas_disponiveis.count() < mesas_necessarias:
-            raise serializers.ValidationError(
-                f'Não há mesas suficientes disponíveis. '
-                f'Necessárias: {mesas_necessarias}, Disponíveis: {mesas_disponiveis.count()}'
-            )
-        
-        return list(mesas_disponiveis[:mesas_necessarias])
-    
     def create(self, validated_data):
         """
         Cria uma reserva e aloca automaticamente as mesas necessárias.
         Validação para criar reservas
         """
-        restaurante = validated_data['restaurante']
-        data_reserva = validated_data['data_reserva']
-        horario = validated_data['horario']
-        quantidade_pessoas = validated_data['quantidade_pessoas']
-        
-        # Verificar disponibilidade e obter mesas disponíveis
-        mesas_disponiveis = self._verificar_disponibilidade(
-            restaurante, data_reserva, horario, quantidade_pessoas
-        )
+        bloqueio = validated_data.pop('bloqueio', None)
         
         # Adicionar usuário se autenticado
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             validated_data['usuario'] = request.user
         
-        # Criar a reserva
-        reserva = Reserva.objects.create(**validated_data)
-        
-        # Alocar mesas automaticamente
-        for mesa in mesas_disponiveis:
-            ReservaMesa.objects.create(reserva=reserva, mesa=mesa)
-        
-        return reserva
+        return criar_reserva(validated_data, bloqueio=bloqueio)
     
     def update(self, instance, validated_data):
         """
         Atualiza uma reserva com validações.
         Validação para editar reservas
         """
+        validated_data.pop('bloqueio', None)
+        
         # Validar se a reserva pode ser editada
         if instance.status in ['cancelada', 'concluida']:
             raise serializers.ValidationError(
@@ -220,22 +176,9 @@ class ReservaCreateUpdateSerializer(serializers.ModelSerializer):
         )
         
         if mudou_parametros:
-            restaurante = validated_data.get('restaurante', instance.restaurante)
-            data_reserva = validated_data.get('data_reserva', instance.data_reserva)
-            horario = validated_data.get('horario', instance.horario)
-            quantidade_pessoas = validated_data.get('quantidade_pessoas', instance.quantidade_pessoas)
-            
-            # Verificar disponibilidade
-            mesas_disponiveis = self._verificar_disponibilidade(
-                restaurante, data_reserva, horario, quantidade_pessoas, instance
-            )
-            
-            # Remover mesas antigas
-            ReservaMesa.objects.filter(reserva=instance).delete()
-            
-            # Alocar novas mesas
-            for mesa in mesas_disponiveis:
-                ReservaMesa.objects.create(reserva=instance, mesa=mesa)
+            # Verifica disponibilidade, substitui as mesas e salva a reserva na mesma transação
+            realocar_mesas(instance, validated_data)
+            return instance
         
         # Atualizar campos
         for attr, value in validated_data.items():
@@ -244,6 +187,137 @@ class ReservaCreateUpdateSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
+
+class ReservaImportacaoSerializer(ReservaCreateUpdateSerializer):
+    """
+    Valida uma linha da importação em lote.
+    O restaurante é recebido como ID e verificado uma vez por grupo, sem consulta por linha.
+    """
+    restaurante = serializers.IntegerField(min_value=1)
+    bloqueio = None
+    
+    class Meta(ReservaCreateUpdateSerializer.Meta):
+        fields = [campo for campo in ReservaCreateUpdateSerializer.Meta.fields if campo != 'bloqueio']
+    
+    def validate_restaurante(self, value):
+        return value
+    
+    def _restaurante(self, data):
+        # O horário de funcionamento é verificado pela importação, com a grade de cada restaurante
+        return None
+
+class BloqueioMesasSerializer(ReservaCreateUpdateSerializer):
+    """Dados para bloquear temporariamente as mesas de uma reserva em andamento"""
+    bloqueio = None
+    
+    class Meta(ReservaCreateUpdateSerializer.Meta):
+        fields = ['restaurante', 'data_reserva', 'horario', 'quantidade_pessoas']
+
+
+class SugestaoHorariosSerializer(serializers.Serializer):
+    """Parâmetros da busca dos horários viáveis mais próximos"""
+    restaurante = serializers.IntegerField(min_value=1)
+    data_reserva = serializers.DateField()
+    horario = serializers.TimeField()
+    quantidade_pessoas = serializers.IntegerField(min_value=1)
+    quantidade = serializers.IntegerField(required=False, min_value=1, max_value=20)
+    horizonte_dias = serializers.IntegerField(required=False, min_value=0, max_value=14)
+    granularidade_minutos = serializers.IntegerField(required=False, min_value=5, max_value=240)
+
+
+class SugestaoHorarioSerializer(serializers.Serializer):
+    """Horário sugerido"""
+    data_reserva = serializers.DateField()
+    horario = serializers.TimeField(format='%H:%M')
+    mesas_disponiveis = serializers.IntegerField()
+
+
+class CapacidadeConsultaSerializer(serializers.Serializer):
+    """Parâmetros da curva de capacidade do dia"""
+    restaurante = serializers.IntegerField(min_value=1)
+    data_reserva = serializers.DateField()
+    horario = serializers.TimeField(required=False)
+    granularidade_minutos = serializers.IntegerField(required=False, min_value=5, max_value=240, default=15)
+
+
+class CapacidadeHorarioSerializer(serializers.Serializer):
+    """Capacidade em um horário"""
+    horario = serializers.TimeField(format='%H:%M')
+    mesas_disponiveis = serializers.IntegerField()
+    capacidade_maxima = serializers.IntegerField()
+
+
+class TransicaoEmLoteSerializer(serializers.Serializer):
+    """Parâmetros da transição de status em lote"""
+    LIMITE_IDS = 500
+    
+    acao = serializers.ChoiceField(choices=['confirmar', 'cancelar', 'concluir'])
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=LIMITE_IDS
+    )
+
+class ListaEsperaSerializer(serializers.ModelSerializer):
+    """Entrada na lista de espera (janela de horários aceitos para a reserva)"""
+    restaurante_nome = serializers.CharField(source='restaurante.nome', read_only=True)
+    
+    class Meta:
+        model = ListaEspera
+        fields = [
+            'id', 'restaurante', 'restaurante_nome', 'data_reserva', 'horario_inicio',
+            'horario_fim', 'quantidade_pessoas', 'nome_cliente', 'telefone_cliente',
+            'status', 'reserva', 'data_criacao'
+        ]
+        read_only_fields = ['id', 'status', 'reserva', 'data_criacao']
+    
+    def validate_restaurante(self, value):
+        """Validar que o restaurante está ativo"""
+        if not value.ativo:
+            raise serializers.ValidationError('Este restaurante não está disponível para reservas.')
+        return value
+    
+    def validate_quantidade_pessoas(self, value):
+        if value < 1:
+            raise serializers.ValidationError('A quantidade de pessoas deve ser maior que zero.')
+        return value
+    
+    def validate(self, data):
+        """Validar a janela de horários e a antecedência mínima"""
+        if data['horario_fim'] < data['horario_inicio']:
+            raise serializers.ValidationError(
+                {'horario_fim': 'O horário final deve ser igual ou posterior ao horário inicial.'}
+            )
+        
+        fim_janela = datetime.combine(data['data_reserva'], data['horario_fim'], tzinfo=dt_timezone.utc)
+        limite_minimo = timezone.now() + timedelta(minutes=Reserva.ANTECEDENCIA_MINIMA_MINUTOS)
+        if fim_janela < limite_minimo:
+            raise serializers.ValidationError(
+                {'horario_fim': 'A janela deve terminar com no mínimo 2 horas de antecedência.'}
+            )
+        
+        if not aberto_na_janela(
+            grade_do_restaurante(data['restaurante']),
+            data['data_reserva'], data['horario_inicio'], data['horario_fim']
+        ):
+            raise serializers.ValidationError(
+                {'horario_inicio': 'O restaurante não está aberto em nenhum horário desta janela.'}
+            )
+        
+        request = self.context.get('request')
+        if request and ListaEspera.objects.filter(
+            usuario=request.user,
+            restaurante=data['restaurante'],
+            data_reserva=data['data_reserva'],
+            status='aguardando',
+        ).exists():
+            raise serializers.ValidationError(
+                'Você já está na lista de espera deste restaurante para esta data.'
+            )
+        
+        return data
+
+
 class NotificacaoSerializer(serializers.ModelSerializer):
     """Serializer para notificações de reservas"""
     reserva_id = serializers.IntegerField(source='reserva.id', read_only=True)
@@ -258,4 +332,36 @@ class NotificacaoSerializer(serializers.ModelSerializer):
             'lido', 'reserva_id', 'reserva_restaurante', 'reserva_data',
             'reserva_horario', 'data_criacao', 'data_leitura'
         ]
-        read_only_fields = ['id', 'data_criacao', 'data_leitura']
\ No newline at end of file
+        read_only_fields = ['id', 'data_criacao', 'data_leitura']
+
+
+class RelatorioAssincronoCreateSerializer(serializers.Serializer):
+    """Parâmetros aceitos para enfileirar um relatório"""
+    tipo = serializers.ChoiceField(choices=RelatorioAssincrono.TIPO_CHOICES)
+    restaurante_id = serializers.IntegerField(required=False, allow_null=True)
+    data_inicio = serializers.DateField(required=False, allow_null=True)
+    data_fim = serializers.DateField(required=False, allow_null=True)
+    top = serializers.IntegerField(required=False, min_value=1, default=10)
+    tipo_periodo = serializers.ChoiceField(choices=['dia', 'semana', 'mes'], required=False, default='dia')
+    
+    def validate(self, data):
+        """Validar intervalo de datas"""
+        data_inicio = data.get('data_inicio')
+        data_fim = data.get('data_fim')
+        if data_inicio and data_fim and data_fim < data_inicio:
+            raise serializers.ValidationError(
+                {'data_fim': 'A data final deve ser igual ou posterior à data inicial.'}
+            )
+        return data
+
+
+class RelatorioAssincronoSerializer(serializers.ModelSerializer):
+    """Serializer de status de um relatório assíncrono (sem o resultado)"""
+    
+    class Meta:
+        model = RelatorioAssincrono
+        fields = [
+            'id', 'tipo', 'parametros', 'status', 'progresso', 'job_id',
+            'erro', 'data_criacao', 'data_conclusao'
+        ]
+        read_only_fields = fields
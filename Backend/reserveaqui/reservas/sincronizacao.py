@@ -0,0 +1,112 @@
+"""
+Sincronização incremental das telas da equipe (GET /api/reservas/mudancas/).
+
+Sem `desde`, a resposta é o estado completo do dia (as reservas de
+/reservas/hoje/ e as mesas do restaurante) com `completo: true` e um `cursor`.
+Com `desde=<cursor>`, vêm apenas as reservas e mesas com data_atualizacao
+posterior ao cursor (índices em (restaurante, data_atualizacao)) e os ids que
+saíram da lista desde então: reservas excluídas (Remocao), movidas para outro
+dia ou, para a equipe, que deixaram os status visíveis. O cliente aplica as
+mudanças sobre a cópia local e usa o novo cursor na chamada seguinte.
+
+O cursor é o instante do início da consulta. As linhas são relidas a partir de
+cursor - MUDANCAS_MARGEM_SEGUNDOS porque data_atualizacao é gravado antes do
+commit; repetir uma linha dentro da margem é inofensivo para o cliente. Cursores
+de outro dia ou mais antigos que MUDANCAS_RETENCAO_DIAS (remoções já
+descartadas) recebem o estado completo.
+"""
+
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+FORMATO_CURSOR = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+
+def formatar_cursor(momento):
+    """Cursor em UTC com sufixo Z (sem '+', que viraria espaço numa query string sem escape)"""
+    return momento.astimezone(dt_timezone.utc).strftime(FORMATO_CURSOR)
+
+
+def ler_cursor(valor):
+    """Instante do cursor (aware, em UTC) ou None se inválido"""
+    try:
+        momento = parse_datetime(valor.strip().replace(' ', '+'))
+    except ValueError:
+        return None
+    if momento is None:
+        return None
+    if timezone.is_naive(momento):
+        momento = timezone.make_aware(momento, dt_timezone.utc)
+    return momento.astimezone(dt_timezone.utc)
+
+
+def _serializar(restaurante, reservas, mesas):
+    from mesas.serializers import MesaSerializer
+    from .serializers import ReservaListSerializer
+
+    # O restaurante já está carregado (restaurante_nome nos serializers)
+    for objeto in (*reservas, *mesas):
+        objeto.restaurante = restaurante
+    return (
+        list(ReservaListSerializer(reservas, many=True).data),
+        list(MesaSerializer(mesas, many=True).data),
+    )
+
+
+def mudancas(restaurante, desde=None, somente_visiveis=True):
+    """
+    Mudanças das reservas de hoje e das mesas do restaurante desde o cursor.
+    `somente_visiveis` restringe as reservas aos status que a equipe vê em /hoje/.
+    """
+    from .models import Remocao, Reserva
+    from .views import ReservaViewSet
+
+    agora = timezone.now()
+    hoje = agora.date()
+    visiveis = ReservaViewSet.STATUS_VISUALIZACAO_RESTAURANTE if somente_visiveis else None
+
+    completo = (
+        desde is None
+        or desde.date() != hoje
+        or desde < agora - timedelta(days=settings.MUDANCAS_RETENCAO_DIAS)
+    )
+
+    reservas = Reserva.objects.filter(restaurante=restaurante).prefetch_related('mesas')
+    mesas = restaurante.mesas.all()
+    removidas = {'reservas': [], 'mesas': []}
+
+    if completo:
+        reservas = reservas.filter(data_reserva=hoje)
+        if visiveis:
+            reservas = reservas.filter(status__in=visiveis)
+        reservas = list(reservas.order_by('horario'))
+        mesas = list(mesas.order_by('numero'))
+    else:
+        inicio = desde - timedelta(seconds=settings.MUDANCAS_MARGEM_SEGUNDOS)
+        alteradas = list(reservas.filter(data_atualizacao__gte=inicio).order_by('horario'))
+        mesas = list(mesas.filter(data_atualizacao__gte=inicio).order_by('numero'))
+
+        reservas = []
+        for reserva in alteradas:
+            if reserva.data_reserva == hoje and (not visiveis or reserva.status in visiveis):
+                reservas.append(reserva)
+            else:
+                # Saiu da lista do dia (ou nunca fez parte dela): o cliente descarta o id
+                removidas['reservas'].append(reserva.id)
+
+        for tipo, objeto_id in Remocao.objects.filter(
+            restaurante=restaurante, data_remocao__gte=inicio
+        ).values_list('tipo', 'objeto_id'):
+            removidas[f'{tipo}s'].append(objeto_id)
+
+    reservas, mesas = _serializar(restaurante, reservas, mesas)
+    return {
+        'cursor': formatar_cursor(agora),
+        'completo': completo,
+        'reservas': reservas,
+        'mesas': mesas,
+        'removidas': removidas,
+    }
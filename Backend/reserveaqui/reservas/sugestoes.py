@@ -0,0 +1,96 @@
+"""
+Sugestão dos horários viáveis mais próximos quando o horário pedido está lotado.
+
+Uma única varredura: as mesas do restaurante e os mapas de ocupação de todos
+os dias do horizonte são carregados com uma consulta cada; depois, cada horário
+candidato (na granularidade configurada, dentro do horário de funcionamento do
+restaurante) é testado em memória com um AND por mesa. Os bloqueios temporários de outros clientes contam
+como ocupação, como na alocação.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from mesas.models import Mesa
+from restaurantes import horarios
+from .alocacao import calcular_mesas_necessarias
+from .bloqueios import bloqueios_do_dia
+from .models import OcupacaoMesaDia, Reserva
+from .ocupacao import de_bytes, mascara
+
+
+def sugerir_horarios(restaurante, data_reserva, horario, quantidade_pessoas, usuario_id=None,
+                     quantidade=None, horizonte_dias=None, granularidade_minutos=None):
+    """
+    Retorna até `quantidade` horários viáveis mais próximos do pedido, no mesmo dia
+    e nos `horizonte_dias` seguintes, ordenados pela distância ao horário pedido.
+    Cada sugestão traz a data, o horário e quantas mesas estão livres.
+    """
+    restaurante_id = restaurante.id
+    grade = horarios.grade_do_restaurante(restaurante)
+    quantidade = quantidade or settings.SUGESTOES_QUANTIDADE
+    horizonte_dias = settings.SUGESTOES_HORIZONTE_DIAS if horizonte_dias is None else horizonte_dias
+    granularidade_minutos = granularidade_minutos or settings.SUGESTOES_GRANULARIDADE_MINUTOS
+
+    necessarias = calcular_mesas_necessarias(quantidade_pessoas)
+    pedido = datetime.combine(data_reserva, horario, tzinfo=dt_timezone.utc)
+    limite_minimo = timezone.now() + timedelta(minutes=Reserva.ANTECEDENCIA_MINIMA_MINUTOS)
+    dias = [data_reserva + timedelta(days=dia) for dia in range(horizonte_dias + 1)]
+
+    mesas = list(
+        Mesa.objects.filter(restaurante_id=restaurante_id, ativa=True, status='disponivel')
+        .values_list('id', flat=True)
+    )
+    if len(mesas) < necessarias:
+        return []
+
+    # Mapas de todos os dias do horizonte em uma consulta; bloqueios somados por dia
+    ocupacao = defaultdict(lambda: defaultdict(int))
+    for data, mesa_id, slots in OcupacaoMesaDia.objects.filter(
+        restaurante_id=restaurante_id, data__in=dias
+    ).values_list('data', 'mesa_id', 'slots'):
+        ocupacao[data][mesa_id] |= de_bytes(slots)
+    for data in dias:
+        for bloqueio in bloqueios_do_dia(restaurante_id, data).values():
+            if bloqueio['usuario_id'] != usuario_id:
+                for mesa_id in bloqueio['mesas']:
+                    ocupacao[data][mesa_id] |= mascara(bloqueio['horario'])
+
+    candidatos = []
+    for data in dias:
+        mapas = [ocupacao[data][mesa_id] for mesa_id in mesas]
+        for candidato in horarios.horarios_do_dia(grade, data, granularidade_minutos):
+            momento = datetime.combine(data, candidato, tzinfo=dt_timezone.utc)
+            if momento < limite_minimo or momento == pedido:
+                continue
+            bits_horario = mascara(candidato)
+            livres = sum(1 for bits in mapas if not bits & bits_horario)
+            if livres >= necessarias:
+                candidatos.append((abs(momento - pedido), momento, livres))
+
+    candidatos.sort()
+    return [
+        {
+            'data_reserva': momento.date(),
+            'horario': momento.time(),
+            'mesas_disponiveis': livres,
+        }
+        for _, momento, livres in candidatos[:quantidade]
+    ]
+
+
+def erro_com_sugestoes(erro, usuario_id=None):
+    """Corpo da resposta 400 de MesasInsuficientes com os horários viáveis mais próximos"""
+    from restaurantes.models import Restaurante
+    from .serializers import SugestaoHorarioSerializer
+
+    sugestoes = sugerir_horarios(
+        Restaurante.objects.get(id=erro.restaurante_id), erro.data_reserva, erro.horario, erro.quantidade_pessoas, usuario_id
+    )
+    return {
+        'error': str(erro.detail[0]),
+        'sugestoes': SugestaoHorarioSerializer(sugestoes, many=True).data,
+    }
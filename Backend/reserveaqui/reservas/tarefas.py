@@ -0,0 +1,75 @@
+from datetime import date, time
+
+from django.utils import timezone
+
+from utils.jobs import tarefa
+from utils.replica import usando_replica
+from .models import RelatorioAssincrono
+from .reports import (
+    RelatorioHelper,
+    RelatorioOcupacaoSerializer,
+    HorarioMovimentadoSerializer,
+    EstatisticasSerieSerializer
+)
+
+
+def _marcar_erro(relatorio_id):
+    """Chamado quando o job do relatório esgota as tentativas"""
+    RelatorioAssincrono.objects.filter(id=relatorio_id).update(
+        status='erro',
+        erro='Não foi possível gerar o relatório. Tente novamente mais tarde.',
+        data_conclusao=timezone.now(),
+    )
+
+
+@tarefa('reservas.gerar_relatorio', ao_esgotar=_marcar_erro)
+def gerar_relatorio(relatorio_id):
+    """Gera um relatório do RelatorioHelper e grava o resultado serializado"""
+    relatorio = RelatorioAssincrono.objects.get(id=relatorio_id)
+    RelatorioAssincrono.objects.filter(id=relatorio_id).update(status='processando', progresso=0)
+
+    parametros = dict(relatorio.parametros)
+    for campo in ('data_inicio', 'data_fim'):
+        if parametros.get(campo):
+            parametros[campo] = date.fromisoformat(parametros[campo])
+
+    ultimo_progresso = [0]
+
+    def ao_progredir(percentual):
+        # Só grava quando o percentual muda, para não gerar um UPDATE por iteração
+        if percentual != ultimo_progresso[0]:
+            ultimo_progresso[0] = percentual
+            RelatorioAssincrono.objects.filter(id=relatorio_id).update(progresso=percentual)
+
+    # Os dados vêm da réplica de leitura; o progresso continua sendo gravado no principal
+    with usando_replica():
+        if relatorio.tipo == 'ocupacao':
+            dados = RelatorioHelper.gerar_relatorio_ocupacao(ao_progredir=ao_progredir, **parametros)
+            serializer = RelatorioOcupacaoSerializer(dados, many=True)
+        elif relatorio.tipo == 'horarios_movimentados':
+            dados = RelatorioHelper.gerar_relatorio_horarios_movimentados(**parametros)
+            serializer = HorarioMovimentadoSerializer(dados, many=True)
+        else:
+            dados = RelatorioHelper.gerar_relatorio_estatisticas_periodo(**parametros)
+            serializer = EstatisticasSerieSerializer(dados, many=True)
+
+    RelatorioAssincrono.objects.filter(id=relatorio_id).update(
+        status='concluido',
+        progresso=100,
+        resultado={
+            'tipo': relatorio.tipo,
+            'parametros': relatorio.parametros,
+            'total_registros': len(dados),
+            'dados': serializer.data,
+        },
+        erro='',
+        data_conclusao=timezone.now(),
+    )
+
+
+@tarefa('reservas.atender_lista_espera')
+def atender_lista_espera(restaurante_id, data_reserva, horario):
+    """Oferece as mesas liberadas por um cancelamento à lista de espera"""
+    from .lista_espera import atender_lista_espera as atender
+
+    atender(restaurante_id, date.fromisoformat(data_reserva), time.fromisoformat(horario))
@@ -1,12 +1,23 @@
-from django.test import TestCase
+import json
+import unittest
+from io import StringIO
+from django.test import AsyncClient, TestCase, override_settings
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.cache import caches
 from django.utils import timezone
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
 from datetime import timedelta, date, time
-from usuarios.models import Usuario
-from restaurantes.models import Restaurante
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from usuarios.models import Usuario, Papel
+from restaurantes.horarios import grade_do_restaurante
+from restaurantes.models import Restaurante, HorarioFuncionamento, ExcecaoHorario
 from mesas.models import Mesa
-from .models import Reserva, ReservaMesa
+from .models import Reserva, ReservaMesa, Notificacao, RelatorioAssincrono, ChaveIdempotencia, ListaEspera, OcupacaoMesaDia, Remocao
+from .bloqueios import bloqueios_do_dia, obter_bloqueio
 
 
 class ReservaModelTest(TestCase):
@@ -359,3 +370,1373 @@ class ReservaMesaModelTest(TestCase):
         self.assertEqual(self.reserva.mesas.count(), 2)
         self.assertIn(self.mesa, self.reserva.mesas.all())
         self.assertIn(mesa2, self.reserva.mesas.all())
+
+
+class VarrerReservasCommandTest(TestCase):
+    """Testes para o comando varrer_reservas"""
+    
+    def setUp(self):
+        """Criar reservas passadas e futuras"""
+        self.usuario = Usuario.objects.create_user(
+            email='cliente@test.com',
+            nome='Cliente Teste',
+            username='cliente_test',
+            password='SenhaForte123'
+        )
+        
+        self.proprietario = Usuario.objects.create_user(
+            email='proprietario@test.com',
+            nome='Proprietário',
+            username='prop_test',
+            password='SenhaForte123'
+        )
+        
+        self.restaurante = Restaurante.objects.create(
+            nome='Restaurante Test',
+            endereco='Rua Test, 123',
+            cidade='Test City',
+            estado='TC',
+            cep='99999-999',
+            email='test@restaurant.com',
+            proprietario=self.proprietario,
+            quantidade_mesas=3
+        )
+        self.mesas = list(self.restaurante.mesas.all())
+    
+    def _criar_reserva(self, horas, status, mesa):
+        """Cria reserva relativa a agora sem validação de antecedência"""
+        momento = timezone.now() + timedelta(hours=horas)
+        reserva = Reserva(
+            restaurante=self.restaurante,
+            usuario=self.usuario,
+            data_reserva=momento.date(),
+            horario=momento.time(),
+            quantidade_pessoas=4,
+            nome_cliente='Cliente',
+            telefone_cliente='999999999',
+            status=status
+        )
+        reserva.save(skip_validation=True)
+        ReservaMesa.objects.create(reserva=reserva, mesa=mesa)
+        return reserva
+    
+    def test_conclui_confirmadas_e_expira_pendentes(self):
+        """Teste que reservas vencidas mudam de status em lote"""
+        confirmada = self._criar_reserva(-3, 'confirmada', self.mesas[0])
+        pendente = self._criar_reserva(-3, 'pendente', self.mesas[1])
+        futura = self._criar_reserva(5, 'pendente', self.mesas[2])
+        
+        call_command('varrer_reservas', '--tamanho-lote', '1', stdout=StringIO())
+        
+        confirmada.refresh_from_db()
+        pendente.refresh_from_db()
+        futura.refresh_from_db()
+        self.assertEqual(confirmada.status, 'concluida')
+        self.assertEqual(pendente.status, 'cancelada')
+        self.assertEqual(futura.status, 'pendente')
+        
+        # Mesas da pendente expirada são liberadas; as demais permanecem
+        self.assertFalse(ReservaMesa.objects.filter(reserva=pendente).exists())
+        self.assertTrue(ReservaMesa.objects.filter(reserva=confirmada).exists())
+        self.assertEqual(Notificacao.objects.filter(usuario=self.usuario).count(), 2)
+    
+    def test_dry_run_nao_altera(self):
+        """Teste que --dry-run não grava alterações"""
+        pendente = self._criar_reserva(-3, 'pendente', self.mesas[0])
+        
+        call_command('varrer_reservas', '--dry-run', stdout=StringIO())
+        
+        pendente.refresh_from_db()
+        self.assertEqual(pendente.status, 'pendente')
+        self.assertFalse(Notificacao.objects.exists())
+
+
+@override_settings(JOBS_EXECUTAR_SINCRONO=True)
+class RelatorioAssincronoApiTest(TestCase):
+    """Testes para os endpoints de relatórios assíncronos"""
+    
+    def setUp(self):
+        """Criar admin do sistema e restaurante"""
+        self.admin = Usuario.objects.create_user(
+            email='admin@test.com',
+            nome='Admin',
+            username='admin_test',
+            password='SenhaForte123'
+        )
+        self.admin.papeis.add(Papel.objects.get(tipo='admin_sistema'))
+        
+        self.restaurante = Restaurante.objects.create(
+            nome='Restaurante Test',
+            endereco='Rua Test, 123',
+            cidade='Test City',
+            estado='TC',
+            cep='99999-999',
+            email='test@restaurant.com',
+            proprietario=self.admin,
+            quantidade_mesas=2
+        )
+        
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+    
+    def test_enfileirar_consultar_e_baixar_relatorio(self):
+        """Teste do fluxo completo: enfileirar, consultar status e baixar"""
+        response = self.client.post('/api/reservas/relatorios/', {
+            'tipo': 'ocupacao',
+            'restaurante_id': self.restaurante.id,
+            'data_inicio': '2026-01-01',
+            'data_fim': '2026-01-03',
+        }, format='json')
+        self.assertEqual(response.status_code, 202)
+        relatorio_id = response.data['relatorio']['id']
+        
+        response = self.client.get(f'/api/reservas/relatorios/{relatorio_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'concluido')
+        self.assertEqual(response.data['progresso'], 100)
+        
+        response = self.client.get(f'/api/reservas/relatorios/{relatorio_id}/download/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment', response['Content-Disposition'])
+        conteudo = response.json()
+        self.assertEqual(conteudo['total_registros'], 3)
+    
+    def test_download_relatorio_pendente(self):
+        """Teste que relatório não concluído não pode ser baixado"""
+        relatorio = RelatorioAssincrono.objects.create(usuario=self.admin, tipo='ocupacao')
+        
+        response = self.client.get(f'/api/reservas/relatorios/{relatorio.id}/download/')
+        self.assertEqual(response.status_code, 409)
+    
+    def test_relatorio_de_outro_usuario(self):
+        """Teste que um usuário não acessa relatórios de outro"""
+        outro = Usuario.objects.create_user(
+            email='outro@test.com',
+            nome='Outro',
+            username='outro_test',
+            password='SenhaForte123'
+        )
+        relatorio = RelatorioAssincrono.objects.create(usuario=outro, tipo='ocupacao')
+        
+        response = self.client.get(f'/api/reservas/relatorios/{relatorio.id}/')
+        self.assertEqual(response.status_code, 404)
+
+
+class ExportarReservasApiTest(TestCase):
+    """Testes para a exportação em streaming de reservas"""
+    
+    def setUp(self):
+        """Criar cliente com reservas próprias e de terceiros"""
+        self.cliente = Usuario.objects.create_user(
+            email='cliente@test.com',
+            nome='Cliente Teste',
+            username='cliente_test',
+            password='SenhaForte123'
+        )
+        self.outro = Usuario.objects.create_user(
+            email='outro@test.com',
+            nome='Outro Cliente',
+            username='outro_test',
+            password='SenhaForte123'
+        )
+        self.restaurante = Restaurante.objects.create(
+            nome='Restaurante Test',
+            endereco='Rua Test, 123',
+            cidade='Test City',
+            estado='TC',
+            cep='99999-999',
+            email='test@restaurant.com',
+            proprietario=self.outro,
+            quantidade_mesas=0
+        )
+        
+        momento = timezone.now() + timedelta(days=2)
+        for usuario, nome in [(self.cliente, 'Ana'), (self.cliente, 'Bruno'), (self.outro, 'Carla')]:
+            Reserva.objects.create(
+                restaurante=self.restaurante,
+                usuario=usuario,
+                data_reserva=momento.date(),
+                horario=momento.time(),
+                quantidade_pessoas=2,
+                nome_cliente=nome,
+                telefone_cliente='999999999'
+            )
+        
+        self.client = APIClient()
+        self.client.force_authenticate(self.cliente)
+    
+    def test_exportar_csv_respeita_escopo(self):
+        """Teste que o CSV contém cabeçalho e apenas reservas do cliente"""
+        response = self.client.get('/api/reservas/exportar/', {'formato': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        
+        linhas = b''.join(response.streaming_content).decode().strip().splitlines()
+        self.assertTrue(linhas[0].startswith('id,restaurante_id,restaurante_nome'))
+        self.assertEqual(len(linhas), 3)
+        self.assertNotIn('Carla', ''.join(linhas))
+    
+    def test_exportar_ndjson(self):
+        """Teste que o NDJSON gera um objeto por linha"""
+        response = self.client.get('/api/reservas/exportar/', {'formato': 'ndjson'})
+        linhas = b''.join(response.streaming_content).decode().strip().splitlines()
+        
+        self.assertEqual(len(linhas), 2)
+        self.assertEqual(
+            {json.loads(linha)['nome_cliente'] for linha in linhas},
+            {'Ana', 'Bruno'}
+        )
+    
+    def test_exportar_formato_invalido(self):
+        """Teste de formato não suportado"""
+        response = self.client.get('/api/reservas/exportar/', {'formato': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+
+# Bloqueios e cache da aplicação em memória do processo (em produção ficam em caches compartilhados)
+CACHES_TESTE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'bloqueios': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bloqueios-teste'},
+    'compartilhado': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'compartilhado-teste'},
+}
+
+
+@override_settings(CACHES=CACHES_TESTE)
+class ReservaApiTestBase(TestCase):
+    """Base dos testes de API de reservas: restaurante com 3 mesas e cliente autenticado"""
+    
+    def setUp(self):
+        """Criar restaurante com 3 mesas e cliente autenticado"""
+        self.cliente = Usuario.objects.create_user(
+            email='cliente@test.com',
+            nome='Cliente Teste',
+            username='cliente_test',
+            password='SenhaForte123'
+        )
+        self.proprietario = Usuario.objects.create_user(
+            email='proprietario@test.com',
+            nome='Proprietário',
+            username='prop_test',
+            password='SenhaForte123'
+        )
+        self.restaurante = Restaurante.objects.create(
+            nome='Restaurante Test',
+            endereco='Rua Test, 123',
+            cidade='Test City',
+            estado='TC',
+            cep='99999-999',
+            email='test@restaurant.com',
+            proprietario=self.proprietario,
+            quantidade_mesas=3
+        )
+        
+        self.data_reserva = (timezone.now() + timedelta(days=2)).date()
+        caches['bloqueios'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.cliente)
+    
+    def _autenticar(self, usuario):
+        """
+        Autentica o APIClient também pelo token JWT de acesso: as views assíncronas
+        só leem o cabeçalho Authorization
+        """
+        self.client.force_authenticate(usuario)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(usuario).access_token}')
+    
+    def _payload(self, horario='19:00', pessoas=6):
+        return {
+            'restaurante': self.restaurante.id,
+            'data_reserva': self.data_reserva.isoformat(),
+            'horario': horario,
+            'quantidade_pessoas': pessoas,
+            'nome_cliente': 'Cliente Teste',
+            'telefone_cliente': '999999999',
+        }
+
+
+class CriarReservaApiTest(ReservaApiTestBase):
+    """Testes para a criação de reservas com alocação de mesas"""
+    
+    def test_criar_reserva_aloca_mesas(self):
+        """Teste que a resposta traz as mesas alocadas em ordem de número"""
+        response = self.client.post('/api/reservas/', self._payload(), format='json')
+        
+        self.assertEqual(response.status_code, 201)
+        mesas = response.data['reserva']['mesas_vinculadas']
+        self.assertEqual([m['mesa_numero'] for m in mesas], [1, 2])
+        self.assertEqual(ReservaMesa.objects.filter(reserva_id=response.data['reserva']['id']).count(), 2)
+    
+    def test_orcamento_de_consultas(self):
+        """Teste que a criação usa um número fixo de consultas, independente das mesas"""
+        # restaurante, savepoint, lock, mesas livres, insert reserva, insert mesas,
+        # mapa de ocupação, release (a grade de horários já está em cache)
+        grade_do_restaurante(self.restaurante)
+        with self.assertNumQueries(8):
+            response = self.client.post('/api/reservas/', self._payload(pessoas=12), format='json')
+        self.assertEqual(response.status_code, 201)
+    
+    def test_mesas_insuficientes(self):
+        """Teste que reservas conflitantes (±1h) reduzem as mesas disponíveis"""
+        self.client.post('/api/reservas/', self._payload(horario='19:00', pessoas=8), format='json')
+        
+        response = self.client.post('/api/reservas/', self._payload(horario='19:30', pessoas=8), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Necessárias: 2, Disponíveis: 1', str(response.data))
+        
+        # Fora da janela de conflito as mesas voltam a estar livres
+        response = self.client.post('/api/reservas/', self._payload(horario='21:00', pessoas=8), format='json')
+        self.assertEqual(response.status_code, 201)
+    
+    def test_antecedencia_minima_formato_de_erro(self):
+        """Teste que o erro de antecedência mantém o formato {error, detail}"""
+        payload = self._payload()
+        payload['data_reserva'] = timezone.now().date().isoformat()
+        payload['horario'] = (timezone.now() + timedelta(minutes=30)).strftime('%H:%M')
+        
+        response = self.client.post('/api/reservas/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Data e horário inválidos')
+        self.assertIn('2 horas de antecedência', response.data['detail'])
+
+
+class IdempotenciaReservaApiTest(ReservaApiTestBase):
+    """Testes para o cabeçalho Idempotency-Key nas ações de reservas"""
+    
+    def test_repeticao_devolve_resposta_guardada(self):
+        """Teste que a repetição não cria outra reserva nem realoca mesas"""
+        primeira = self.client.post(
+            '/api/reservas/', self._payload(), format='json', HTTP_IDEMPOTENCY_KEY='chave-1'
+        )
+        self.assertEqual(primeira.status_code, 201)
+        
+        with self.assertNumQueries(1):
+            repetida = self.client.post(
+                '/api/reservas/', self._payload(), format='json', HTTP_IDEMPOTENCY_KEY='chave-1'
+            )
+        
+        self.assertEqual(repetida.status_code, 201)
+        self.assertEqual(repetida['Idempotent-Replayed'], 'true')
+        self.assertEqual(repetida.json()['reserva']['id'], primeira.data['reserva']['id'])
+        self.assertEqual(Reserva.objects.count(), 1)
+    
+    def test_chave_reutilizada_com_outro_corpo(self):
+        """Teste que a mesma chave com payload diferente é rejeitada"""
+        self.client.post('/api/reservas/', self._payload(), format='json', HTTP_IDEMPOTENCY_KEY='chave-1')
+        
+        response = self.client.post(
+            '/api/reservas/', self._payload(pessoas=2), format='json', HTTP_IDEMPOTENCY_KEY='chave-1'
+        )
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Reserva.objects.count(), 1)
+    
+    def test_chave_expirada_executa_novamente(self):
+        """Teste que após o TTL a chave volta a executar a operação"""
+        self.client.post('/api/reservas/', self._payload(), format='json', HTTP_IDEMPOTENCY_KEY='chave-1')
+        ChaveIdempotencia.objects.update(expira_em=timezone.now() - timedelta(seconds=1))
+        
+        response = self.client.post(
+            '/api/reservas/', self._payload(horario='21:00'), format='json', HTTP_IDEMPOTENCY_KEY='chave-1'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Reserva.objects.count(), 2)
+    
+    def test_cancelar_repetido(self):
+        """Teste que repetir o cancelamento devolve o sucesso original"""
+        reserva_id = self.client.post('/api/reservas/', self._payload(), format='json').data['reserva']['id']
+        url = f'/api/reservas/{reserva_id}/cancelar/'
+        
+        primeira = self.client.post(url, HTTP_IDEMPOTENCY_KEY='cancelar-1')
+        repetida = self.client.post(url, HTTP_IDEMPOTENCY_KEY='cancelar-1')
+        sem_chave = self.client.post(url)
+        
+        self.assertEqual(primeira.status_code, 200)
+        self.assertEqual(repetida.status_code, 200)
+        self.assertEqual(sem_chave.status_code, 400)
+    
+    def test_requisicao_em_andamento(self):
+        """Teste que uma chave ainda sem resposta retorna 409"""
+        ChaveIdempotencia.objects.create(
+            usuario=self.cliente,
+            chave='chave-1',
+            rota='POST /api/reservas/',
+            hash_requisicao='x',
+            expira_em=timezone.now() + timedelta(hours=1),
+        )
+        response = self.client.post(
+            '/api/reservas/', self._payload(), format='json', HTTP_IDEMPOTENCY_KEY='chave-1'
+        )
+        self.assertEqual(response.status_code, 409)
+    
+    @override_settings(IDEMPOTENCIA_ANDAMENTO_SEGUNDOS=60)
+    def test_requisicao_abandonada_e_retomada(self):
+        """Teste que uma chave em andamento de um processo morto é liberada após o prazo"""
+        registro = ChaveIdempotencia.objects.create(
+            usuario=self.cliente,
+            chave='chave-1',
+            rota='POST /api/reservas/',
+            hash_requisicao='x',
+            expira_em=timezone.now() + timedelta(hours=1),
+        )
+        ChaveIdempotencia.objects.filter(id=registro.id).update(
+            data_criacao=timezone.now() - timedelta(seconds=61)
+        )
+        response = self.client.post(
+            '/api/reservas/', self._payload(), format='json', HTTP_IDEMPOTENCY_KEY='chave-1'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ChaveIdempotencia.objects.get(chave='chave-1').status_code, 201)
+    
+    def test_arquivo_diferente_com_a_mesma_chave(self):
+        """Teste que outro arquivo com o mesmo nome e a mesma chave não repete a importação"""
+        self.client.force_authenticate(self.proprietario)
+        cabecalho = 'restaurante,data_reserva,horario,quantidade_pessoas,nome_cliente,telefone_cliente\n'
+        
+        def importar(linha):
+            arquivo = SimpleUploadedFile('reservas.csv', (cabecalho + linha).encode())
+            return self.client.post(
+                '/api/reservas/importar/', {'arquivo': arquivo}, format='multipart',
+                HTTP_IDEMPOTENCY_KEY='importacao-1'
+            )
+        
+        data = self.data_reserva.isoformat()
+        primeira = importar(f'{self.restaurante.id},{data},19:00,4,Ana,999999999\n')
+        self.assertEqual(primeira.status_code, 200)
+        self.assertEqual(primeira.data['criadas'], 1)
+        
+        repetida = importar(f'{self.restaurante.id},{data},19:00,4,Ana,999999999\n')
+        self.assertEqual(repetida['Idempotent-Replayed'], 'true')
+        
+        outra = importar(f'{self.restaurante.id},{data},21:00,4,Bruno,999999999\n')
+        self.assertEqual(outra.status_code, 422)
+
+
+class ImportarReservasApiTest(ReservaApiTestBase):
+    """Testes para a importação em lote de reservas"""
+    
+    def _importar(self, conteudo, nome='reservas.csv'):
+        arquivo = SimpleUploadedFile(nome, conteudo.encode())
+        return self.client.post('/api/reservas/importar/', {'arquivo': arquivo}, format='multipart')
+    
+    def test_importar_csv_aloca_em_memoria(self):
+        """Teste que as linhas do mesmo horário dividem as mesas sem sobreposição"""
+        self.client.force_authenticate(self.proprietario)
+        data = self.data_reserva.isoformat()
+        conteudo = (
+            'restaurante,data_reserva,horario,quantidade_pessoas,nome_cliente,telefone_cliente\n'
+            f'{self.restaurante.id},{data},19:00,8,Ana,999999999\n'
+            f'{self.restaurante.id},{data},19:30,4,Bruno,999999999\n'
+            f'{self.restaurante.id},{data},19:30,4,Carla,999999999\n'
+            f'{self.restaurante.id},{data},xx,4,Davi,999999999\n'
+        )
+        
+        response = self._importar(conteudo)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['criadas'], 2)
+        resultados = response.data['resultados']
+        self.assertEqual([r['status'] for r in resultados], ['criada', 'criada', 'erro', 'erro'])
+        self.assertEqual(resultados[0]['mesas'], [1, 2])
+        self.assertEqual(resultados[1]['mesas'], [3])
+        self.assertIn('Necessárias: 1, Disponíveis: 0', str(resultados[2]['erros']))
+        self.assertIn('horario', resultados[3]['erros'])
+        self.assertEqual(ReservaMesa.objects.count(), 3)
+    
+    def test_importar_jsonl_respeita_reservas_existentes(self):
+        """Teste que a ocupação já gravada é considerada"""
+        self.client.post('/api/reservas/', self._payload(horario='19:00', pessoas=8), format='json')
+        self.client.force_authenticate(self.proprietario)
+        
+        linha = self._payload(horario='20:00', pessoas=8)
+        response = self._importar(json.dumps(linha) + '\n', nome='reservas.jsonl')
+        
+        self.assertEqual(response.data['resultados'][0]['status'], 'erro')
+        self.assertEqual(Reserva.objects.count(), 1)
+    
+    def test_importar_restaurante_de_outro_proprietario(self):
+        """Teste que o funcionário/proprietário só importa para seus restaurantes"""
+        outro = Restaurante.objects.create(
+            nome='Outro Restaurante',
+            endereco='Rua Outra, 1',
+            cidade='Test City',
+            estado='TC',
+            cep='99999-999',
+            email='outro@restaurant.com',
+            proprietario=self.cliente,
+            quantidade_mesas=2
+        )
+        self.client.force_authenticate(self.proprietario)
+        linha = {**self._payload(), 'restaurante': outro.id}
+        
+        response = self._importar(json.dumps(linha), nome='reservas.jsonl')
+        
+        self.assertEqual(response.data['criadas'], 0)
+        self.assertIn('restaurante', response.data['resultados'][0]['erros'])
+    
+    def test_cliente_nao_pode_importar(self):
+        """Teste que clientes sem restaurante recebem 403"""
+        response = self._importar('restaurante\n')
+        self.assertEqual(response.status_code, 403)
+
+
+class TransicaoEmLoteApiTest(ReservaApiTestBase):
+    """Testes para a transição de status em lote"""
+    
+    def setUp(self):
+        super().setUp()
+        self.ids = [
+            self.client.post('/api/reservas/', self._payload(horario=horario, pessoas=4), format='json').data['reserva']['id']
+            for horario in ['12:00', '15:00', '18:00']
+        ]
+        self.client.force_authenticate(self.proprietario)
+    
+    def test_confirmar_em_lote(self):
+        """Teste que reservas pendentes são confirmadas e notificadas, com resultado por ID"""
+        Reserva.objects.filter(id=self.ids[2]).update(status='cancelada')
+        
+        response = self.client.post('/api/reservas/transicao_em_lote/', {
+            'acao': 'confirmar',
+            'ids': self.ids + [999999],
+        }, format='json')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['sucesso'], 2)
+        status_por_id = {r['id']: r['status'] for r in response.data['resultados']}
+        self.assertEqual(status_por_id[self.ids[0]], 'confirmada')
+        self.assertEqual(status_por_id[self.ids[2]], 'erro')
+        self.assertEqual(status_por_id[999999], 'erro')
+        self.assertEqual(Reserva.objects.filter(status='confirmada').count(), 2)
+        self.assertEqual(
+            Notificacao.objects.filter(tipo='confirmacao', usuario=self.cliente).count(), 2
+        )
+    
+    def test_cancelar_em_lote_libera_mesas(self):
+        """Teste que o cancelamento em lote libera as mesas"""
+        response = self.client.post('/api/reservas/transicao_em_lote/', {
+            'acao': 'cancelar',
+            'ids': self.ids,
+        }, format='json')
+        
+        self.assertEqual(response.data['sucesso'], 3)
+        self.assertFalse(ReservaMesa.objects.filter(reserva_id__in=self.ids).exists())
+    
+    def test_numero_de_consultas_independe_do_lote(self):
+        """Teste que o custo em consultas não cresce com a quantidade de IDs"""
+        def contar(ids):
+            with CaptureQueriesContext(connection) as contexto:
+                self.client.post('/api/reservas/transicao_em_lote/', {
+                    'acao': 'confirmar', 'ids': ids,
+                }, format='json')
+            return len(contexto.captured_queries)
+        
+        self.assertEqual(contar(self.ids[:1]), contar(self.ids[1:]))
+    
+    def test_sem_permissao_no_restaurante(self):
+        """Teste que reservas de restaurantes não gerenciados retornam erro por ID"""
+        outro_dono = Usuario.objects.create_user(
+            email='outro@test.com',
+            nome='Outro',
+            username='outro_test',
+            password='SenhaForte123'
+        )
+        Restaurante.objects.create(
+            nome='Outro Restaurante',
+            endereco='Rua Outra, 1',
+            cidade='Test City',
+            estado='TC',
+            cep='99999-999',
+            email='outro@restaurant.com',
+            proprietario=outro_dono,
+            quantidade_mesas=0
+        )
+        self.client.force_authenticate(outro_dono)
+        
+        response = self.client.post('/api/reservas/transicao_em_lote/', {
+            'acao': 'confirmar',
+            'ids': self.ids,
+        }, format='json')
+        
+        self.assertEqual(response.data['sucesso'], 0)
+        self.assertEqual(Reserva.objects.filter(status='pendente').count(), 3)
+    
+    def test_cliente_recebe_403(self):
+        """Teste que clientes sem restaurante não podem usar o endpoint"""
+        self.client.force_authenticate(self.cliente)
+        response = self.client.post('/api/reservas/transicao_em_lote/', {
+            'acao': 'confirmar',
+            'ids': self.ids,
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class SegurarMesasApiTest(ReservaApiTestBase):
+    """Testes para o bloqueio temporário de mesas durante o checkout"""
+    
+    def _segurar(self, horario='19:00', pessoas=8):
+        payload = self._payload(horario=horario, pessoas=pessoas)
+        return self.client.post('/api/mesas/segurar/', {
+            campo: payload[campo] for campo in ['restaurante', 'data_reserva', 'horario', 'quantidade_pessoas']
+        }, format='json')
+    
+    def test_bloqueio_conta_como_ocupado_para_outros(self):
+        """Teste que mesas bloqueadas não são alocadas para outro cliente"""
+        response = self._segurar()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([m['numero'] for m in response.data['mesas']], [1, 2])
+        
+        self._autenticar(self.proprietario)
+        response = self.client.post('/api/reservas/', self._payload(pessoas=8), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Disponíveis: 1', str(response.data))
+        
+        response = self.client.post('/api/mesas/verificar_disponibilidade/', {
+            'restaurante': self.restaurante.id,
+            'data_reserva': self.data_reserva.isoformat(),
+            'horario': '19:00',
+        }, format='json')
+        self.assertEqual(response.data['total_mesas_disponiveis'], 1)
+    
+    def test_consultas_identicas_compartilham_o_calculo(self):
+        """Teste que consultas iguais reaproveitam o cálculo e um novo bloqueio o invalida"""
+        def disponiveis():
+            return self.client.post('/api/mesas/verificar_disponibilidade/', {
+                'restaurante': str(self.restaurante.id),
+                'data_reserva': self.data_reserva.strftime('%d/%m/%Y'),
+                'horario': '19:00',
+            }, format='json').data['total_mesas_disponiveis']
+        
+        self._autenticar(self.proprietario)
+        self.assertEqual(disponiveis(), 3)
+        # Apenas a busca do usuário do token
+        with self.assertNumQueries(1):
+            self.assertEqual(disponiveis(), 3)
+        
+        self._autenticar(self.cliente)
+        self._segurar()
+        # O próprio bloqueio não conta como ocupação; para os outros, sim
+        self.assertEqual(disponiveis(), 3)
+        self._autenticar(self.proprietario)
+        self.assertEqual(disponiveis(), 1)
+    
+    def test_reserva_consome_bloqueio(self):
+        """Teste que a reserva com o token usa as mesas bloqueadas e libera o bloqueio"""
+        token = self._segurar().data['bloqueio']
+        
+        payload = {**self._payload(pessoas=8), 'bloqueio': token}
+        with self.assertNumQueries(8):
+            response = self.client.post('/api/reservas/', payload, format='json')
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([m['mesa_numero'] for m in response.data['reserva']['mesas_vinculadas']], [1, 2])
+        self.assertIsNone(obter_bloqueio(token))
+    
+    def test_bloqueio_expirado_nao_ocupa(self):
+        """Teste que o bloqueio deixa de valer após o TTL"""
+        with override_settings(BLOQUEIO_MESAS_TTL_SEGUNDOS=0):
+            self._segurar(pessoas=12)
+        
+        self.client.force_authenticate(self.proprietario)
+        response = self.client.post('/api/reservas/', self._payload(pessoas=12), format='json')
+        self.assertEqual(response.status_code, 201)
+    
+    def test_novo_bloqueio_substitui_o_anterior(self):
+        """Teste que o cliente mantém apenas um bloqueio por restaurante/dia"""
+        primeiro = self._segurar(pessoas=12).data['bloqueio']
+        segundo = self._segurar(pessoas=4)
+        
+        self.assertEqual(segundo.status_code, 201)
+        self.assertIsNone(obter_bloqueio(primeiro))
+        self.assertEqual(len(bloqueios_do_dia(self.restaurante.id, self.data_reserva)), 1)
+
+
+@override_settings(JOBS_EXECUTAR_SINCRONO=True)
+class ListaEsperaApiTest(ReservaApiTestBase):
+    """Testes para a lista de espera e o atendimento após cancelamentos"""
+    
+    def setUp(self):
+        super().setUp()
+        self.outro_cliente = Usuario.objects.create_user(
+            email='outro_cliente@test.com',
+            nome='Outro Cliente',
+            username='outro_cliente_test',
+            password='SenhaForte123'
+        )
+        # Restaurante lotado às 19:00
+        self.reserva_id = self.client.post(
+            '/api/reservas/', self._payload(pessoas=12), format='json'
+        ).data['reserva']['id']
+    
+    def _entrar(self, usuario, inicio='18:30', fim='20:00', pessoas=4):
+        self.client.force_authenticate(usuario)
+        return self.client.post('/api/reservas/lista_espera/', {
+            'restaurante': self.restaurante.id,
+            'data_reserva': self.data_reserva.isoformat(),
+            'horario_inicio': inicio,
+            'horario_fim': fim,
+            'quantidade_pessoas': pessoas,
+            'nome_cliente': usuario.nome,
+            'telefone_cliente': '11999999999',
+        }, format='json')
+    
+    def test_entrar_e_listar(self):
+        """Teste que o cliente entra na lista e vê suas entradas"""
+        response = self._entrar(self.outro_cliente)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['entrada']['status'], 'aguardando')
+        
+        response = self.client.get('/api/reservas/lista_espera/')
+        self.assertEqual(len(response.data), 1)
+        
+        duplicada = self._entrar(self.outro_cliente)
+        self.assertEqual(duplicada.status_code, 400)
+    
+    def test_janela_invalida(self):
+        """Teste que o horário final não pode ser anterior ao inicial"""
+        response = self._entrar(self.outro_cliente, inicio='20:00', fim='19:00')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('horario_fim', response.data)
+    
+    def test_cancelamento_atende_por_ordem_de_chegada(self):
+        """Teste que as mesas liberadas viram reservas para as entradas mais antigas"""
+        primeiro = Usuario.objects.create_user(
+            email='primeiro@test.com',
+            nome='Primeiro',
+            username='primeiro_test',
+            password='SenhaForte123'
+        )
+        self._entrar(primeiro, pessoas=8)
+        self._entrar(self.outro_cliente, inicio='19:00', fim='19:00', pessoas=8)
+        
+        self.client.force_authenticate(self.cliente)
+        response = self.client.post(f'/api/reservas/{self.reserva_id}/cancelar/')
+        self.assertEqual(response.status_code, 200)
+        
+        atendida = ListaEspera.objects.get(usuario=primeiro)
+        self.assertEqual(atendida.status, 'atendida')
+        self.assertEqual(atendida.reserva.horario, time(19, 0))
+        self.assertEqual(atendida.reserva.status, 'pendente')
+        self.assertEqual(ReservaMesa.objects.filter(reserva=atendida.reserva).count(), 2)
+        self.assertTrue(Notificacao.objects.filter(usuario=primeiro, titulo__startswith='Vaga').exists())
+        
+        # Sobrou 1 mesa: insuficiente para o segundo grupo
+        self.assertEqual(ListaEspera.objects.get(usuario=self.outro_cliente).status, 'aguardando')
+    
+    def test_cancelamento_em_lote_atende_lista(self):
+        """Teste que o cancelamento em lote também aciona a lista de espera"""
+        self._entrar(self.outro_cliente)
+        
+        self.client.force_authenticate(self.proprietario)
+        self.client.post('/api/reservas/transicao_em_lote/', {
+            'acao': 'cancelar', 'ids': [self.reserva_id],
+        }, format='json')
+        
+        self.assertEqual(ListaEspera.objects.get(usuario=self.outro_cliente).status, 'atendida')
+    
+    def test_atendimento_com_custo_fixo_de_consultas(self):
+        """Teste que o número de consultas não cresce com o tamanho da lista"""
+        from .alocacao import liberar_ocupacao
+        from .lista_espera import atender_lista_espera
+        
+        dia = [(self.restaurante.id, self.data_reserva)]
+        ReservaMesa.objects.filter(reserva_id=self.reserva_id).delete()
+        Reserva.objects.filter(id=self.reserva_id).update(status='cancelada')
+        liberar_ocupacao(dia)
+        
+        def contar(quantidade):
+            ListaEspera.objects.all().delete()
+            ListaEspera.objects.bulk_create([
+                ListaEspera(
+                    usuario=self.outro_cliente,
+                    restaurante=self.restaurante,
+                    data_reserva=self.data_reserva,
+                    horario_inicio=time(18, 0),
+                    horario_fim=time(20, 0),
+                    quantidade_pessoas=4,
+                    nome_cliente='Fila',
+                    telefone_cliente='11999999999',
+                )
+                for _ in range(quantidade)
+            ])
+            with CaptureQueriesContext(connection) as contexto:
+                atendidas = atender_lista_espera(self.restaurante.id, self.data_reserva, time(19, 0))
+            Reserva.objects.exclude(id=self.reserva_id).delete()
+            liberar_ocupacao(dia)
+            self.assertEqual(len(atendidas), 3)
+            return len(contexto.captured_queries)
+        
+        self.assertEqual(contar(5), contar(100))
+    
+    def test_sair_da_lista(self):
+        """Teste que o cliente sai da lista e não é mais atendido"""
+        entrada_id = self._entrar(self.outro_cliente).data['entrada']['id']
+        
+        response = self.client.delete(f'/api/reservas/lista_espera/{entrada_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ListaEspera.objects.get(id=entrada_id).status, 'cancelada')
+        
+        response = self.client.delete(f'/api/reservas/lista_espera/{entrada_id}/')
+        self.assertEqual(response.status_code, 404)
+
+
+class OcupacaoMesaDiaTest(ReservaApiTestBase):
+    """Testes para o mapa de ocupação das mesas por dia"""
+    
+    def _mapa(self):
+        from .ocupacao import mapa_do_dia
+        return mapa_do_dia(self.restaurante.id, self.data_reserva)
+    
+    def test_mascara_respeita_janela_de_uma_hora(self):
+        """Teste que reservas a 1h conflitam e a 1h15 não"""
+        from .ocupacao import mascara
+        
+        self.assertTrue(mascara(time(19, 0)) & mascara(time(20, 0)))
+        self.assertTrue(mascara(time(19, 0)) & mascara(time(18, 0)))
+        self.assertFalse(mascara(time(19, 0)) & mascara(time(20, 15)))
+        self.assertFalse(mascara(time(19, 0)) & mascara(time(17, 45)))
+        self.assertEqual(mascara(time(23, 45)).bit_length(), 96)
+    
+    def test_alocacao_e_cancelamento_atualizam_o_mapa(self):
+        """Teste que o mapa marca as mesas alocadas e é limpo no cancelamento"""
+        reserva_id = self.client.post(
+            '/api/reservas/', self._payload(pessoas=8), format='json'
+        ).data['reserva']['id']
+        mesas = list(Mesa.objects.filter(restaurante=self.restaurante).order_by('numero'))
+        
+        mapa = self._mapa()
+        self.assertEqual(set(mapa), {mesas[0].id, mesas[1].id})
+        
+        self.client.post(f'/api/reservas/{reserva_id}/cancelar/')
+        self.assertEqual(self._mapa(), {})
+    
+    def test_edicao_move_a_ocupacao(self):
+        """Teste que editar o horário libera o anterior e ocupa o novo"""
+        from .ocupacao import mascara
+        
+        reserva_id = self.client.post(
+            '/api/reservas/', self._payload(pessoas=4), format='json'
+        ).data['reserva']['id']
+        response = self.client.patch(f'/api/reservas/{reserva_id}/', {'horario': '12:00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        
+        (bits,) = self._mapa().values()
+        self.assertEqual(bits, mascara(time(12, 0)))
+    
+    def test_edicao_invalida_desfaz_a_realocacao(self):
+        """Teste que a falha ao salvar a reserva desfaz a troca de mesas e do mapa"""
+        from unittest import mock
+        from .alocacao import realocar_mesas
+        
+        reserva_id = self.client.post(
+            '/api/reservas/', self._payload(pessoas=4), format='json'
+        ).data['reserva']['id']
+        reserva = Reserva.objects.get(id=reserva_id)
+        vinculos = list(ReservaMesa.objects.values_list('mesa_id', flat=True))
+        mapa = self._mapa()
+        
+        with mock.patch.object(Reserva, 'save', side_effect=IntegrityError('falha')):
+            with self.assertRaises(IntegrityError):
+                realocar_mesas(reserva, {'horario': time(12, 0), 'quantidade_pessoas': 8})
+        
+        self.assertEqual(list(ReservaMesa.objects.values_list('mesa_id', flat=True)), vinculos)
+        self.assertEqual(self._mapa(), mapa)
+        self.assertEqual(Reserva.objects.get(id=reserva_id).horario, time(19, 0))
+    
+    def test_edicao_nao_repete_a_validacao_do_serializer(self):
+        """Teste que a edição com realocação não executa o full_clean de novo"""
+        from unittest import mock
+        
+        reserva_id = self.client.post(
+            '/api/reservas/', self._payload(pessoas=4), format='json'
+        ).data['reserva']['id']
+        
+        with mock.patch.object(Reserva, 'full_clean') as full_clean:
+            response = self.client.patch(f'/api/reservas/{reserva_id}/', {'horario': '12:00'}, format='json')
+        
+        self.assertEqual(response.status_code, 200)
+        full_clean.assert_not_called()
+        self.assertEqual(Reserva.objects.get(id=reserva_id).horario, time(12, 0))
+    
+    def test_reconstruir_ocupacao(self):
+        """Teste que o comando reconstrói mapas ausentes ou desatualizados"""
+        self.client.post('/api/reservas/', self._payload(pessoas=4), format='json')
+        esperado = self._mapa()
+        OcupacaoMesaDia.objects.all().delete()
+        
+        call_command('reconstruir_ocupacao', stdout=StringIO())
+        self.assertEqual(self._mapa(), esperado)
+    
+    def test_migracao_preenche_mapas_das_reservas_existentes(self):
+        """Teste que a migração do mapa marca as mesas das reservas ativas já gravadas"""
+        import importlib
+        from django.apps import apps
+        
+        self.client.post('/api/reservas/', self._payload(pessoas=4), format='json')
+        esperado = self._mapa()
+        OcupacaoMesaDia.objects.all().delete()
+        
+        migracao = importlib.import_module('reservas.migrations.0006_ocupacaomesadia')
+        migracao.preencher_ocupacao(apps, None)
+        self.assertEqual(self._mapa(), esperado)
+    
+    def test_admin_de_vinculos_atualiza_o_mapa(self):
+        """Teste que excluir um vínculo pelo admin libera a mesa no mapa"""
+        from django.contrib import admin
+        from .admin import ReservaMesaAdmin
+        
+        self.client.post('/api/reservas/', self._payload(pessoas=8), format='json')
+        vinculo = ReservaMesa.objects.order_by('mesa__numero').first()
+        
+        ReservaMesaAdmin(ReservaMesa, admin.site).delete_model(None, vinculo)
+        self.assertNotIn(vinculo.mesa_id, self._mapa())
+        self.assertEqual(len(self._mapa()), 1)
+    
+    def test_disponibilidade_em_cache_invalidada_pela_ocupacao(self):
+        """Teste que a disponibilidade vem do cache até a próxima alocação ou cancelamento"""
+        def disponiveis():
+            return self.client.post('/api/mesas/verificar_disponibilidade/', {
+                'restaurante': self.restaurante.id,
+                'data_reserva': self.data_reserva.isoformat(),
+                'horario': '19:00',
+            }, format='json').data['total_mesas_disponiveis']
+        
+        self._autenticar(self.cliente)
+        self.assertEqual(disponiveis(), 3)
+        with CaptureQueriesContext(connection) as contexto:
+            self.assertEqual(disponiveis(), 3)
+        self.assertFalse([q for q in contexto.captured_queries if 'mesas_mesa' in q['sql']])
+        
+        reserva_id = self.client.post(
+            '/api/reservas/', self._payload(pessoas=8), format='json'
+        ).data['reserva']['id']
+        self.assertEqual(disponiveis(), 1)
+        
+        self.client.post(f'/api/reservas/{reserva_id}/cancelar/')
+        self.assertEqual(disponiveis(), 3)
+
+
+class ParticionamentoReservaTest(ReservaApiTestBase):
+    """Testes para o particionamento mensal das reservas"""
+    
+    def test_meses_e_nomes_das_particoes(self):
+        """Teste que os meses cobrem o intervalo inclusive, atravessando o ano"""
+        from .particionamento import meses, nome_particao
+        
+        resultado = list(meses(date(2026, 11, 15), date(2027, 2, 1)))
+        self.assertEqual(resultado, [date(2026, 11, 1), date(2026, 12, 1), date(2027, 1, 1), date(2027, 2, 1)])
+        self.assertEqual(nome_particao(resultado[2]), 'reservas_reserva_p2027_01')
+    
+    def test_exclusao_nao_deixa_vinculos_orfaos(self):
+        """Teste que a cascata do Django remove vínculos sem FOREIGN KEY no banco"""
+        reserva_id = self.client.post(
+            '/api/reservas/', self._payload(pessoas=8), format='json'
+        ).data['reserva']['id']
+        Reserva.objects.filter(id=reserva_id).delete()
+        
+        saida = StringIO()
+        call_command('criar_particoes', '--verificar', stdout=saida)
+        self.assertFalse(ReservaMesa.objects.exists())
+        self.assertIn('ReservaMesa: 0 vínculo(s) órfão(s)', saida.getvalue())
+    
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Particionamento disponível apenas no PostgreSQL')
+    def test_consulta_por_data_le_uma_particao(self):
+        """Teste que a consulta por data é podada para a partição do mês"""
+        from .particionamento import criar_particao, inicio_do_mes, mes_seguinte, nome_particao
+        
+        self.client.post('/api/reservas/', self._payload(), format='json')
+        mes = inicio_do_mes(self.data_reserva)
+        criar_particao(mes)
+        criar_particao(mes_seguinte(mes))
+        
+        plano = Reserva.objects.filter(data_reserva=self.data_reserva).explain()
+        self.assertIn(nome_particao(mes), plano)
+        self.assertNotIn(nome_particao(mes_seguinte(mes)), plano)
+        self.assertNotIn('reservas_reserva_padrao', plano)
+        self.assertEqual(Reserva.objects.filter(data_reserva=self.data_reserva).count(), 1)
+
+
+class ArquivoReservasTest(ReservaApiTestBase):
+    """Testes para o arquivamento de dias antigos e a leitura do arquivo pelos relatórios"""
+    
+    def setUp(self):
+        super().setUp()
+        self.mesas = list(Mesa.objects.filter(restaurante=self.restaurante).order_by('numero'))
+        self.dia_antigo = timezone.now().date() - timedelta(days=500)
+        self._antiga(self.dia_antigo, time(19, 0), 'concluida', 6, self.mesas[:2])
+        self._antiga(self.dia_antigo, time(19, 0), 'cancelada', 3, [])
+        self._antiga(self.dia_antigo, time(20, 30), 'concluida', 4, self.mesas[1:2])
+        # Dia antigo com uma reserva ainda confirmada (varredura não rodou): não é arquivado
+        self.dia_pendente = self.dia_antigo + timedelta(days=1)
+        self._antiga(self.dia_pendente, time(19, 0), 'confirmada', 2, self.mesas[:1])
+    
+    def _antiga(self, data_reserva, horario, status, pessoas, mesas):
+        reserva = Reserva(
+            restaurante=self.restaurante, usuario=self.cliente, data_reserva=data_reserva,
+            horario=horario, quantidade_pessoas=pessoas, status=status,
+            nome_cliente='Cliente', telefone_cliente='999999999',
+        )
+        reserva.save(skip_validation=True)
+        ReservaMesa.objects.bulk_create([ReservaMesa(reserva=reserva, mesa=mesa) for mesa in mesas])
+        Notificacao.objects.create(usuario=self.cliente, reserva=reserva, titulo='Reserva', mensagem='...')
+        return reserva
+    
+    def _relatorios(self):
+        from .reports import RelatorioHelper
+        periodo = {'data_inicio': self.dia_antigo, 'data_fim': self.dia_pendente}
+        return (
+            RelatorioHelper.gerar_relatorio_ocupacao(**periodo),
+            RelatorioHelper.gerar_relatorio_horarios_movimentados(**periodo),
+            RelatorioHelper.gerar_relatorio_estatisticas_periodo(tipo_periodo='mes', **periodo),
+        )
+    
+    def test_arquivamento_preserva_os_relatorios(self):
+        """Teste que os relatórios dão o mesmo resultado antes e depois do arquivamento"""
+        antes = self._relatorios()
+        call_command('arquivar_reservas', stdout=StringIO())
+        
+        self.assertEqual(Reserva.objects.filter(data_reserva=self.dia_antigo).count(), 0)
+        self.assertEqual(ReservaMesa.objects.count(), 1)
+        self.assertEqual(Notificacao.objects.count(), 1)
+        self.assertEqual(self._relatorios(), antes)
+        self.assertEqual(antes[0][0]['mesas_ocupadas'], 2)
+    
+    def test_dias_com_reservas_nao_finais_ficam_vivos(self):
+        """Teste que apenas dias inteiramente finais são arquivados, uma única vez"""
+        from .models import ArquivoReservasDia
+        
+        call_command('arquivar_reservas', stdout=StringIO())
+        call_command('arquivar_reservas', stdout=StringIO())
+        
+        self.assertEqual(
+            list(ArquivoReservasDia.objects.values_list('data', 'reservas_arquivadas')),
+            [(self.dia_antigo, 3)]
+        )
+        self.assertTrue(Reserva.objects.filter(data_reserva=self.dia_pendente).exists())
+    
+    def test_dry_run_nao_altera(self):
+        """Teste que o --dry-run apenas conta os dias"""
+        saida = StringIO()
+        call_command('arquivar_reservas', '--dry-run', stdout=saida)
+        self.assertIn('Dias que seriam arquivados', saida.getvalue())
+        self.assertIn(': 1', saida.getvalue())
+        self.assertEqual(Reserva.objects.count(), 4)
+
+
+class SugestoesHorariosApiTest(ReservaApiTestBase):
+    """Testes para as sugestões de horários quando o horário pedido está lotado"""
+    
+    def setUp(self):
+        super().setUp()
+        # Restaurante lotado às 19:00 (3 mesas)
+        self.client.post('/api/reservas/', self._payload(pessoas=12), format='json')
+    
+    def test_erro_de_mesas_insuficientes_traz_sugestoes(self):
+        """Teste que a criação sem mesas retorna os horários viáveis mais próximos"""
+        response = self.client.post('/api/reservas/', self._payload(horario='19:30', pessoas=4), format='json')
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Não há mesas suficientes', response.data['error'])
+        primeira = response.data['sugestoes'][0]
+        self.assertEqual(primeira['data_reserva'], self.data_reserva.isoformat())
+        self.assertEqual(primeira['horario'], '20:30')
+    
+    def test_acao_sugestoes(self):
+        """Teste que as sugestões respeitam a janela de ±1h e vêm por proximidade"""
+        response = self.client.post('/api/mesas/sugestoes/', {
+            'restaurante': self.restaurante.id,
+            'data_reserva': self.data_reserva.isoformat(),
+            'horario': '19:00',
+            'quantidade_pessoas': 8,
+            'quantidade': 4,
+            'horizonte_dias': 0,
+        }, format='json')
+        
+        self.assertEqual(response.status_code, 200)
+        horarios = [sugestao['horario'] for sugestao in response.data['sugestoes']]
+        self.assertEqual(sorted(horarios[:2]), ['17:30', '20:30'])
+        self.assertEqual(sorted(horarios[2:]), ['17:00', '21:00'])
+        self.assertTrue(all(
+            s['data_reserva'] == self.data_reserva.isoformat() for s in response.data['sugestoes']
+        ))
+    
+    def test_horizonte_inclui_dias_seguintes(self):
+        """Teste que o mesmo horário nos dias seguintes entra nas sugestões"""
+        response = self.client.post('/api/mesas/sugestoes/', {
+            'restaurante': self.restaurante.id,
+            'data_reserva': self.data_reserva.isoformat(),
+            'horario': '19:00',
+            'quantidade_pessoas': 12,
+            'quantidade': 20,
+            'horizonte_dias': 1,
+            'granularidade_minutos': 60,
+        }, format='json')
+        
+        dia_seguinte = (self.data_reserva + timedelta(days=1)).isoformat()
+        self.assertIn(
+            (dia_seguinte, '19:00'),
+            [(s['data_reserva'], s['horario']) for s in response.data['sugestoes']]
+        )
+
+
+class CapacidadeApiTest(ReservaApiTestBase):
+    """Testes para a curva de capacidade do dia"""
+    
+    def _capacidade(self, **extra):
+        return self.client.post('/api/mesas/capacidade/', {
+            'restaurante': self.restaurante.id,
+            'data_reserva': self.data_reserva.isoformat(),
+            **extra,
+        }, format='json')
+    
+    def test_capacidade_no_horario_e_curva(self):
+        """Teste que o horário pedido e a curva refletem as reservas do dia"""
+        self.client.post('/api/reservas/', self._payload(pessoas=8), format='json')
+        
+        response = self._capacidade(horario='19:30')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_mesas'], 3)
+        self.assertEqual(response.data['mesas_disponiveis'], 1)
+        self.assertEqual(response.data['capacidade_maxima'], 4)
+        
+        curva = {ponto['horario']: ponto['capacidade_maxima'] for ponto in response.data['curva']}
+        self.assertEqual(curva['19:00'], 4)
+        self.assertEqual(curva['17:45'], 12)
+        self.assertEqual(curva['20:15'], 12)
+    
+    def test_uma_leitura_de_ocupacao(self):
+        """Teste que a curva inteira custa uma consulta de mesas"""
+        with CaptureQueriesContext(connection) as contexto:
+            self._capacidade(horario='19:00')
+        consultas = [q['sql'] for q in contexto.captured_queries if 'mesas_mesa' in q['sql']]
+        self.assertEqual(len(consultas), 1)
+
+
+class HorarioFuncionamentoReservaTest(ReservaApiTestBase):
+    """Testes para a recusa de horários fora do funcionamento do restaurante"""
+    
+    def setUp(self):
+        super().setUp()
+        HorarioFuncionamento.objects.bulk_create([
+            HorarioFuncionamento(
+                restaurante=self.restaurante, dia_semana=dia, abertura=time(18, 0), fechamento=time(22, 0)
+            )
+            for dia in range(7)
+        ])
+        self.restaurante.refresh_from_db()
+    
+    def test_reserva_fora_do_horario(self):
+        """Teste que a reserva fora do horário é recusada antes da alocação"""
+        response = self.client.post('/api/reservas/', self._payload(horario='15:00'), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('não está aberto', str(response.data))
+        self.assertFalse(Reserva.objects.exists())
+        
+        response = self.client.post('/api/reservas/', self._payload(horario='19:00'), format='json')
+        self.assertEqual(response.status_code, 201)
+    
+    def test_disponibilidade_fora_do_horario_sem_consultar_ocupacao(self):
+        """Teste que a consulta de disponibilidade fora do horário não lê os mapas"""
+        self._autenticar(self.cliente)
+        grade_do_restaurante(self.restaurante)
+        with CaptureQueriesContext(connection) as contexto:
+            response = self.client.post('/api/mesas/verificar_disponibilidade/', {
+                'restaurante': self.restaurante.id,
+                'data_reserva': self.data_reserva.isoformat(),
+                'horario': '23:00',
+            }, format='json')
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse([q for q in contexto.captured_queries if 'mesas_mesa' in q['sql']])
+    
+    def test_feriado_fecha_o_dia(self):
+        """Teste que o feriado geral fecha o restaurante e a exceção própria tem prioridade"""
+        ExcecaoHorario.objects.create(data=self.data_reserva, descricao='Feriado')
+        self.restaurante.refresh_from_db()
+        response = self.client.post('/api/reservas/', self._payload(horario='19:00'), format='json')
+        self.assertEqual(response.status_code, 400)
+        
+        ExcecaoHorario.objects.create(
+            restaurante=self.restaurante, data=self.data_reserva, fechado=False,
+            abertura=time(12, 0), fechamento=time(20, 0)
+        )
+        self.restaurante.refresh_from_db()
+        response = self.client.post('/api/reservas/', self._payload(horario='19:00'), format='json')
+        self.assertEqual(response.status_code, 201)
+    
+    def test_curva_e_sugestoes_apenas_no_horario(self):
+        """Teste que capacidade e sugestões percorrem apenas horários abertos"""
+        response = self.client.post('/api/mesas/capacidade/', {
+            'restaurante': self.restaurante.id,
+            'data_reserva': self.data_reserva.isoformat(),
+        }, format='json')
+        horarios = [ponto['horario'] for ponto in response.data['curva']]
+        self.assertEqual((horarios[0], horarios[-1], len(horarios)), ('18:00', '21:45', 16))
+        
+        response = self.client.post('/api/mesas/sugestoes/', {
+            'restaurante': self.restaurante.id,
+            'data_reserva': self.data_reserva.isoformat(),
+            'horario': '19:00',
+            'quantidade_pessoas': 4,
+            'quantidade': 20,
+            'horizonte_dias': 0,
+        }, format='json')
+        self.assertEqual(
+            sorted(s['horario'] for s in response.data['sugestoes']),
+            ['18:00', '18:30', '19:30', '20:00', '20:30', '21:00', '21:30']
+        )
+
+
+class ViewsAssincronasApiTest(ReservaApiTestBase):
+    """Testes para as views assíncronas (ORM assíncrono) de disponibilidade, notificações e restaurantes"""
+    
+    def setUp(self):
+        super().setUp()
+        self.async_client = AsyncClient()
+        self.token = {'authorization': f'Bearer {RefreshToken.for_user(self.cliente).access_token}'}
+        reserva = Reserva(
+            restaurante=self.restaurante, usuario=self.cliente, data_reserva=self.data_reserva,
+            horario=time(19, 0), quantidade_pessoas=2, status='pendente',
+            nome_cliente='Cliente', telefone_cliente='999999999',
+        )
+        reserva.save(skip_validation=True)
+        Notificacao.objects.create(usuario=self.cliente, reserva=reserva, titulo='Reserva', mensagem='...')
+        Notificacao.objects.create(usuario=self.cliente, reserva=reserva, titulo='Lida', mensagem='...', lido=True)
+    
+    def test_rotas_assincronas(self):
+        """Teste que as rotas de maior volume são atendidas por views assíncronas"""
+        from asgiref.sync import iscoroutinefunction
+        from django.urls import resolve
+        for caminho in (
+            '/api/restaurantes/', f'/api/restaurantes/{self.restaurante.id}/',
+            '/api/mesas/verificar_disponibilidade/',
+            '/api/notificacoes/contar_nao_lidas/', '/api/notificacoes/nao_lidas/',
+        ):
+            self.assertTrue(iscoroutinefunction(resolve(caminho).func), caminho)
+    
+    async def test_notificacoes_nao_lidas(self):
+        """Teste da contagem e da listagem de não lidas com o token JWT"""
+        response = await self.async_client.get('/api/notificacoes/contar_nao_lidas/')
+        self.assertEqual(response.status_code, 401)
+        
+        response = await self.async_client.get('/api/notificacoes/contar_nao_lidas/', headers=self.token)
+        self.assertEqual(response.json(), {'count': 1})
+        
+        response = await self.async_client.get('/api/notificacoes/nao_lidas/', headers=self.token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total'], 1)
+        self.assertEqual(response.json()['notificacoes'][0]['reserva_restaurante'], 'Restaurante Test')
+    
+    async def test_verificar_disponibilidade(self):
+        """Teste da disponibilidade assíncrona (mesmas regras da view síncrona)"""
+        payload = {
+            'restaurante': self.restaurante.id,
+            'data_reserva': self.data_reserva.isoformat(),
+            'horario': '19:00',
+            'quantidade_pessoas': 6,
+        }
+        response = await self.async_client.post(
+            '/api/mesas/verificar_disponibilidade/', payload, content_type='application/json', headers=self.token
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_mesas_disponiveis'], 3)
+        self.assertTrue(response.json()['mesas_disponiveis_suficientes'])
+        self.assertEqual(response.json()['mesas'][0]['restaurante_nome'], 'Restaurante Test')
+        
+        response = await self.async_client.post(
+            '/api/mesas/verificar_disponibilidade/', {**payload, 'horario': '7h'},
+            content_type='application/json', headers=self.token
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+    
+    async def test_restaurantes_publicos(self):
+        """Teste da listagem e do detalhe públicos (anônimos) com filtros do DRF"""
+        await Restaurante.objects.acreate(
+            nome='Fechado', endereco='Rua', cidade='Test City', estado='TC', cep='00000-000',
+            email='fechado@restaurant.com', proprietario=self.proprietario, ativo=False,
+        )
+        response = await self.async_client.get('/api/restaurantes/', {'cidade': 'Test City'})
+        self.assertEqual([r['nome'] for r in response.json()], ['Restaurante Test'])
+        self.assertEqual(response.json()[0]['mesas_disponiveis'], 3)
+        
+        response = await self.async_client.get('/api/restaurantes/', {'cidade': 'Outra'})
+        self.assertEqual(response.json(), [])
+        
+        response = await self.async_client.get(f'/api/restaurantes/{self.restaurante.id}/')
+        self.assertEqual(response.json()['total_mesas'], 3)
+        
+        response = await self.async_client.get('/api/restaurantes/999999/')
+        self.assertEqual(response.status_code, 404)
+
+
+class MudancasApiTest(ReservaApiTestBase):
+    """Testes para a sincronização incremental da equipe (GET /api/reservas/mudancas/)"""
+    
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.proprietario)
+        self.hoje = timezone.now().date()
+        self.confirmada = self._reserva('confirmada')
+        self.cancelada = self._reserva('cancelada')
+    
+    def _reserva(self, status_reserva, data_reserva=None):
+        reserva = Reserva(
+            restaurante=self.restaurante, data_reserva=data_reserva or self.hoje, horario=time(20, 0),
+            quantidade_pessoas=2, nome_cliente='Cliente', telefone_cliente='999999999',
+            status=status_reserva,
+        )
+        reserva.save(skip_validation=True)
+        return reserva
+    
+    def _mudancas(self, **params):
+        return self.client.get('/api/reservas/mudancas/', {'restaurante': self.restaurante.id, **params})
+    
+    def test_sem_cursor_retorna_estado_completo(self):
+        """Teste que a primeira chamada traz as reservas visíveis de hoje e todas as mesas"""
+        response = self._mudancas()
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['completo'])
+        self.assertEqual([r['id'] for r in response.data['reservas']], [self.confirmada.id])
+        self.assertEqual(len(response.data['mesas']), 3)
+        self.assertTrue(response.data['cursor'].endswith('Z'))
+    
+    @override_settings(MUDANCAS_MARGEM_SEGUNDOS=0)
+    def test_cursor_retorna_apenas_mudancas_e_remocoes(self):
+        """Teste que o cursor traz só o que mudou, os ids que saíram da lista e as remoções"""
+        cursor = self._mudancas().data['cursor']
+        
+        nova = self._reserva('pendente')
+        self.confirmada.status = 'cancelada'
+        self.confirmada.save(skip_validation=True)
+        removida = self._reserva('confirmada', self.hoje + timedelta(days=1))
+        removida_id = removida.id
+        removida.delete()
+        antiga = self._reserva('concluida', self.hoje - timedelta(days=1))
+        antiga.delete()
+        mesa = self.restaurante.mesas.order_by('numero').first()
+        mesa_id = mesa.id
+        mesa.delete()
+        
+        with self.assertNumQueries(5):
+            response = self._mudancas(desde=cursor)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['completo'])
+        self.assertEqual([r['id'] for r in response.data['reservas']], [nova.id])
+        self.assertEqual(response.data['mesas'], [])
+        self.assertCountEqual(response.data['removidas']['reservas'], [self.confirmada.id, removida_id])
+        self.assertEqual(response.data['removidas']['mesas'], [mesa_id])
+        self.assertEqual(Remocao.objects.filter(tipo='reserva').count(), 1)
+        
+        response = self._mudancas(desde=response.data['cursor'])
+        self.assertEqual(response.data['reservas'], [])
+        self.assertEqual(response.data['removidas'], {'reservas': [], 'mesas': []})
+    
+    def test_acesso_e_cursor_invalido(self):
+        """Teste de permissão, cursor inválido e cursor de outro dia (estado completo)"""
+        self.assertEqual(self._mudancas(desde='ontem').status_code, 400)
+        self.assertEqual(self.client.get('/api/reservas/mudancas/').status_code, 400)
+        
+        ontem = (timezone.now() - timedelta(days=1)).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        self.assertTrue(self._mudancas(desde=ontem).data['completo'])
+        
+        self.client.force_authenticate(self.cliente)
+        self.assertEqual(self._mudancas().status_code, 403)
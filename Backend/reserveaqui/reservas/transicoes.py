@@ -0,0 +1,174 @@
+"""
+Transições de status em lote (confirmar, cancelar e concluir várias reservas).
+
+Aplica as mesmas regras das ações individuais, mas com custo fixo de consultas:
+as permissões são resolvidas uma vez por restaurante, a mudança de status é um
+único UPDATE restrito aos status de origem e as notificações são criadas com
+bulk_create.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from restaurantes.painel import invalidar_painel
+from .alocacao import liberar_ocupacao
+from .lista_espera import agendar_atendimento
+from .models import Reserva, ReservaMesa, Notificacao
+
+TRANSICOES = {
+    'confirmar': {'origem': ['pendente'], 'destino': 'confirmada'},
+    'cancelar': {'origem': ['pendente', 'confirmada'], 'destino': 'cancelada'},
+    'concluir': {'origem': ['confirmada'], 'destino': 'concluida'},
+}
+
+# Mensagens equivalentes às das ações individuais, por (ação, status atual)
+MENSAGENS_STATUS = {
+    ('confirmar', 'confirmada'): 'Esta reserva já está confirmada.',
+    ('confirmar', 'cancelada'): 'Não é possível confirmar uma reserva cancelada.',
+    ('confirmar', 'concluida'): 'Esta reserva já foi concluída.',
+    ('cancelar', 'cancelada'): 'Esta reserva já está cancelada.',
+    ('cancelar', 'concluida'): 'Não é possível cancelar uma reserva já concluída.',
+}
+
+
+def _erro(reserva_id, mensagem):
+    return {'id': reserva_id, 'status': 'erro', 'erro': mensagem}
+
+
+def aplicar_transicao(user, acao, ids, permitidos):
+    """
+    Aplica a transição às reservas informadas.
+    `permitidos` é o conjunto de restaurantes gerenciados pelo usuário (None = todos).
+    Retorna uma lista com o resultado de cada ID, na ordem recebida.
+    """
+    transicao = TRANSICOES[acao]
+    ids = list(dict.fromkeys(ids))
+    # Proprietários e administradores cancelam sem a restrição de 2 horas
+    cancela_sem_prazo = permitidos is None or user.usuariopapel_set.filter(
+        papel__tipo__in=['admin_sistema', 'admin_secundario']
+    ).exists()
+
+    reservas = Reserva.objects.select_related('restaurante').in_bulk(ids)
+    resultados = {}
+    elegiveis = []
+
+    for reserva_id in ids:
+        reserva = reservas.get(reserva_id)
+        if reserva is None:
+            resultados[reserva_id] = _erro(reserva_id, 'Reserva não encontrada.')
+        elif permitidos is not None and reserva.restaurante_id not in permitidos:
+            resultados[reserva_id] = _erro(
+                reserva_id, 'Você não tem permissão para gerenciar reservas deste restaurante.'
+            )
+        elif reserva.status not in transicao['origem']:
+            mensagem = MENSAGENS_STATUS.get(
+                (acao, reserva.status), 'Apenas reservas confirmadas podem ser concluídas.'
+            )
+            resultados[reserva_id] = _erro(reserva_id, mensagem)
+        elif (
+            acao == 'cancelar'
+            and not cancela_sem_prazo
+            and reserva.restaurante.proprietario_id != user.id
+            and not reserva.pode_cancelar()
+        ):
+            resultados[reserva_id] = _erro(
+                reserva_id, 'Não é possível cancelar reservas com menos de 2 horas de antecedência.'
+            )
+        else:
+            elegiveis.append(reserva_id)
+
+    if elegiveis:
+        with transaction.atomic():
+            # Trava as linhas que ainda estão no status de origem; as demais
+            # foram alteradas por outra requisição desde a leitura acima
+            alteradas = list(
+                Reserva.objects.select_for_update()
+                .filter(id__in=elegiveis, status__in=transicao['origem'])
+                .values_list('id', flat=True)
+            )
+            Reserva.objects.filter(id__in=alteradas, status__in=transicao['origem']).update(
+                status=transicao['destino'],
+                data_atualizacao=timezone.now(),
+            )
+            for restaurante_id in {reservas[reserva_id].restaurante_id for reserva_id in alteradas}:
+                invalidar_painel(restaurante_id)
+
+            mesas = defaultdict(list)
+            if acao in ('confirmar', 'cancelar'):
+                for reserva_id, numero in ReservaMesa.objects.filter(
+                    reserva_id__in=alteradas
+                ).order_by('mesa__numero').values_list('reserva_id', 'mesa__numero'):
+                    mesas[reserva_id].append(str(numero))
+
+            if acao == 'cancelar':
+                # RN03: Liberar mesas automaticamente
+                ReservaMesa.objects.filter(reserva_id__in=alteradas).delete()
+
+            if acao in ('cancelar', 'concluir'):
+                liberar_ocupacao(
+                    (reservas[reserva_id].restaurante_id, reservas[reserva_id].data_reserva)
+                    for reserva_id in alteradas
+                )
+
+            Notificacao.objects.bulk_create([
+                _notificacao(acao, reservas[reserva_id], mesas[reserva_id], user)
+                for reserva_id in alteradas
+                if reservas[reserva_id].usuario_id
+            ])
+
+        if acao == 'cancelar':
+            # As mesas liberadas são oferecidas à lista de espera
+            agendar_atendimento(
+                (reservas[reserva_id].restaurante_id, reservas[reserva_id].data_reserva, reservas[reserva_id].horario)
+                for reserva_id in alteradas
+            )
+
+        alteradas = set(alteradas)
+        for reserva_id in elegiveis:
+            if reserva_id in alteradas:
+                resultados[reserva_id] = {'id': reserva_id, 'status': transicao['destino']}
+            else:
+                resultados[reserva_id] = _erro(
+                    reserva_id, 'O status da reserva foi alterado por outra requisição.'
+                )
+
+    return [resultados[reserva_id] for reserva_id in ids]
+
+
+def _notificacao(acao, reserva, mesas_numeros, user):
+    """Notificação ao cliente com o mesmo conteúdo das ações individuais"""
+    nome = reserva.restaurante.nome
+
+    if acao == 'confirmar':
+        return Notificacao(
+            usuario_id=reserva.usuario_id,
+            reserva=reserva,
+            tipo='confirmacao',
+            titulo=f'Reserva Confirmada - {nome}',
+            mensagem=f'Sua reserva para {reserva.quantidade_pessoas} pessoas em {nome} '
+                     f'foi confirmada para {reserva.data_reserva} às {reserva.horario}. '
+                     f'Mesas: {", ".join(mesas_numeros)}'
+        )
+
+    if acao == 'cancelar':
+        origem_cancelamento = 'você' if reserva.usuario_id == user.id else user.nome
+        return Notificacao(
+            usuario_id=reserva.usuario_id,
+            reserva=reserva,
+            tipo='cancelamento',
+            titulo=f'Reserva Cancelada - {nome}',
+            mensagem=f'Sua reserva em {nome} para {reserva.data_reserva} às '
+                     f'{reserva.horario} foi cancelada por {origem_cancelamento}. '
+                     f'Mesas: {", ".join(mesas_numeros) if mesas_numeros else "-"}'
+        )
+
+    return Notificacao(
+        usuario_id=reserva.usuario_id,
+        reserva=reserva,
+        tipo='atualizacao',
+        titulo=f'Reserva Concluída - {nome}',
+        mensagem=f'Sua reserva em {nome} para {reserva.data_reserva} às '
+                 f'{reserva.horario} foi marcada como concluída.'
+    )
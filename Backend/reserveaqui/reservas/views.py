@@ -4,20 +4,36 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
 from datetime import datetime, timedelta
-from .models import Reserva, ReservaMesa, Notificacao
+import json
+from .models import Reserva, ReservaMesa, Notificacao, RelatorioAssincrono, ListaEspera
 from .serializers import (
     ReservaSerializer,
     ReservaListSerializer,
     ReservaCreateUpdateSerializer,
-    NotificacaoSerializer
+    NotificacaoSerializer,
+    RelatorioAssincronoCreateSerializer,
+    RelatorioAssincronoSerializer,
+    TransicaoEmLoteSerializer,
+    ListaEsperaSerializer
 )
-from .permissions import IsOwnerOrAdminForReservas
+from .permissions import IsOwnerOrAdminForReservas, restaurantes_gerenciados
 from .reports import RelatorioHelper, RelatorioOcupacaoSerializer, HorarioMovimentadoSerializer, EstatisticasSerieSerializer
+from utils.jobs import enfileirar
+from utils.replica import LeituraReplicaMixin
+from utils.assincrono import exigir_usuario, resposta_json, view_assincrona
+from .exportacao import gerar_csv, gerar_ndjson
+from .idempotencia import idempotente
+from .importacao import FORMATOS as FORMATOS_IMPORTACAO, ArquivoInvalido, ler_linhas, importar_reservas
+from .transicoes import aplicar_transicao
+from .lista_espera import agendar_atendimento
+from .alocacao import MesasInsuficientes, liberar_ocupacao
+from .sugestoes import erro_com_sugestoes
 
 
-class ReservaViewSet(viewsets.ModelViewSet):
+class ReservaViewSet(LeituraReplicaMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciamento de reservas.
     
@@ -36,6 +52,8 @@ class ReservaViewSet(viewsets.ModelViewSet):
     ordering_fields = ['data_reserva', 'horario', 'data_criacao']
     ordering = ['-data_reserva', '-horario']
     STATUS_VISUALIZACAO_RESTAURANTE = ['pendente', 'confirmada']
+    # Relatórios toleram o atraso de replicação e vão para a réplica de leitura
+    acoes_replica = ('estatisticas', 'ocupacao', 'horarios_movimentados', 'estatisticas_periodo')
     
     def get_serializer_class(self):
         """Retorna o serializer apropriado para cada ação"""
@@ -104,9 +122,10 @@ class ReservaViewSet(viewsets.ModelViewSet):
         # Cliente: vê apenas suas próprias reservas
         return queryset.filter(usuario=user)
 
-    def _resolver_restaurante_id_relatorio(self, request):
+    def _resolver_restaurante_id_relatorio(self, request, restaurante_id_param=None):
         """
         Resolve o restaurante permitido para endpoints de relatório.
+        Por padrão lê o query param 'restaurante_id'.
 
         Regras:
         - admin_sistema: pode consultar qualquer restaurante (ou todos se não informar).
@@ -116,7 +135,8 @@ class ReservaViewSet(viewsets.ModelViewSet):
         from restaurantes.models import Restaurante, RestauranteUsuario
 
         user = request.user
-        restaurante_id_param = request.query_params.get('restaurante_id')
+        if restaurante_id_param is None:
+            restaurante_id_param = request.query_params.get('restaurante_id')
 
         restaurante_id = None
         if restaurante_id_param:
@@ -186,40 +206,26 @@ class ReservaViewSet(viewsets.ModelViewSet):
             status=status.HTTP_403_FORBIDDEN
         )
     
+    @idempotente
     def create(self, request, *args, **kwargs):
         """
         Criar nova reserva com alocação automática de mesas.
         Valida conflitos, disponibilidade e data/hora no passado.
         """
-        # Validação prévia de data/hora
-        data_reserva_str = request.data.get('data_reserva')
-        horario_str = request.data.get('horario')
-        
-        if data_reserva_str and horario_str:
-            try:
-                data_reserva = datetime.strptime(data_reserva_str, '%Y-%m-%d').date()
-                horario = datetime.strptime(horario_str, '%H:%M:%S').time() if ':' in horario_str else datetime.strptime(horario_str, '%H:%M').time()
-                from datetime import timezone as dt_timezone
-                data_hora_reserva = datetime.combine(data_reserva, horario, tzinfo=dt_timezone.utc)
-                
-                # Você NÃO pode fazer reservas para antes da data/hora atual + 2 horas
-                limite_minimo = timezone.now() + timedelta(minutes=120)
-                
-                if data_hora_reserva < limite_minimo:
-                    return Response(
-                        {
-                            'error': 'Data e horário inválidos',
-                            'detail': 'Reservas devem ser feitas com no mínimo 2 horas de antecedência. '
-                                     f'Próximo horário disponível: {(timezone.now() + timedelta(minutes=120)).strftime("%d/%m/%Y às %H:%M")}'
-                        },
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            except (ValueError, TypeError):
-                pass  # Deixar o serializer validar o formato
-        
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        if not serializer.is_valid():
+            erros = serializer.errors
+            # Antecedência mínima: mantém o formato de erro da API ({error, detail})
+            if 'detail' in erros and 'data_reserva' in erros:
+                return Response(
+                    {'error': 'Data e horário inválidos', 'detail': erros['detail'][0]},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response(erros, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            self.perform_create(serializer)
+        except MesasInsuficientes as erro:
+            return Response(erro_com_sugestoes(erro, request.user.id), status=status.HTTP_400_BAD_REQUEST)
         
         # Retornar com serializer completo
         output_serializer = ReservaSerializer(serializer.instance)
@@ -240,7 +246,10 @@ class ReservaViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
+        try:
+            self.perform_update(serializer)
+        except MesasInsuficientes as erro:
+            return Response(erro_com_sugestoes(erro, request.user.id), status=status.HTTP_400_BAD_REQUEST)
         
         # Retornar com serializer completo
         output_serializer = ReservaSerializer(serializer.instance)
@@ -269,6 +278,7 @@ class ReservaViewSet(viewsets.ModelViewSet):
         
         reserva = self.get_object()
         reserva.delete()
+        liberar_ocupacao([(reserva.restaurante_id, reserva.data_reserva)])
         
         return Response(
             {'message': 'Reserva deletada permanentemente pelo administrador.'},
@@ -276,6 +286,7 @@ class ReservaViewSet(viewsets.ModelViewSet):
         )
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @idempotente
     def confirmar(self, request, pk=None):
         """
         Confirmar reserva.
@@ -359,6 +370,7 @@ class ReservaViewSet(viewsets.ModelViewSet):
         })
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @idempotente
     def cancelar(self, request, pk=None):
         """
         Cancelar reserva.
@@ -438,6 +450,7 @@ class ReservaViewSet(viewsets.ModelViewSet):
         # Atualizar status
         reserva.status = 'cancelada'
         reserva.save(skip_validation=True)
+        liberar_ocupacao([(reserva.restaurante_id, reserva.data_reserva)])
 
         # Notificar cliente quando houver usuário associado
         if reserva.usuario:
@@ -452,6 +465,9 @@ class ReservaViewSet(viewsets.ModelViewSet):
                          f'Mesas: {", ".join(mesas_numeros) if mesas_numeros else "-"}'
             )
         
+        # As mesas liberadas são oferecidas à lista de espera
+        agendar_atendimento([(reserva.restaurante_id, reserva.data_reserva, reserva.horario)])
+        
         serializer = ReservaSerializer(reserva)
         return Response({
             'message': 'Reserva cancelada com sucesso! As mesas foram liberadas.',
@@ -509,6 +525,7 @@ class ReservaViewSet(viewsets.ModelViewSet):
         # Concluir reserva
         reserva.status = 'concluida'
         reserva.save(skip_validation=True)
+        liberar_ocupacao([(reserva.restaurante_id, reserva.data_reserva)])
 
         # Notificar cliente quando houver usuário associado
         if reserva.usuario:
@@ -527,6 +544,91 @@ class ReservaViewSet(viewsets.ModelViewSet):
             'reserva': serializer.data
         })
     
+    @action(detail=False, methods=['post'])
+    @idempotente
+    def transicao_em_lote(self, request):
+        """
+        Confirma, cancela ou conclui várias reservas de uma vez.
+        Permitido para: admin_sistema, admin_secundario e funcionário (apenas seus restaurantes)
+        
+        Body:
+        - acao: 'confirmar', 'cancelar' ou 'concluir'
+        - ids: lista de IDs de reservas
+        
+        Retorna o resultado de cada ID (novo status ou erro), sem interromper o lote.
+        """
+        serializer = TransicaoEmLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        permitidos = restaurantes_gerenciados(request.user)
+        if permitidos is not None and not permitidos:
+            return Response(
+                {'error': 'Apenas administradores e funcionários podem alterar reservas em lote.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        resultados = aplicar_transicao(
+            request.user,
+            serializer.validated_data['acao'],
+            serializer.validated_data['ids'],
+            permitidos
+        )
+        sucesso = sum(1 for resultado in resultados if resultado['status'] != 'erro')
+        
+        return Response({
+            'message': f'{sucesso} de {len(resultados)} reserva(s) atualizada(s).',
+            'total': len(resultados),
+            'sucesso': sucesso,
+            'erros': len(resultados) - sucesso,
+            'resultados': resultados
+        })
+    
+    @action(detail=False, methods=['get', 'post'])
+    def lista_espera(self, request):
+        """
+        Lista de espera do usuário.
+        GET: entradas do usuário (filtro opcional: ?status=aguardando)
+        POST: entra na lista de espera de um restaurante
+        
+        Body (POST):
+        - restaurante, data_reserva, quantidade_pessoas, nome_cliente, telefone_cliente
+        - horario_inicio e horario_fim: janela de horários aceitos
+        
+        Quando uma reserva compatível é cancelada, as mesas liberadas são reservadas
+        automaticamente (status pendente) e o usuário é notificado.
+        """
+        if request.method == 'GET':
+            entradas = ListaEspera.objects.filter(usuario=request.user).select_related('restaurante')
+            status_filtro = request.query_params.get('status')
+            if status_filtro:
+                entradas = entradas.filter(status=status_filtro)
+            serializer = ListaEsperaSerializer(entradas, many=True)
+            return Response(serializer.data)
+        
+        serializer = ListaEsperaSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        entrada = serializer.save(usuario=request.user)
+        
+        return Response({
+            'message': 'Você entrou na lista de espera! Avisaremos quando abrir uma vaga.',
+            'entrada': ListaEsperaSerializer(entrada).data
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['delete'], url_path=r'lista_espera/(?P<entrada_id>[0-9]+)')
+    def sair_lista_espera(self, request, entrada_id=None):
+        """Remove o usuário da lista de espera (apenas entradas aguardando)"""
+        atualizadas = ListaEspera.objects.filter(
+            id=entrada_id, usuario=request.user, status='aguardando'
+        ).update(status='cancelada', data_atualizacao=timezone.now())
+        
+        if not atualizadas:
+            return Response(
+                {'error': 'Entrada da lista de espera não encontrada.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response({'message': 'Você saiu da lista de espera.'})
+    
     @action(detail=False, methods=['get'])
     def minhas_reservas(self, request):
         """
@@ -546,6 +648,83 @@ class ReservaViewSet(viewsets.ModelViewSet):
         serializer = ReservaListSerializer(queryset, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """
+        Exporta o histórico de reservas em streaming.
+        Respeita o mesmo escopo por papel da listagem e os filtros/busca/ordenação.
+        
+        Query params:
+        - formato: 'csv' (padrão) ou 'ndjson'
+        """
+        formato = request.query_params.get('formato', 'csv')
+        
+        if formato not in ['csv', 'ndjson']:
+            return Response(
+                {'error': "formato deve ser 'csv' ou 'ndjson'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        
+        if formato == 'csv':
+            response = StreamingHttpResponse(gerar_csv(queryset), content_type='text/csv; charset=utf-8')
+        else:
+            response = StreamingHttpResponse(gerar_ndjson(queryset), content_type='application/x-ndjson')
+        
+        response['Content-Disposition'] = f'attachment; filename="reservas.{formato}"'
+        return response
+    
+    @action(detail=False, methods=['post'])
+    @idempotente
+    def importar(self, request):
+        """
+        Importa reservas em lote a partir de um arquivo CSV ou JSON Lines.
+        Permitido para: admin_sistema, admin_secundario e funcionário (apenas seus restaurantes)
+        
+        Body (multipart):
+        - arquivo: arquivo com uma reserva por linha (campos do POST /api/reservas/)
+        - formato: 'csv' ou 'jsonl' (padrão: deduzido da extensão do arquivo)
+        
+        Retorna o resultado de cada linha: reserva criada (com as mesas) ou erros.
+        """
+        arquivo = request.FILES.get('arquivo')
+        if not arquivo:
+            return Response(
+                {'error': "O campo 'arquivo' é obrigatório."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        formato = request.data.get('formato') or arquivo.name.rsplit('.', 1)[-1].lower()
+        if formato not in FORMATOS_IMPORTACAO:
+            return Response(
+                {'error': "formato deve ser 'csv' ou 'jsonl'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        permitidos = restaurantes_gerenciados(request.user)
+        if permitidos is not None and not permitidos:
+            return Response(
+                {'error': 'Apenas administradores e funcionários podem importar reservas.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        try:
+            linhas = ler_linhas(arquivo, formato)
+        except ArquivoInvalido as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        resultados = importar_reservas(linhas, permitidos)
+        criadas = sum(1 for resultado in resultados if resultado['status'] == 'criada')
+        
+        return Response({
+            'message': f'{criadas} de {len(resultados)} reserva(s) importada(s).',
+            'total': len(resultados),
+            'criadas': criadas,
+            'erros': len(resultados) - criadas,
+            'resultados': resultados
+        })
+    
     @action(detail=False, methods=['get'])
     def hoje(self, request):
         """
@@ -621,10 +800,52 @@ class ReservaViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(status__in=self.STATUS_VISUALIZACAO_RESTAURANTE)
 
         queryset = queryset.order_by('horario')
-        
+
         serializer = ReservaListSerializer(queryset, many=True)
         return Response(serializer.data)
-    
+
+    @action(detail=False, methods=['get'])
+    def mudancas(self, request):
+        """
+        Sincronização incremental das telas da equipe (alternativa a consultar /hoje/).
+        Sem 'desde': reservas de hoje e mesas completas. Com 'desde=<cursor>': apenas
+        o que mudou desde o cursor e os ids removidos (reservas.sincronizacao).
+
+        Permitido para admin_sistema, proprietário e equipe do restaurante.
+        """
+        from restaurantes.painel import restaurante_e_papel
+        from .sincronizacao import ler_cursor, mudancas
+
+        restaurante_id = request.query_params.get('restaurante')
+        if not restaurante_id:
+            return Response(
+                {'error': 'Query param "restaurante" é obrigatório'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        desde = request.query_params.get('desde')
+        if desde:
+            desde = ler_cursor(desde)
+            if desde is None:
+                return Response(
+                    {'error': 'Cursor "desde" inválido. Use o cursor retornado pela chamada anterior.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        try:
+            restaurante, papel = restaurante_e_papel(request.user, int(restaurante_id))
+        except ValueError:
+            restaurante, papel = None, None
+        if restaurante is None:
+            return Response({'error': 'Restaurante não encontrado'}, status=status.HTTP_404_NOT_FOUND)
+        if papel is None:
+            return Response(
+                {'error': 'Você não tem acesso a este restaurante'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        return Response(mudancas(restaurante, desde, somente_visiveis=papel != 'admin_sistema'))
+
     @action(detail=False, methods=['get'])
     def estatisticas(self, request):
         """
@@ -840,6 +1061,107 @@ class ReservaViewSet(viewsets.ModelViewSet):
             'dados': serializer.data
         })
 
+    @action(detail=False, methods=['post'])
+    def relatorios(self, request):
+        """
+        RF13: Enfileira a geração de um relatório em segundo plano.
+        Evita que relatórios longos (ex.: ocupação de um ano inteiro) prendam o worker HTTP.
+        
+        Body:
+        - tipo: 'ocupacao', 'horarios_movimentados' ou 'estatisticas_periodo'
+        - restaurante_id, data_inicio, data_fim (YYYY-MM-DD)
+        - top (horarios_movimentados), tipo_periodo (estatisticas_periodo)
+        
+        Retorna o id do relatório para consulta de status e download.
+        """
+        entrada = RelatorioAssincronoCreateSerializer(data=request.data)
+        entrada.is_valid(raise_exception=True)
+        dados = entrada.validated_data
+        
+        restaurante_id_param = dados.get('restaurante_id')
+        restaurante_id, erro_response = self._resolver_restaurante_id_relatorio(
+            request,
+            str(restaurante_id_param) if restaurante_id_param else ''
+        )
+        if erro_response:
+            return erro_response
+        
+        parametros = {
+            'restaurante_id': restaurante_id,
+            'data_inicio': dados['data_inicio'].isoformat() if dados.get('data_inicio') else None,
+            'data_fim': dados['data_fim'].isoformat() if dados.get('data_fim') else None,
+        }
+        if dados['tipo'] == 'horarios_movimentados':
+            parametros['top'] = dados['top']
+        elif dados['tipo'] == 'estatisticas_periodo':
+            parametros['tipo_periodo'] = dados['tipo_periodo']
+        
+        relatorio = RelatorioAssincrono.objects.create(
+            usuario=request.user,
+            tipo=dados['tipo'],
+            parametros=parametros
+        )
+        job = enfileirar('reservas.gerar_relatorio', {'relatorio_id': relatorio.id})
+        relatorio.job_id = job.id
+        relatorio.save(update_fields=['job_id'])
+        relatorio.refresh_from_db()
+        
+        return Response(
+            {
+                'message': 'Relatório enfileirado. Consulte o status até a conclusão.',
+                'relatorio': RelatorioAssincronoSerializer(relatorio).data
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+    
+    def _obter_relatorio(self, request, relatorio_id):
+        """Busca um relatório assíncrono do usuário autenticado"""
+        return RelatorioAssincrono.objects.filter(
+            id=relatorio_id,
+            usuario=request.user
+        ).first()
+    
+    @action(detail=False, methods=['get'], url_path=r'relatorios/(?P<relatorio_id>[0-9]+)')
+    def relatorio_status(self, request, relatorio_id=None):
+        """Consulta status e progresso de um relatório assíncrono"""
+        relatorio = self._obter_relatorio(request, relatorio_id)
+        if not relatorio:
+            return Response(
+                {'error': 'Relatório não encontrado'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response(RelatorioAssincronoSerializer(relatorio).data)
+    
+    @action(detail=False, methods=['get'], url_path=r'relatorios/(?P<relatorio_id>[0-9]+)/download')
+    def relatorio_download(self, request, relatorio_id=None):
+        """Baixa o resultado (JSON) de um relatório assíncrono concluído"""
+        relatorio = self._obter_relatorio(request, relatorio_id)
+        if not relatorio:
+            return Response(
+                {'error': 'Relatório não encontrado'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        if relatorio.status != 'concluido':
+            return Response(
+                {
+                    'error': 'O relatório ainda não está disponível para download.',
+                    'status': relatorio.status,
+                    'progresso': relatorio.progresso
+                },
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        response = HttpResponse(
+            json.dumps(relatorio.resultado, ensure_ascii=False),
+            content_type='application/json; charset=utf-8'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="relatorio_{relatorio.tipo}_{relatorio.id}.json"'
+        )
+        return response
+
 class NotificacaoViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para gerenciar notificações do usuário.
@@ -912,4 +1234,29 @@ class NotificacaoViewSet(viewsets.ReadOnlyModelViewSet):
         return Response({
             'total': queryset.count(),
             'notificacoes': serializer.data
-        })
\ No newline at end of file
+        })
+
+def _notificacoes_nao_lidas(usuario):
+    return Notificacao.objects.filter(usuario=usuario, lido=False)
+
+
+@view_assincrona(NotificacaoViewSet.as_view({'get': 'contar_nao_lidas'}, basename='notificacao', detail=False))
+async def contar_nao_lidas_assincrona(request):
+    """GET /api/notificacoes/contar_nao_lidas/ com o ORM assíncrono (ASGI)"""
+    usuario = await exigir_usuario(request)
+    return resposta_json({'count': await _notificacoes_nao_lidas(usuario).acount()})
+
+
+@view_assincrona(NotificacaoViewSet.as_view({'get': 'nao_lidas'}, basename='notificacao', detail=False))
+async def nao_lidas_assincrona(request):
+    """GET /api/notificacoes/nao_lidas/ com o ORM assíncrono (ASGI)"""
+    usuario = await exigir_usuario(request)
+    notificacoes = [
+        notificacao async for notificacao in
+        _notificacoes_nao_lidas(usuario).select_related('reserva__restaurante')
+    ]
+    serializer = NotificacaoSerializer(notificacoes, many=True)
+    return resposta_json({
+        'total': len(notificacoes),
+        'notificacoes': serializer.data
+    })
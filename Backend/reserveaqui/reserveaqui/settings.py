@@ -93,8 +93,23 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'utils.replica.FixacaoPrimarioMiddleware',
+    # Por último: roda no mesmo modo (síncrono/assíncrono) do handler
+    'utils.instrumentacao.InstrumentacaoMiddleware',
 ]
 
+# Instrumentação por requisição (consultas, banco, view e serialização no cabeçalho
+# Server-Timing e no log reserveaqui.instrumentacao): fração das requisições medidas.
+# 0 remove o middleware da pilha; 1 mede todas
+INSTRUMENTACAO_AMOSTRAGEM = config('INSTRUMENTACAO_AMOSTRAGEM', default=0.01, cast=float)
+
+# O WhiteNoise só tem middleware síncrono: sob ASGI ele obriga cada requisição a passar
+# por uma thread. Desative quando o nginx servir /static/ (docker-compose) para manter
+# a pilha de middlewares assíncrona.
+WHITENOISE_HABILITADO = config('WHITENOISE_HABILITADO', default=True, cast=bool)
+if not WHITENOISE_HABILITADO:
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'reserveaqui.urls'
 
 TEMPLATES = [
@@ -152,6 +167,35 @@ else:
         }
     }
 
+# Réplica de leitura (opcional) para relatórios e leituras anônimas; veja utils/replica.py.
+# Aceita qualquer URL do dj_database_url (postgres://... ou sqlite:////caminho/replica.sqlite3).
+# Nos testes a réplica espelha o banco padrão.
+DATABASE_REPLICA_URL = config('DATABASE_REPLICA_URL', default='').strip()
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        DATABASE_REPLICA_URL,
+        conn_max_age=config('POSTGRES_CONN_MAX_AGE', default=60, cast=int),
+        ssl_require=config('POSTGRES_SSL_REQUIRE', default=False, cast=bool),
+    )
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['utils.replica.RoteadorReplica']
+
+# Pool de conexões nativo do psycopg 3 (OPTIONS['pool'] do Django). Cada processo do
+# gunicorn tem o seu pool, então o total de conexões é workers x POSTGRES_POOL_MAX_SIZE.
+# O pool substitui as conexões persistentes (CONN_MAX_AGE), que passa a 0.
+POSTGRES_POOL = config('POSTGRES_POOL', default=False, cast=bool)
+if POSTGRES_POOL:
+    for _banco in DATABASES.values():
+        if _banco['ENGINE'] == 'django.db.backends.postgresql':
+            _banco['CONN_MAX_AGE'] = 0
+            _banco.setdefault('OPTIONS', {})['pool'] = {
+                'min_size': config('POSTGRES_POOL_MIN_SIZE', default=1, cast=int),
+                'max_size': config('POSTGRES_POOL_MAX_SIZE', default=4, cast=int),
+                # Segundos esperando uma conexão livre antes de falhar a requisição
+                'timeout': config('POSTGRES_POOL_TIMEOUT', default=10, cast=float),
+            }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -237,6 +281,96 @@ DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@reserveaqui.c
 # Frontend URL para links de recuperação de senha
 FRONTEND_URL = config('FRONTEND_URL', default='http://localhost:3000')
 
+# Fila de jobs (utils.jobs) - executada pelo comando `run_worker`
+# Em desenvolvimento sem worker, JOBS_EXECUTAR_SINCRONO=True executa os jobs na própria requisição
+JOBS_EXECUTAR_SINCRONO = config('JOBS_EXECUTAR_SINCRONO', default=False, cast=bool)
+# Declara que há um serviço `run_worker` consumindo a fila; sem ele (e sem o modo síncrono)
+# `check --deploy`, executado pelo entrypoint.sh, falha (utils.E001)
+JOBS_WORKER_ATIVO = config('JOBS_WORKER_ATIVO', default=False, cast=bool)
+JOBS_MAX_TENTATIVAS = config('JOBS_MAX_TENTATIVAS', default=5, cast=int)
+JOBS_TIMEOUT_SEGUNDOS = config('JOBS_TIMEOUT_SEGUNDOS', default=600, cast=int)
+JOBS_BACKOFF_BASE_SEGUNDOS = config('JOBS_BACKOFF_BASE_SEGUNDOS', default=10, cast=int)
+JOBS_BACKOFF_MAX_SEGUNDOS = config('JOBS_BACKOFF_MAX_SEGUNDOS', default=3600, cast=int)
+
+# Cache (padrão: memória local do processo). O alias 'bloqueios' guarda os bloqueios
+# temporários de mesas e precisa ser compartilhado entre os processos do gunicorn;
+# o padrão usa a tabela de cache do banco (python manage.py createcachetable).
+# O alias 'compartilhado' é o L2 do cache da aplicação (utils.cache) e guarda as gerações
+# dos namespaces, então também precisa ser compartilhado: Redis com REDIS_URL, senão a
+# tabela de cache do banco. Memória local só com DEBUG (desenvolvimento) ou definida explicitamente.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    _cache_compartilhado = ('django.core.cache.backends.redis.RedisCache', REDIS_URL)
+elif DEBUG:
+    _cache_compartilhado = ('django.core.cache.backends.locmem.LocMemCache', 'reserveaqui_cache_compartilhado')
+else:
+    _cache_compartilhado = ('django.core.cache.backends.db.DatabaseCache', 'reserveaqui_cache_compartilhado')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'bloqueios': {
+        'BACKEND': config('BLOQUEIOS_CACHE_BACKEND', default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config('BLOQUEIOS_CACHE_LOCATION', default='reserveaqui_cache_bloqueios'),
+    },
+    'compartilhado': {
+        'BACKEND': config('CACHE_COMPARTILHADO_BACKEND', default=_cache_compartilhado[0]),
+        'LOCATION': config('CACHE_COMPARTILHADO_LOCATION', default=_cache_compartilhado[1]),
+    },
+}
+BLOQUEIOS_CACHE_ALIAS = 'bloqueios'
+BLOQUEIO_MESAS_TTL_SEGUNDOS = config('BLOQUEIO_MESAS_TTL_SEGUNDOS', default=300, cast=int)
+
+# Cache da aplicação (utils.cache): L1 em memória do processo na frente do L2 compartilhado.
+# Listagem pública de restaurantes e disponibilidade de mesas; invalidado pelas escritas
+CACHE_L1_ALIAS = 'default'
+CACHE_COMPARTILHADO_ALIAS = 'compartilhado'
+CACHE_L1_TTL_SEGUNDOS = config('CACHE_L1_TTL_SEGUNDOS', default=5, cast=int)
+CACHE_TTL_SEGUNDOS = config('CACHE_TTL_SEGUNDOS', default=60, cast=int)
+# Recomputação única: validade da trava de quem recalcula e espera máxima dos demais
+CACHE_TRAVA_SEGUNDOS = config('CACHE_TRAVA_SEGUNDOS', default=10, cast=int)
+CACHE_ESPERA_SEGUNDOS = config('CACHE_ESPERA_SEGUNDOS', default=5, cast=float)
+
+# Coalescência de consultas idênticas simultâneas em cada processo (utils.coalescencia):
+# por quanto tempo o resultado de verificar_disponibilidade é reaproveitado (0: só as simultâneas)
+COALESCENCIA_TTL_SEGUNDOS = config('COALESCENCIA_TTL_SEGUNDOS', default=1, cast=float)
+
+# Sincronização incremental da equipe (GET /api/reservas/mudancas/): margem de releitura antes
+# do cursor (escritas ainda não confirmadas) e por quantos dias as remoções ficam registradas
+MUDANCAS_MARGEM_SEGUNDOS = config('MUDANCAS_MARGEM_SEGUNDOS', default=5, cast=int)
+MUDANCAS_RETENCAO_DIAS = config('MUDANCAS_RETENCAO_DIAS', default=7, cast=int)
+
+# Sugestões de horários quando o horário pedido está lotado (POST /api/mesas/sugestoes/)
+SUGESTOES_QUANTIDADE = config('SUGESTOES_QUANTIDADE', default=5, cast=int)
+SUGESTOES_HORIZONTE_DIAS = config('SUGESTOES_HORIZONTE_DIAS', default=2, cast=int)
+SUGESTOES_GRANULARIDADE_MINUTOS = config('SUGESTOES_GRANULARIDADE_MINUTOS', default=30, cast=int)
+SUGESTOES_HORARIO_ABERTURA = config('SUGESTOES_HORARIO_ABERTURA', default='11:00')
+SUGESTOES_HORARIO_FECHAMENTO = config('SUGESTOES_HORARIO_FECHAMENTO', default='23:00')
+
+# Grade de horários compilada a partir do horário de funcionamento estruturado (cache 'default')
+HORARIOS_CACHE_TTL_SEGUNDOS = config('HORARIOS_CACHE_TTL_SEGUNDOS', default=3600, cast=int)
+
+# Particionamento mensal das reservas no PostgreSQL (python manage.py criar_particoes)
+PARTICOES_MESES_A_FRENTE = config('PARTICOES_MESES_A_FRENTE', default=3, cast=int)
+
+# Arquivo frio: dias com reservas finais mais antigos que N meses (python manage.py arquivar_reservas)
+ARQUIVO_RESERVAS_MESES = config('ARQUIVO_RESERVAS_MESES', default=12, cast=int)
+
+# Depois de uma escrita, as leituras do usuário ficam no banco principal por N segundos
+# (ler o que acabou de escrever apesar do atraso de replicação). A marcação fica no cache
+# compartilhado entre os processos.
+REPLICA_FIXACAO_SEGUNDOS = config('REPLICA_FIXACAO_SEGUNDOS', default=10, cast=int)
+REPLICA_FIXACAO_CACHE_ALIAS = config('REPLICA_FIXACAO_CACHE_ALIAS', default='bloqueios')
+
+# Respostas guardadas para o cabeçalho Idempotency-Key (criação, confirmação e cancelamento de reservas)
+IDEMPOTENCIA_TTL_HORAS = config('IDEMPOTENCIA_TTL_HORAS', default=24, cast=int)
+# Chave "em andamento" de um processo que morreu (OOM, timeout, reciclagem) é retomada após N segundos;
+# não deve ser menor que a duração máxima de uma requisição (timeout do gunicorn)
+IDEMPOTENCIA_ANDAMENTO_SEGUNDOS = config(
+    'IDEMPOTENCIA_ANDAMENTO_SEGUNDOS', default=config('GUNICORN_TIMEOUT', default=120, cast=int), cast=int
+)
+
 # CORS Configuration para React + TypeScript Frontend
 # Permite requisições cross-origin do frontend
 CORS_ALLOWED_ORIGINS = config(
@@ -266,6 +400,7 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
 ]
 
 if not DEBUG:
@@ -16,7 +16,7 @@ Including another URLconf
 """
 from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
@@ -25,7 +25,11 @@ from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, Sp
 from usuarios.views import UsuarioViewSet
 from restaurantes.views import RestauranteViewSet, RestauranteUsuarioViewSet
 from mesas.views import MesaViewSet
+from restaurantes.views import listar_restaurantes_assincrona, detalhar_restaurante_assincrona
+from mesas.views import verificar_disponibilidade_assincrona
 from reservas.views import ReservaViewSet, NotificacaoViewSet
+from reservas.views import contar_nao_lidas_assincrona, nao_lidas_assincrona
+from utils.views import MetricasBancoView
 
 # Criar um único router principal
 router = DefaultRouter()
@@ -42,8 +46,16 @@ def trigger_error(request):
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # Views assíncronas (ORM assíncrono sob ASGI) das leituras de maior volume; ficam antes
+    # do router para atender os mesmos caminhos das ações do DRF (ver utils/assincrono.py)
+    path('api/restaurantes/', listar_restaurantes_assincrona),
+    re_path(r'^api/restaurantes/(?P<pk>[^/.]+)/$', detalhar_restaurante_assincrona),
+    path('api/mesas/verificar_disponibilidade/', verificar_disponibilidade_assincrona),
+    path('api/notificacoes/contar_nao_lidas/', contar_nao_lidas_assincrona),
+    path('api/notificacoes/nao_lidas/', nao_lidas_assincrona),
     path('api/', include(router.urls)),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/metricas/banco/', MetricasBancoView.as_view(), name='metricas-banco'),
     
     # Swagger / OpenAPI Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Restaurante, RestauranteUsuario
+from .models import Restaurante, RestauranteUsuario, HorarioFuncionamento, ExcecaoHorario
 
 
 class RestauranteUsuarioInline(admin.TabularInline):
@@ -7,13 +7,18 @@ class RestauranteUsuarioInline(admin.TabularInline):
     extra = 1
 
 
+class HorarioFuncionamentoInline(admin.TabularInline):
+    model = HorarioFuncionamento
+    extra = 0
+
+
 @admin.register(Restaurante)
 class RestauranteAdmin(admin.ModelAdmin):
     list_display = ('nome', 'cidade', 'quantidade_mesas', 'proprietario', 'ativo', 'data_criacao')
     list_filter = ('ativo', 'cidade', 'data_criacao')
     search_fields = ('nome', 'cidade', 'email')
     readonly_fields = ('data_criacao', 'data_atualizacao')
-    inlines = [RestauranteUsuarioInline]
+    inlines = [RestauranteUsuarioInline, HorarioFuncionamentoInline]
     
     fieldsets = (
         ('Informações Básicas', {
@@ -38,3 +43,10 @@ class RestauranteUsuarioAdmin(admin.ModelAdmin):
     list_filter = ('papel', 'restaurante', 'data_vinculacao')
     search_fields = ('usuario__nome', 'restaurante__nome')
     readonly_fields = ('data_vinculacao',)
+
+
+@admin.register(ExcecaoHorario)
+class ExcecaoHorarioAdmin(admin.ModelAdmin):
+    list_display = ('data', 'restaurante', 'fechado', 'abertura', 'fechamento', 'descricao')
+    list_filter = ('fechado', 'data')
+    search_fields = ('restaurante__nome', 'descricao')
@@ -0,0 +1,157 @@
+"""
+Grade de horários reserváveis do restaurante.
+
+O horário semanal (HorarioFuncionamento) e as exceções futuras (ExcecaoHorario,
+incluindo feriados gerais) são compilados em uma grade de faixas de 15 minutos:
+um mapa de 96 bits por dia da semana mais um mapa por data de exceção. A grade
+fica no cache 'default' com uma chave que inclui as gerações (utils.cache) do
+namespace `grade:<restaurante>` e do namespace `grade:feriados`, trocadas sempre
+que o horário do restaurante ou um feriado geral muda; como as gerações ficam no
+cache compartilhado, todos os processos passam a usar a nova grade.
+
+Com a grade em mãos, saber se o restaurante está aberto em um horário é um
+teste de bit, sem consulta ao banco. Restaurantes sem horário estruturado não
+têm grade e aceitam qualquer horário.
+"""
+
+from datetime import time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from utils.cache import ageracao, geracao, invalidar
+
+NAMESPACE_FERIADOS = 'grade:feriados'
+
+MINUTOS_POR_SLOT = 15
+SLOTS_POR_DIA = 24 * 60 // MINUTOS_POR_SLOT
+DIA_INTEIRO = (1 << SLOTS_POR_DIA) - 1
+
+
+def _slot(horario):
+    return (horario.hour * 60 + horario.minute) // MINUTOS_POR_SLOT
+
+
+def faixa(abertura, fechamento):
+    """Bits das faixas em [abertura, fechamento) no mesmo dia (fechamento 00:00 = fim do dia)"""
+    inicio = _slot(abertura)
+    fim = _slot(fechamento) if fechamento > abertura else SLOTS_POR_DIA
+    return ((1 << (fim - inicio)) - 1) << inicio
+
+
+def _namespace(restaurante_id):
+    return f'grade:{restaurante_id}'
+
+
+def _chave(restaurante_id, geracao_restaurante, geracao_feriados):
+    return f'grade_horarios:{restaurante_id}:{geracao_restaurante}:{geracao_feriados}'
+
+
+def compilar_grade(restaurante_id):
+    """Compila a grade a partir do banco (duas consultas). Retorna None sem horário estruturado."""
+    from .models import ExcecaoHorario, HorarioFuncionamento
+
+    semana = [0] * 7
+    horarios = HorarioFuncionamento.objects.filter(restaurante_id=restaurante_id).values_list(
+        'dia_semana', 'abertura', 'fechamento'
+    )
+    if not horarios:
+        return None
+
+    for dia_semana, abertura, fechamento in horarios:
+        semana[dia_semana] |= faixa(abertura, fechamento)
+        if fechamento <= abertura and fechamento != time(0, 0):
+            # Parte após a meia-noite pertence ao dia seguinte
+            semana[(dia_semana + 1) % 7] |= faixa(time(0, 0), fechamento)
+
+    excecoes = {}
+    feriados = set()
+    for restaurante, data, fechado, abertura, fechamento in ExcecaoHorario.objects.filter(
+        Q(restaurante_id=restaurante_id) | Q(restaurante__isnull=True),
+        data__gte=timezone.now().date() - timedelta(days=1),
+    ).values_list('restaurante_id', 'data', 'fechado', 'abertura', 'fechamento'):
+        if restaurante is None:
+            feriados.add(data.isoformat())
+            continue
+        bits = 0 if fechado or not (abertura and fechamento) else faixa(abertura, fechamento)
+        excecoes[data.isoformat()] = excecoes.get(data.isoformat(), 0) | bits
+
+    for data in feriados:
+        excecoes.setdefault(data, 0)
+
+    return {'semana': semana, 'excecoes': excecoes}
+
+
+def grade_do_restaurante(restaurante):
+    """Grade compilada do restaurante (do cache quando possível) ou None"""
+    chave = _chave(
+        restaurante.id, geracao(_namespace(restaurante.id)), geracao(NAMESPACE_FERIADOS)
+    )
+    grade = cache.get(chave)
+    if grade is None:
+        grade = compilar_grade(restaurante.id) or {}
+        cache.set(chave, grade, timeout=settings.HORARIOS_CACHE_TTL_SEGUNDOS)
+    return grade or None
+
+
+async def agrade_do_restaurante(restaurante):
+    """Versão assíncrona de `grade_do_restaurante`"""
+    from asgiref.sync import sync_to_async
+
+    chave = _chave(
+        restaurante.id,
+        await ageracao(_namespace(restaurante.id)),
+        await ageracao(NAMESPACE_FERIADOS),
+    )
+    grade = await cache.aget(chave)
+    if grade is None:
+        grade = await sync_to_async(compilar_grade)(restaurante.id) or {}
+        await cache.aset(chave, grade, timeout=settings.HORARIOS_CACHE_TTL_SEGUNDOS)
+    return grade or None
+
+
+def invalidar_grade(restaurante_id=None):
+    """
+    Força a recompilação da grade do restaurante (ou de todos os restaurantes,
+    para feriados gerais) trocando a geração do namespace.
+    """
+    invalidar(NAMESPACE_FERIADOS if restaurante_id is None else _namespace(restaurante_id))
+
+
+def slots_do_dia(grade, data):
+    """Bits das faixas reserváveis na data (dia inteiro sem grade)"""
+    if grade is None:
+        return DIA_INTEIRO
+    excecao = grade['excecoes'].get(data.isoformat())
+    return excecao if excecao is not None else grade['semana'][data.weekday()]
+
+
+def esta_aberto(grade, data, horario):
+    """Indica se o horário está dentro do funcionamento (teste de bit, sem consulta)"""
+    return bool(slots_do_dia(grade, data) >> _slot(horario) & 1)
+
+
+def aberto_na_janela(grade, data, inicio, fim):
+    """Indica se há alguma faixa de funcionamento entre `inicio` e `fim` (inclusive)"""
+    janela = ((1 << (_slot(fim) - _slot(inicio) + 1)) - 1) << _slot(inicio)
+    return bool(slots_do_dia(grade, data) & janela)
+
+
+def horarios_do_dia(grade, data, granularidade_minutos):
+    """
+    Horários reserváveis da data, no passo informado.
+    Sem grade, usa a faixa SUGESTOES_HORARIO_ABERTURA–SUGESTOES_HORARIO_FECHAMENTO
+    (inclusive o horário de fechamento).
+    """
+    if grade is None:
+        fechamento = time.fromisoformat(settings.SUGESTOES_HORARIO_FECHAMENTO)
+        bits = faixa(time.fromisoformat(settings.SUGESTOES_HORARIO_ABERTURA), fechamento)
+        bits |= 1 << _slot(fechamento)
+    else:
+        bits = slots_do_dia(grade, data)
+
+    for minuto in range(0, 24 * 60, granularidade_minutos):
+        if bits >> (minuto // MINUTOS_POR_SLOT) & 1:
+            yield time(minuto // 60, minuto % 60)
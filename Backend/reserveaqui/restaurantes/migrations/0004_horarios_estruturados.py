@@ -0,0 +1,47 @@
+# Generated by Django 6.0.2 on 2026-10-19 02:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurantes', '0003_restaurante_horario_funcionamento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HorarioFuncionamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia_semana', models.PositiveSmallIntegerField(choices=[(0, 'Segunda-feira'), (1, 'Terça-feira'), (2, 'Quarta-feira'), (3, 'Quinta-feira'), (4, 'Sexta-feira'), (5, 'Sábado'), (6, 'Domingo')], verbose_name='Dia da Semana')),
+                ('abertura', models.TimeField(verbose_name='Abertura')),
+                ('fechamento', models.TimeField(verbose_name='Fechamento')),
+                ('restaurante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='horarios', to='restaurantes.restaurante', verbose_name='Restaurante')),
+            ],
+            options={
+                'verbose_name': 'Horário de Funcionamento',
+                'verbose_name_plural': 'Horários de Funcionamento',
+                'ordering': ['restaurante', 'dia_semana', 'abertura'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ExcecaoHorario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('fechado', models.BooleanField(default=True, verbose_name='Fechado')),
+                ('abertura', models.TimeField(blank=True, null=True, verbose_name='Abertura')),
+                ('fechamento', models.TimeField(blank=True, null=True, verbose_name='Fechamento')),
+                ('descricao', models.CharField(blank=True, max_length=100, verbose_name='Descrição')),
+                ('restaurante', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='excecoes_horario', to='restaurantes.restaurante', verbose_name='Restaurante')),
+            ],
+            options={
+                'verbose_name': 'Exceção de Horário',
+                'verbose_name_plural': 'Exceções de Horário',
+                'ordering': ['data'],
+                'indexes': [models.Index(fields=['restaurante', 'data'], name='restaurante_restaur_2dc4b8_idx')],
+            },
+        ),
+    ]
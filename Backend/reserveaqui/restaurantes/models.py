@@ -1,5 +1,5 @@
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from usuarios.models import Usuario
 
@@ -106,6 +106,80 @@ class RestauranteUsuario(models.Model):
         return f"{self.usuario.nome} - {self.restaurante.nome} ({self.get_papel_display()})"
 
 
+class HorarioFuncionamento(models.Model):
+    """
+    Faixa de funcionamento semanal do restaurante (pode haver mais de uma por dia).
+    Fechamento igual ou anterior à abertura indica que a faixa passa da meia-noite.
+    """
+    
+    DIAS_SEMANA = [
+        (0, 'Segunda-feira'),
+        (1, 'Terça-feira'),
+        (2, 'Quarta-feira'),
+        (3, 'Quinta-feira'),
+        (4, 'Sexta-feira'),
+        (5, 'Sábado'),
+        (6, 'Domingo'),
+    ]
+    
+    restaurante = models.ForeignKey(
+        Restaurante,
+        on_delete=models.CASCADE,
+        related_name='horarios',
+        verbose_name="Restaurante"
+    )
+    dia_semana = models.PositiveSmallIntegerField(choices=DIAS_SEMANA, verbose_name="Dia da Semana")
+    abertura = models.TimeField(verbose_name="Abertura")
+    fechamento = models.TimeField(verbose_name="Fechamento")
+    
+    class Meta:
+        verbose_name = "Horário de Funcionamento"
+        verbose_name_plural = "Horários de Funcionamento"
+        ordering = ['restaurante', 'dia_semana', 'abertura']
+    
+    def __str__(self):
+        return f"{self.restaurante.nome} - {self.get_dia_semana_display()} {self.abertura:%H:%M}-{self.fechamento:%H:%M}"
+
+
+class ExcecaoHorario(models.Model):
+    """
+    Exceção ao horário semanal em uma data: fechamento ou horário especial.
+    Sem restaurante, vale como feriado (fechado) para todos os restaurantes com
+    horário estruturado;
+    uma exceção do próprio restaurante na mesma data tem prioridade.
+    """
+    
+    restaurante = models.ForeignKey(
+        Restaurante,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='excecoes_horario',
+        verbose_name="Restaurante"
+    )
+    data = models.DateField(verbose_name="Data")
+    fechado = models.BooleanField(default=True, verbose_name="Fechado")
+    abertura = models.TimeField(null=True, blank=True, verbose_name="Abertura")
+    fechamento = models.TimeField(null=True, blank=True, verbose_name="Fechamento")
+    descricao = models.CharField(max_length=100, blank=True, verbose_name="Descrição")
+    
+    class Meta:
+        verbose_name = "Exceção de Horário"
+        verbose_name_plural = "Exceções de Horário"
+        ordering = ['data']
+        indexes = [
+            models.Index(fields=['restaurante', 'data']),
+        ]
+    
+    def __str__(self):
+        origem = self.restaurante.nome if self.restaurante else 'Feriado'
+        return f"{origem} - {self.data} ({'fechado' if self.fechado else 'horário especial'})"
+
+
+# Namespace da listagem pública de restaurantes no cache da aplicação (utils.cache)
+NAMESPACE_RESTAURANTES_PUBLICOS = 'restaurantes:publicos'
+
+
 @receiver(post_save, sender=Restaurante)
 def criar_mesas_restaurante(sender, instance, created, **kwargs):
     """Signal para criar mesas automaticamente quando um restaurante é criado ou atualizado"""
@@ -114,3 +188,26 @@ def criar_mesas_restaurante(sender, instance, created, **kwargs):
         instance._creating_mesas = True
         instance.criar_mesas()
         delattr(instance, '_creating_mesas')
+
+
+@receiver([post_save, post_delete], sender=Restaurante)
+def invalidar_cache_restaurante(sender, instance, **kwargs):
+    """
+    Signal para descartar a listagem pública, o painel e a grade de horários em
+    cache quando um restaurante muda (a grade também para que um id reaproveitado
+    não herde a de um restaurante removido)
+    """
+    from utils.cache import invalidar
+    from .horarios import invalidar_grade
+    from .painel import invalidar_painel
+    invalidar(NAMESPACE_RESTAURANTES_PUBLICOS)
+    invalidar_painel(instance.id)
+    invalidar_grade(instance.id)
+
+
+@receiver([post_save, post_delete], sender=HorarioFuncionamento)
+@receiver([post_save, post_delete], sender=ExcecaoHorario)
+def invalidar_grade_horarios(sender, instance, **kwargs):
+    """Signal para descartar a grade de horários compilada quando o horário muda"""
+    from .horarios import invalidar_grade
+    invalidar_grade(instance.restaurante_id)
@@ -0,0 +1,141 @@
+"""
+Painel do restaurante (GET /api/restaurantes/{id}/painel/).
+
+Reúne em uma resposta o que as telas do proprietário e da equipe buscavam em
+chamadas separadas (reservas de hoje, estatísticas, mesas, notificações não
+lidas e "meus restaurantes"), com o papel do usuário resolvido uma única vez,
+na mesma consulta que busca o restaurante.
+
+A parte que não depende do usuário (restaurante, mesas, reservas de hoje e
+estatísticas) é montada com consultas agrupadas e guardada no cache da
+aplicação (utils.cache) no namespace `painel:<restaurante>`, descartado pelas
+escritas: reservas salvas/removidas ou com status alterado em lote, mapa de
+ocupação, mesas e o próprio restaurante.
+"""
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from utils.cache import invalidar, obter
+
+STATUS_CONTADOS = ('pendente', 'confirmada', 'cancelada', 'concluida')
+PAPEIS_COM_ESTATISTICAS = ('admin_sistema', 'proprietario', 'admin_secundario')
+
+
+def namespace_painel(restaurante_id):
+    return f'painel:{restaurante_id}'
+
+
+def invalidar_painel(restaurante_id):
+    """Descarta o painel em cache do restaurante (e de novo após o commit)"""
+    invalidar(namespace_painel(restaurante_id))
+    transaction.on_commit(lambda: invalidar(namespace_painel(restaurante_id)))
+
+
+def restaurante_e_papel(usuario, restaurante_id):
+    """
+    (restaurante, papel do usuário nele) em uma consulta. O papel é 'admin_sistema',
+    'proprietario', o papel do vínculo da equipe ('admin_secundario' ou
+    'funcionario') ou None sem acesso. Restaurante inexistente: (None, None).
+    """
+    from usuarios.models import UsuarioPapel
+    from .models import Restaurante, RestauranteUsuario
+
+    restaurante = Restaurante.objects.select_related('proprietario').annotate(
+        usuario_admin_sistema=Exists(
+            UsuarioPapel.objects.filter(usuario=usuario, papel__tipo='admin_sistema')
+        ),
+        usuario_vinculo=Subquery(
+            RestauranteUsuario.objects.filter(
+                restaurante=OuterRef('pk'), usuario=usuario
+            ).values('papel')[:1]
+        ),
+    ).filter(pk=restaurante_id).first()
+
+    if restaurante is None:
+        return None, None
+    if restaurante.usuario_admin_sistema:
+        return restaurante, 'admin_sistema'
+    if restaurante.proprietario_id == usuario.id:
+        return restaurante, 'proprietario'
+    return restaurante, restaurante.usuario_vinculo
+
+
+def restaurantes_do_usuario(usuario, admin_sistema):
+    """Restaurantes do usuário: todos para o admin_sistema; senão os que possui ou em que trabalha"""
+    from .models import Restaurante
+
+    if admin_sistema:
+        restaurantes = Restaurante.objects.all()
+    else:
+        restaurantes = Restaurante.objects.filter(Q(proprietario=usuario) | Q(usuarios__usuario=usuario))
+    return restaurantes.distinct()
+
+
+def dados_do_restaurante(restaurante, hoje):
+    """Parte do painel que não depende do usuário (quatro consultas)"""
+    from mesas.serializers import MesaSerializer
+    from reservas.models import Reserva
+    from reservas.serializers import ReservaListSerializer
+    from .serializers import RestauranteListSerializer
+
+    mesas = list(restaurante.mesas.order_by('numero'))
+    restaurante._prefetched_objects_cache = {'mesas': mesas}
+
+    reservas_hoje = list(Reserva.objects.filter(
+        restaurante=restaurante, data_reserva=hoje
+    ).prefetch_related('mesas').order_by('horario'))
+    for reserva in reservas_hoje:
+        # O restaurante já está carregado (restaurante_nome no serializer)
+        reserva.restaurante = restaurante
+
+    estatisticas = Reserva.objects.filter(restaurante=restaurante).aggregate(
+        total_reservas=Count('id'),
+        **{f'{status}s': Count('id', filter=Q(status=status)) for status in STATUS_CONTADOS},
+        hoje=Count('id', filter=Q(data_reserva=hoje)),
+    )
+
+    return {
+        'restaurante': dict(RestauranteListSerializer(restaurante).data),
+        'mesas': list(MesaSerializer(mesas, many=True).data),
+        'hoje': list(ReservaListSerializer(reservas_hoje, many=True).data),
+        'estatisticas': estatisticas,
+        'gerado_em': timezone.now(),
+    }
+
+
+def montar_painel(usuario, restaurante, papel):
+    """Resposta do painel: parte do restaurante (em cache) mais os dados do usuário"""
+    from reservas.models import Notificacao
+    from .serializers import RestauranteListSerializer
+
+    hoje = timezone.now().date()
+    dados = obter(
+        namespace_painel(restaurante.id), hoje.isoformat(),
+        lambda: dados_do_restaurante(restaurante, hoje),
+    )
+
+    reservas_hoje = dados['hoje']
+    if papel != 'admin_sistema':
+        # Usuários do restaurante veem apenas reservas ativas/pendentes (como em /reservas/hoje/)
+        from reservas.views import ReservaViewSet
+        reservas_hoje = [
+            reserva for reserva in reservas_hoje
+            if reserva['status'] in ReservaViewSet.STATUS_VISUALIZACAO_RESTAURANTE
+        ]
+
+    return {
+        'papel': papel,
+        'restaurante': dados['restaurante'],
+        'hoje': reservas_hoje,
+        'estatisticas': dados['estatisticas'] if papel in PAPEIS_COM_ESTATISTICAS else None,
+        'mesas': dados['mesas'],
+        'notificacoes_nao_lidas': Notificacao.objects.filter(usuario=usuario, lido=False).count(),
+        'meus_restaurantes': RestauranteListSerializer(
+            restaurantes_do_usuario(usuario, papel == 'admin_sistema')
+            .select_related('proprietario').prefetch_related('mesas'),
+            many=True,
+        ).data,
+        'gerado_em': dados['gerado_em'],
+    }
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Restaurante, RestauranteUsuario
+from .models import Restaurante, RestauranteUsuario, HorarioFuncionamento, ExcecaoHorario
 
 
 class RestauranteSerializer(serializers.ModelSerializer):
@@ -161,3 +161,31 @@ class AdicionarFuncionarioSerializer(serializers.Serializer):
         if Usuario.objects.filter(email=value).exists():
             raise serializers.ValidationError("Já existe um usuário com este email.")
         return value
+
+
+class HorarioFuncionamentoSerializer(serializers.ModelSerializer):
+    """Faixa do horário semanal (fechamento ≤ abertura = passa da meia-noite)"""
+    
+    dia_semana_display = serializers.CharField(source='get_dia_semana_display', read_only=True)
+    
+    class Meta:
+        model = HorarioFuncionamento
+        fields = ['id', 'dia_semana', 'dia_semana_display', 'abertura', 'fechamento']
+        read_only_fields = ['id']
+
+
+class ExcecaoHorarioSerializer(serializers.ModelSerializer):
+    """Exceção ao horário semanal em uma data (fechamento ou horário especial)"""
+    
+    class Meta:
+        model = ExcecaoHorario
+        fields = ['id', 'data', 'fechado', 'abertura', 'fechamento', 'descricao']
+        read_only_fields = ['id']
+    
+    def validate(self, data):
+        """Horário especial exige abertura e fechamento"""
+        if not data.get('fechado', True) and not (data.get('abertura') and data.get('fechamento')):
+            raise serializers.ValidationError(
+                'Para um horário especial, informe a abertura e o fechamento.'
+            )
+        return data
@@ -0,0 +1,39 @@
+from django.utils import timezone
+
+from utils.jobs import tarefa
+from .models import Restaurante
+
+
+@tarefa('restaurantes.notificar_desativacao')
+def notificar_desativacao(restaurante_id):
+    """
+    Notifica os clientes com reservas futuras ativas quando o restaurante é desativado.
+    As notificações são gravadas em lotes com bulk_create.
+    """
+    from reservas.models import Reserva, Notificacao
+
+    restaurante = Restaurante.objects.get(id=restaurante_id)
+
+    reservas = Reserva.objects.filter(
+        restaurante_id=restaurante_id,
+        data_reserva__gte=timezone.now().date(),
+        status__in=['pendente', 'confirmada'],
+        usuario__isnull=False,
+    ).values_list('id', 'usuario_id', 'data_reserva', 'horario')
+
+    lote = []
+    for reserva_id, usuario_id, data_reserva, horario in reservas.iterator(chunk_size=1000):
+        lote.append(Notificacao(
+            usuario_id=usuario_id,
+            reserva_id=reserva_id,
+            tipo='atualizacao',
+            titulo=f'Restaurante Indisponível - {restaurante.nome}',
+            mensagem=f'O restaurante {restaurante.nome} foi desativado. Sua reserva para '
+                     f'{data_reserva} às {horario} pode ser afetada; entre em contato com o restaurante.'
+        ))
+        if len(lote) >= 1000:
+            Notificacao.objects.bulk_create(lote)
+            lote = []
+
+    if lote:
+        Notificacao.objects.bulk_create(lote)
@@ -1,7 +1,11 @@
+from datetime import time, timedelta
 from django.test import TestCase
 from django.db import IntegrityError
+from django.utils import timezone
+from rest_framework.test import APIClient
 from usuarios.models import Usuario, Papel
-from .models import Restaurante, RestauranteUsuario
+from .horarios import esta_aberto, grade_do_restaurante
+from .models import Restaurante, RestauranteUsuario, ExcecaoHorario
 
 
 class RestauranteModelTest(TestCase):
@@ -202,3 +206,252 @@ class RestauranteUsuarioModelTest(TestCase):
             
             self.assertEqual(vinculo.papel, papel)
             self.assertEqual(vinculo.get_papel_display(), {'admin_secundario': 'Admin Secundário', 'funcionario': 'Funcionário', 'cliente': 'Cliente'}[papel])
+
+
+class HorarioFuncionamentoApiTest(TestCase):
+    """Testes para o horário de funcionamento estruturado e a grade compilada"""
+    
+    def setUp(self):
+        self.proprietario = Usuario.objects.create_user(
+            email='proprietario@test.com',
+            nome='Proprietário',
+            username='prop_test',
+            password='SenhaForte123'
+        )
+        self.restaurante = Restaurante.objects.create(
+            nome='Test Restaurant',
+            endereco='Rua Test',
+            cidade='Test City',
+            estado='TC',
+            cep='99999-999',
+            email='test@restaurant.com',
+            proprietario=self.proprietario
+        )
+        self.client = APIClient()
+        self.url = f'/api/restaurantes/{self.restaurante.id}/horarios/'
+        # Próxima sexta-feira
+        hoje = timezone.now().date()
+        self.sexta = hoje + timedelta(days=(4 - hoje.weekday()) % 7 or 7)
+    
+    def _grade(self):
+        self.restaurante.refresh_from_db()
+        return grade_do_restaurante(self.restaurante)
+    
+    def test_substituir_horario_semanal(self):
+        """Teste que o proprietário define o horário e a consulta é pública"""
+        self.client.force_authenticate(self.proprietario)
+        response = self.client.put(self.url, [
+            {'dia_semana': 4, 'abertura': '18:00', 'fechamento': '02:00'},
+            {'dia_semana': 5, 'abertura': '12:00', 'fechamento': '15:00'},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['horarios']), 2)
+        
+        self.client.force_authenticate(None)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['horarios'][0]['dia_semana_display'], 'Sexta-feira')
+    
+    def test_apenas_proprietario_ou_admin_altera(self):
+        """Teste que outros usuários não alteram o horário"""
+        outro = Usuario.objects.create_user(
+            email='outro@test.com', nome='Outro', username='outro', password='SenhaForte123'
+        )
+        self.client.force_authenticate(outro)
+        response = self.client.put(self.url, [
+            {'dia_semana': 0, 'abertura': '18:00', 'fechamento': '22:00'},
+        ], format='json')
+        self.assertEqual(response.status_code, 403)
+    
+    def test_grade_com_faixa_apos_meia_noite(self):
+        """Teste que a faixa que passa da meia-noite vale no dia seguinte"""
+        self.client.force_authenticate(self.proprietario)
+        self.client.put(self.url, [{'dia_semana': 4, 'abertura': '18:00', 'fechamento': '02:00'}], format='json')
+        
+        grade = self._grade()
+        sabado = self.sexta + timedelta(days=1)
+        self.assertTrue(esta_aberto(grade, self.sexta, time(23, 30)))
+        self.assertFalse(esta_aberto(grade, self.sexta, time(17, 45)))
+        self.assertTrue(esta_aberto(grade, sabado, time(1, 45)))
+        self.assertFalse(esta_aberto(grade, sabado, time(2, 0)))
+    
+    def test_excecoes_recompilam_a_grade(self):
+        """Teste que cadastrar e remover uma exceção invalida a grade em cache"""
+        self.client.force_authenticate(self.proprietario)
+        self.client.put(self.url, [{'dia_semana': 4, 'abertura': '18:00', 'fechamento': '23:00'}], format='json')
+        self.assertTrue(esta_aberto(self._grade(), self.sexta, time(19, 0)))
+        
+        response = self.client.post(
+            f'/api/restaurantes/{self.restaurante.id}/excecoes/',
+            {'data': self.sexta.isoformat(), 'descricao': 'Reforma'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(esta_aberto(self._grade(), self.sexta, time(19, 0)))
+        
+        response = self.client.delete(
+            f'/api/restaurantes/{self.restaurante.id}/excecoes/{response.data["id"]}/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertTrue(esta_aberto(self._grade(), self.sexta, time(19, 0)))
+
+    def test_feriado_recompila_a_grade_sem_alterar_restaurantes(self):
+        """Teste que o feriado geral invalida a grade sem atualizar os restaurantes"""
+        self.client.force_authenticate(self.proprietario)
+        self.client.put(self.url, [{'dia_semana': 4, 'abertura': '18:00', 'fechamento': '23:00'}], format='json')
+        self.assertTrue(esta_aberto(self._grade(), self.sexta, time(19, 0)))
+        atualizado_em = self.restaurante.data_atualizacao
+
+        feriado = ExcecaoHorario.objects.create(data=self.sexta, descricao='Feriado')
+        self.assertFalse(esta_aberto(self._grade(), self.sexta, time(19, 0)))
+        self.assertEqual(self.restaurante.data_atualizacao, atualizado_em)
+
+        feriado.delete()
+        self.assertTrue(esta_aberto(self._grade(), self.sexta, time(19, 0)))
+
+    def test_horario_especial_exige_faixa(self):
+        """Teste que a exceção com horário especial exige abertura e fechamento"""
+        self.client.force_authenticate(self.proprietario)
+        response = self.client.post(
+            f'/api/restaurantes/{self.restaurante.id}/excecoes/',
+            {'data': self.sexta.isoformat(), 'fechado': False},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+    
+    def test_sem_horario_estruturado_aceita_qualquer_horario(self):
+        """Teste que restaurantes sem horário estruturado não têm grade"""
+        ExcecaoHorario.objects.create(data=self.sexta, descricao='Feriado')
+        self.assertIsNone(self._grade())
+        self.assertTrue(esta_aberto(None, self.sexta, time(3, 0)))
+
+
+class RestauranteListagemPublicaCacheTest(TestCase):
+    """Testes para a listagem pública de restaurantes pelo cache da aplicação"""
+    
+    def setUp(self):
+        self.proprietario = Usuario.objects.create_user(
+            email='proprietario@test.com',
+            nome='Proprietário',
+            username='prop_test',
+            password='SenhaForte123'
+        )
+        self.restaurante = Restaurante.objects.create(
+            nome='Restaurante A',
+            endereco='Rua A',
+            cidade='Cidade A',
+            estado='CA',
+            cep='11111-111',
+            email='a@restaurant.com',
+            proprietario=self.proprietario,
+            quantidade_mesas=2
+        )
+        self.client = APIClient()
+    
+    def test_listagem_anonima_em_cache_e_invalidada(self):
+        """Teste que a segunda listagem não consulta o banco e escritas descartam o cache"""
+        response = self.client.get('/api/restaurantes/', {'cidade': 'Cidade A'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/restaurantes/', {'cidade': 'Cidade A'})
+        self.assertEqual(response.data[0]['mesas_disponiveis'], 2)
+        
+        mesa = self.restaurante.mesas.first()
+        mesa.status = 'ocupada'
+        mesa.save()
+        response = self.client.get('/api/restaurantes/', {'cidade': 'Cidade A'})
+        self.assertEqual(response.data[0]['mesas_disponiveis'], 1)
+        
+        self.restaurante.ativo = False
+        self.restaurante.save()
+        response = self.client.get('/api/restaurantes/', {'cidade': 'Cidade A'})
+        self.assertEqual(response.data, [])
+
+
+class PainelRestauranteApiTest(TestCase):
+    """Testes para GET /api/restaurantes/{id}/painel/"""
+    
+    def setUp(self):
+        from reservas.models import Notificacao, Reserva
+        
+        self.proprietario = Usuario.objects.create_user(
+            email='proprietario@test.com',
+            nome='Proprietário',
+            username='prop_test',
+            password='SenhaForte123'
+        )
+        self.funcionario = Usuario.objects.create_user(
+            email='funcionario@test.com', nome='Funcionário', username='func_test', password='SenhaForte123'
+        )
+        self.restaurante = Restaurante.objects.create(
+            nome='Restaurante Painel',
+            endereco='Rua Painel',
+            cidade='Cidade',
+            estado='CA',
+            cep='11111-111',
+            email='painel@restaurant.com',
+            proprietario=self.proprietario,
+            quantidade_mesas=3
+        )
+        RestauranteUsuario.objects.create(restaurante=self.restaurante, usuario=self.funcionario, papel='funcionario')
+        
+        hoje = timezone.now().date()
+        for horario, status in [(time(12, 0), 'confirmada'), (time(13, 0), 'cancelada')]:
+            reserva = Reserva(
+                restaurante=self.restaurante, usuario=self.proprietario, data_reserva=hoje, horario=horario,
+                quantidade_pessoas=2, nome_cliente='Cliente', telefone_cliente='999999999', status=status
+            )
+            reserva.save(skip_validation=True)
+        Notificacao.objects.create(usuario=self.proprietario, reserva=reserva, titulo='Reserva', mensagem='...')
+        
+        self.client = APIClient()
+        self.url = f'/api/restaurantes/{self.restaurante.id}/painel/'
+    
+    def test_painel_do_proprietario(self):
+        """Teste que o painel reúne reservas de hoje, estatísticas, mesas, notificações e restaurantes"""
+        self.client.force_authenticate(self.proprietario)
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['papel'], 'proprietario')
+        self.assertEqual([reserva['status'] for reserva in response.data['hoje']], ['confirmada'])
+        self.assertEqual(response.data['estatisticas']['total_reservas'], 2)
+        self.assertEqual(response.data['estatisticas']['canceladas'], 1)
+        self.assertEqual(response.data['estatisticas']['hoje'], 2)
+        self.assertEqual(len(response.data['mesas']), 3)
+        self.assertEqual(response.data['notificacoes_nao_lidas'], 1)
+        self.assertEqual([r['id'] for r in response.data['meus_restaurantes']], [self.restaurante.id])
+    
+    def test_parte_do_restaurante_em_cache_e_invalidada(self):
+        """Teste que o painel em cache só consulta os dados do usuário e é descartado por escritas"""
+        self.client.force_authenticate(self.proprietario)
+        self.client.get(self.url)
+        
+        # Restaurante e papel, notificações, meus restaurantes (+ mesas)
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data['hoje']), 1)
+        
+        reserva = self.restaurante.reservas.get(status='cancelada')
+        reserva.status = 'pendente'
+        reserva.save(skip_validation=True)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data['hoje']), 2)
+        self.assertEqual(response.data['estatisticas']['pendentes'], 1)
+    
+    def test_funcionario_sem_estatisticas_e_sem_acesso(self):
+        """Teste que a equipe vê o painel sem estatísticas e outros usuários não acessam"""
+        self.client.force_authenticate(self.funcionario)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['papel'], 'funcionario')
+        self.assertIsNone(response.data['estatisticas'])
+        
+        outro = Usuario.objects.create_user(
+            email='outro@test.com', nome='Outro', username='outro', password='SenhaForte123'
+        )
+        self.client.force_authenticate(outro)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.client.get('/api/restaurantes/999999/painel/').status_code, 404)
@@ -1,22 +1,37 @@
+from contextlib import nullcontext
+
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Restaurante, RestauranteUsuario
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from .models import (
+    NAMESPACE_RESTAURANTES_PUBLICOS, Restaurante, RestauranteUsuario, HorarioFuncionamento, ExcecaoHorario
+)
 from .serializers import (
     RestauranteSerializer,
     RestauranteListSerializer,
     RestauranteCreateUpdateSerializer,
     RestauranteUsuarioSerializer,
-    AdicionarFuncionarioSerializer
+    AdicionarFuncionarioSerializer,
+    HorarioFuncionamentoSerializer,
+    ExcecaoHorarioSerializer
 )
+from .horarios import invalidar_grade
+from .painel import montar_painel, restaurante_e_papel, restaurantes_do_usuario
 from .permissions import IsAdminOrReadOnly, IsProprietarioOrAdmin, IsAdminSystemOnly
 from usuarios.models import Usuario, Papel
-from usuarios.utils import enviar_senha_generica
+from utils.jobs import enfileirar
+from utils.assincrono import requisicao_drf, resposta_json, tem_credenciais, view_assincrona
+from utils.cache import aobter, obter
+from utils.replica import LeituraReplicaMixin, replica_configurada, usando_replica
 
 
-class RestauranteViewSet(viewsets.ModelViewSet):
+class RestauranteViewSet(LeituraReplicaMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciar restaurantes.
     
@@ -26,6 +41,8 @@ class RestauranteViewSet(viewsets.ModelViewSet):
     update: Atualizar restaurante (proprietário ou admin autenticado)
     partial_update: Atualizar parcialmente restaurante (proprietário ou admin autenticado)
     destroy: Remover restaurante (apenas admin autenticado)
+    horarios: Horário de funcionamento estruturado (público; PUT substitui o horário semanal)
+    excecoes: Cadastrar/remover exceções de horário (proprietário ou admin)
     """
     
     queryset = Restaurante.objects.select_related('proprietario').prefetch_related('mesas').all()
@@ -35,6 +52,7 @@ class RestauranteViewSet(viewsets.ModelViewSet):
     search_fields = ['nome', 'cidade', 'endereco']
     ordering_fields = ['nome', 'cidade', 'data_criacao']
     ordering = ['nome']
+    leitura_anonima_replica = True
     
     def get_serializer_class(self):
         """Retorna o serializer apropriado para cada ação"""
@@ -57,6 +75,10 @@ class RestauranteViewSet(viewsets.ModelViewSet):
                return [IsAuthenticated(), IsAdminSystemOnly()]
         elif self.action in ['update', 'partial_update']:
             return [IsAuthenticated(), IsProprietarioOrAdmin()]
+        elif self.action in ['excecoes', 'remover_excecao'] or (
+            self.action == 'horarios' and self.request.method == 'PUT'
+        ):
+            return [IsAuthenticated(), IsProprietarioOrAdmin()]
         elif self.action == 'destroy':
             # Apenas admin_sistema pode deletar restaurante
             return [IsAuthenticated(), IsAdminSystemOnly()]
@@ -100,21 +122,32 @@ class RestauranteViewSet(viewsets.ModelViewSet):
         # Clientes e funcionários veem apenas restaurantes ativos
         return queryset.filter(ativo=True)
     
+    def list(self, request, *args, **kwargs):
+        """
+        Listagem anônima pelo cache da aplicação, por filtros/busca/ordenação
+        (invalidada quando restaurantes ou mesas mudam). Usuários autenticados
+        consultam o banco: a visibilidade depende do papel.
+        """
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        return Response(obter(
+            NAMESPACE_RESTAURANTES_PUBLICOS,
+            chave_listagem_publica(request),
+            lambda: list(self.get_serializer(self.filter_queryset(self.get_queryset()), many=True).data),
+        ))
+    
     def perform_create(self, serializer):
         """Ao criar restaurante, cria também o proprietário (admin_secundario) com senha genérica"""
         proprietario_email = serializer.validated_data.pop('proprietario_email', None)
         proprietario_nome = serializer.validated_data.pop('proprietario_nome', None)
         
-        # Gerar senha genérica
-        senha_generica = Usuario.gerar_senha_generica()
-        
-        # Criar usuário admin_secundario
+        # Criar usuário admin_secundario (a senha genérica é definida pelo job de email)
         username = proprietario_email.split('@')[0]
         proprietario = Usuario.objects.create_user(
             username=username,
             email=proprietario_email,
             nome=proprietario_nome,
-            password=senha_generica
+            password=None
         )
         
         # Marcar para trocar senha no primeiro acesso
@@ -125,8 +158,11 @@ class RestauranteViewSet(viewsets.ModelViewSet):
         papel_admin = Papel.objects.get(tipo='admin_secundario')
         proprietario.papeis.add(papel_admin)
         
-        # Enviar senha por email
-        enviar_senha_generica(proprietario, senha_generica, 'Administrador Secundário')
+        # Enviar senha por email (fila de jobs)
+        enfileirar('usuarios.enviar_senha_generica', {
+            'usuario_id': proprietario.id,
+            'tipo_usuario': 'Administrador Secundário',
+        })
         
         # Salvar restaurante com proprietário
         restaurante = serializer.save(proprietario=proprietario)
@@ -138,6 +174,14 @@ class RestauranteViewSet(viewsets.ModelViewSet):
             papel='admin_secundario'
         )
     
+    def perform_update(self, serializer):
+        """Ao desativar o restaurante, notifica os clientes com reservas futuras (fila de jobs)"""
+        estava_ativo = serializer.instance.ativo
+        restaurante = serializer.save()
+        
+        if estava_ativo and not restaurante.ativo:
+            enfileirar('restaurantes.notificar_desativacao', {'restaurante_id': restaurante.id})
+    
     @action(detail=True, methods=['get'])
     def mesas(self, request, pk=None):
         """Retorna as mesas do restaurante"""
@@ -150,6 +194,81 @@ class RestauranteViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def painel(self, request, pk=None):
+        """
+        Painel do proprietário/equipe em uma resposta: reservas de hoje, estatísticas
+        (apenas administradores), mesas, notificações não lidas e meus restaurantes.
+        A parte do restaurante fica em cache até a próxima escrita (restaurantes.painel).
+        """
+        try:
+            restaurante, papel = restaurante_e_papel(request.user, int(pk))
+        except ValueError:
+            restaurante, papel = None, None
+        if restaurante is None:
+            return Response({'error': 'Restaurante não encontrado'}, status=status.HTTP_404_NOT_FOUND)
+        if papel is None:
+            return Response(
+                {'error': 'Você não tem acesso a este restaurante'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return Response(montar_painel(request.user, restaurante, papel))
+    
+    @action(detail=True, methods=['get', 'put'])
+    def horarios(self, request, pk=None):
+        """
+        GET: horário semanal e exceções futuras do restaurante.
+        PUT: substitui o horário semanal (lista de {dia_semana, abertura, fechamento}).
+        Restaurantes sem horário estruturado aceitam reservas em qualquer horário.
+        """
+        restaurante = self.get_object()
+        
+        if request.method == 'PUT':
+            serializer = HorarioFuncionamentoSerializer(data=request.data, many=True)
+            serializer.is_valid(raise_exception=True)
+            with transaction.atomic():
+                HorarioFuncionamento.objects.filter(restaurante=restaurante).delete()
+                HorarioFuncionamento.objects.bulk_create([
+                    HorarioFuncionamento(restaurante=restaurante, **dados)
+                    for dados in serializer.validated_data
+                ])
+                invalidar_grade(restaurante.id)
+        
+        excecoes = ExcecaoHorario.objects.filter(
+            restaurante=restaurante, data__gte=timezone.now().date()
+        )
+        return Response({
+            'horarios': HorarioFuncionamentoSerializer(restaurante.horarios.all(), many=True).data,
+            'excecoes': ExcecaoHorarioSerializer(excecoes, many=True).data,
+        })
+    
+    @action(detail=True, methods=['post'])
+    def excecoes(self, request, pk=None):
+        """
+        Cadastra uma exceção ao horário semanal (fechamento ou horário especial em uma data).
+        
+        Body: { "data", "fechado" (padrão: true), "abertura", "fechamento", "descricao" }
+        """
+        restaurante = self.get_object()
+        serializer = ExcecaoHorarioSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(restaurante=restaurante)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['delete'], url_path=r'excecoes/(?P<excecao_id>[0-9]+)')
+    def remover_excecao(self, request, pk=None, excecao_id=None):
+        """Remove uma exceção de horário do restaurante"""
+        restaurante = self.get_object()
+        excecao = ExcecaoHorario.objects.filter(id=excecao_id, restaurante=restaurante).first()
+        if excecao is None:
+            return Response(
+                {'error': 'Exceção de horário não encontrada.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        excecao.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
     @action(detail=True, methods=['get'])
     def equipe(self, request, pk=None):
         """Retorna a equipe vinculada ao restaurante"""
@@ -201,10 +320,7 @@ class RestauranteViewSet(viewsets.ModelViewSet):
         
         serializer = AdicionarFuncionarioSerializer(data=request.data)
         if serializer.is_valid():
-            # Gerar senha genérica
-            senha_generica = Usuario.gerar_senha_generica()
-            
-            # Criar usuário funcionário
+            # Criar usuário funcionário (a senha genérica é definida pelo job de email)
             email = serializer.validated_data['email']
             nome = serializer.validated_data['nome']
             
@@ -213,7 +329,7 @@ class RestauranteViewSet(viewsets.ModelViewSet):
                 username=username,
                 email=email,
                 nome=nome,
-                password=senha_generica
+                password=None
             )
             
             # Marcar para trocar senha no primeiro acesso
@@ -231,8 +347,11 @@ class RestauranteViewSet(viewsets.ModelViewSet):
                 papel='funcionario'
             )
             
-            # Enviar senha por email
-            enviar_senha_generica(funcionario, senha_generica, 'Funcionário')
+            # Enviar senha por email (fila de jobs)
+            enfileirar('usuarios.enviar_senha_generica', {
+                'usuario_id': funcionario.id,
+                'tipo_usuario': 'Funcionário',
+            })
             
             return Response({
                 'mensagem': 'Funcionário adicionado com sucesso! Uma senha temporária foi enviada para o email.',
@@ -279,31 +398,71 @@ class RestauranteUsuarioViewSet(viewsets.ModelViewSet):
         """Retorna os restaurantes do usuário autenticado (proprietário, funcionário ou admin)"""
         user = request.user
         
-        # Se for admin_sistema, retorna todos os restaurantes
+        # Admin_sistema vê todos; os demais, os restaurantes que possuem ou em que trabalham
         is_admin_sistema = user.papeis.filter(tipo='admin_sistema').exists()
-        
-        if is_admin_sistema:
-            restaurantes = Restaurante.objects.all()
-        else:
-            # Se for admin_secundario, retorna seu restaurante (é o proprietário)
-            restaurantes_proprietario = Restaurante.objects.filter(proprietario=user)
-            
-            # Se for funcionário, retorna restaurantes via RestauranteUsuario (related_name='usuarios')
-            restaurantes_funcionario = Restaurante.objects.filter(
-                usuarios__usuario=user
-            )
-            
-            # Combina ambas as queries
-            restaurantes = restaurantes_proprietario | restaurantes_funcionario
-        
-        # Remove duplicatas se houver
-        restaurantes = restaurantes.distinct()
+        restaurantes = restaurantes_do_usuario(user, is_admin_sistema)
         
         # Usar RestauranteListSerializer para retornar dados formatados
-        from .serializers import RestauranteListSerializer
-        serializer = RestauranteListSerializer(restaurantes, many=True)
+        serializer = RestauranteListSerializer(
+            restaurantes.select_related('proprietario').prefetch_related('mesas'), many=True
+        )
         
         return Response({
             'results': serializer.data
         }, status=status.HTTP_200_OK)
 
+
+
+def chave_listagem_publica(request):
+    """Chave da listagem pública no cache: parâmetros da query string em ordem"""
+    return sorted((nome, sorted(valores)) for nome, valores in request.GET.lists())
+
+
+def _restaurantes_publicos(request, action, **kwargs):
+    """
+    QuerySet público (requisição anônima) da ação, com os filtros, busca e ordenação
+    do RestauranteViewSet. Montar o QuerySet não consulta o banco.
+    """
+    view = RestauranteViewSet(
+        request=requisicao_drf(request), action=action, format_kwarg=None,
+        args=(), kwargs=kwargs, basename='restaurante', detail=action != 'list',
+    )
+    return view, view.filter_queryset(view.get_queryset())
+
+
+@view_assincrona(RestauranteViewSet.as_view({'get': 'list', 'post': 'create'}, basename='restaurante', detail=False))
+async def listar_restaurantes_assincrona(request):
+    """
+    GET /api/restaurantes/ anônimo com o ORM assíncrono (ASGI), pelo cache da aplicação
+    como a listagem síncrona. Usuários autenticados seguem pela view do DRF (a
+    visibilidade depende do papel).
+    """
+    if tem_credenciais(request):
+        return None
+
+    async def calcular():
+        view, queryset = _restaurantes_publicos(request, 'list')
+        with usando_replica() if replica_configurada() else nullcontext():
+            restaurantes = [restaurante async for restaurante in queryset]
+        return list(RestauranteListSerializer(restaurantes, many=True, context=view.get_serializer_context()).data)
+
+    return resposta_json(await aobter(NAMESPACE_RESTAURANTES_PUBLICOS, chave_listagem_publica(request), calcular))
+
+
+@view_assincrona(RestauranteViewSet.as_view({
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'
+}, basename='restaurante', detail=True))
+async def detalhar_restaurante_assincrona(request, pk):
+    """GET /api/restaurantes/{id}/ anônimo com o ORM assíncrono (ASGI)"""
+    if tem_credenciais(request):
+        return None
+    view, queryset = _restaurantes_publicos(request, 'retrieve', pk=pk)
+    try:
+        with usando_replica() if replica_configurada() else nullcontext():
+            restaurante = await queryset.filter(pk=pk).afirst()
+    except (TypeError, ValueError, ValidationError):
+        restaurante = None
+    if restaurante is None:
+        raise NotFound()
+    serializer = RestauranteSerializer(restaurante, context=view.get_serializer_context())
+    return resposta_json(serializer.data)
@@ -0,0 +1,20 @@
+from utils.jobs import tarefa
+from .models import Usuario
+from .utils import enviar_senha_generica
+
+
+@tarefa('usuarios.enviar_senha_generica')
+def enviar_senha_generica_tarefa(usuario_id, tipo_usuario='usuário'):
+    """
+    Gera a senha temporária do usuário e envia por email.
+    A senha é gerada no próprio job para nunca ficar gravada no payload da fila.
+    """
+    usuario = Usuario.objects.get(id=usuario_id)
+
+    senha_generica = Usuario.gerar_senha_generica()
+    usuario.set_password(senha_generica)
+    usuario.precisa_trocar_senha = True
+    usuario.save(update_fields=['password', 'precisa_trocar_senha'])
+
+    if not enviar_senha_generica(usuario, senha_generica, tipo_usuario):
+        raise RuntimeError(f'Falha ao enviar senha temporária para {usuario.email}')
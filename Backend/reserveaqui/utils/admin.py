@@ -0,0 +1,18 @@
+from django.contrib import admin
+from .models import Job, JobMorto
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tarefa', 'status', 'tentativas', 'max_tentativas', 'executar_em', 'worker')
+    list_filter = ('status', 'tarefa')
+    search_fields = ('tarefa', 'worker')
+    readonly_fields = ('data_criacao', 'data_inicio', 'data_conclusao', 'ultimo_erro')
+
+
+@admin.register(JobMorto)
+class JobMortoAdmin(admin.ModelAdmin):
+    list_display = ('job_id', 'tarefa', 'tentativas', 'data_criacao_job', 'data_falha')
+    list_filter = ('tarefa',)
+    search_fields = ('tarefa',)
+    readonly_fields = ('data_falha',)
@@ -0,0 +1,20 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class UtilsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'utils'
+    verbose_name = 'Utilitários'
+
+    def ready(self):
+        # Registra as tarefas declaradas em <app>/tarefas.py de cada app instalado
+        autodiscover_modules('tarefas')
+
+        # Checks do `manage.py check --deploy` (ex.: fila de jobs sem worker)
+        from . import checks  # noqa: F401
+
+        # Contagem e tempo das consultas SQL das requisições amostradas (utils.instrumentacao)
+        from django.db.backends.signals import connection_created
+        from .instrumentacao import conexao_criada
+        connection_created.connect(conexao_criada, dispatch_uid='utils.instrumentacao')
@@ -0,0 +1,98 @@
+"""
+Views assíncronas (ASGI) para as leituras de maior volume.
+
+O DRF 3.14 não executa views `async def`, então essas rotas são views do Django
+registradas antes do router (reserveaqui/urls.py), com o mesmo caminho da ação
+do DRF. Elas usam o ORM assíncrono e reaproveitam do DRF os serializers, os
+filtros, os parsers e o formato dos erros. Sob um servidor ASGI (uvicorn) uma
+requisição esperando o banco não ocupa um worker inteiro.
+
+`view_assincrona` liga a view assíncrona à view síncrona do DRF: métodos não
+atendidos, ou a view assíncrona devolvendo None (ex.: listagem de restaurantes
+para usuários autenticados, cuja visibilidade depende do papel), seguem pela
+view do DRF, executada em thread com `sync_to_async`.
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+
+def resposta_json(dados, status=200):
+    """Response do DRF já renderizada em JSON (mesmo formato das views síncronas)"""
+    resposta = Response(dados, status=status)
+    resposta.accepted_renderer = JSONRenderer()
+    resposta.accepted_media_type = JSONRenderer.media_type
+    resposta.renderer_context = {}
+    return resposta.render()
+
+
+def resposta_de_erro(exc):
+    """Resposta de uma APIException no formato do exception handler do DRF"""
+    dados = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    resposta = resposta_json(dados, status=exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        resposta['WWW-Authenticate'] = JWTAuthentication().authenticate_header(None)
+    return resposta
+
+
+def requisicao_drf(request):
+    """Request do DRF sem autenticadores (usuário anônimo), para parsers e filtros"""
+    return Request(request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES])
+
+
+def tem_credenciais(request):
+    """Indica se a requisição traz o cabeçalho Authorization (não valida o token)"""
+    return JWTAuthentication().get_header(request) is not None
+
+
+async def autenticar(request):
+    """
+    Usuário do token JWT do cabeçalho Authorization (None sem token).
+    O token é validado sem consultar o banco; só a busca do usuário vai ao banco.
+    Lança as exceções de autenticação do DRF/simplejwt.
+    """
+    autenticacao = JWTAuthentication()
+    cabecalho = autenticacao.get_header(request)
+    if cabecalho is None:
+        return None
+    token_bruto = autenticacao.get_raw_token(cabecalho)
+    if token_bruto is None:
+        return None
+    token = autenticacao.get_validated_token(token_bruto)
+    return await sync_to_async(autenticacao.get_user)(token)
+
+
+async def exigir_usuario(request):
+    usuario = await autenticar(request)
+    if usuario is None:
+        raise exceptions.NotAuthenticated()
+    return usuario
+
+
+def view_assincrona(view_sincrona, metodos=('GET',)):
+    """
+    Decorator: a view assíncrona atende `metodos`; os demais métodos, ou quando ela
+    devolve None, são atendidos por `view_sincrona` (view do DRF).
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method in metodos:
+                try:
+                    resposta = await view(request, *args, **kwargs)
+                except exceptions.APIException as exc:
+                    return resposta_de_erro(exc)
+                if resposta is not None:
+                    return resposta
+            return await sync_to_async(view_sincrona)(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,223 @@
+"""
+Cache da aplicação em dois níveis, com proteção contra estouro (stampede).
+
+- L1: memória local do processo (alias CACHE_L1_ALIAS), com TTL curto
+  (CACHE_L1_TTL_SEGUNDOS). Acertos não saem do processo.
+- L2: cache compartilhado entre os processos/servidores (alias
+  CACHE_COMPARTILHADO_ALIAS): tabela de cache do banco ou Redis (REDIS_URL),
+  memória local apenas com DEBUG e nos testes.
+
+Os valores ficam agrupados em namespaces (ex.: `disponibilidade:12`). Cada
+namespace tem uma geração guardada no L2 que faz parte das chaves; `invalidar`
+troca a geração e todas as chaves antigas deixam de ser lidas (expiram pelo
+TTL). Como a geração também passa pelo L1, outros processos podem ler valores
+antigos por até CACHE_L1_TTL_SEGUNDOS (0 desliga o L1).
+
+Recomputação única (single-flight): na falta de um valor, só quem obtém a trava
+da chave no L2 (`add`) executa o cálculo; os demais aguardam o valor aparecer no
+L2 por até CACHE_ESPERA_SEGUNDOS e, passado esse tempo, calculam sem cache.
+
+Uso:
+
+    dados = obter('restaurantes:publicos', consulta, lambda: calcular(consulta))
+
+    @em_cache(lambda restaurante_id, data: f'disponibilidade:{restaurante_id}')
+    def mesas_do_dia(restaurante_id, data):
+        ...
+
+`em_cache` aceita funções síncronas e `async def` (usa `aobter`).
+"""
+
+import asyncio
+import hashlib
+import inspect
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+
+INTERVALO_ESPERA_SEGUNDOS = 0.05
+
+_AUSENTE = object()
+
+
+def _l1():
+    return caches[settings.CACHE_L1_ALIAS]
+
+
+def _l2():
+    return caches[settings.CACHE_COMPARTILHADO_ALIAS]
+
+
+def _com_l1():
+    return settings.CACHE_L1_TTL_SEGUNDOS > 0
+
+
+def _chave_geracao(namespace):
+    return f'cache_geracao:{namespace}'
+
+
+def _chave(namespace, geracao, chave):
+    resumo = hashlib.md5(repr(chave).encode()).hexdigest()
+    return f'cache:{namespace}:{geracao}:{resumo}'
+
+
+def _chave_trava(chave_completa):
+    return f'{chave_completa}:trava'
+
+
+def _nova_geracao():
+    return uuid.uuid4().hex[:12]
+
+
+def geracao(namespace):
+    """Geração atual do namespace (criada no L2 no primeiro uso)"""
+    chave = _chave_geracao(namespace)
+    valor = _l1().get(chave) if _com_l1() else None
+    if valor is None:
+        valor = _l2().get(chave)
+        if valor is None:
+            _l2().add(chave, _nova_geracao(), timeout=None)
+            valor = _l2().get(chave)
+        if _com_l1():
+            _l1().set(chave, valor, timeout=settings.CACHE_L1_TTL_SEGUNDOS)
+    return valor
+
+
+async def ageracao(namespace):
+    """Versão assíncrona de `geracao`"""
+    chave = _chave_geracao(namespace)
+    valor = await _l1().aget(chave) if _com_l1() else None
+    if valor is None:
+        valor = await _l2().aget(chave)
+        if valor is None:
+            await _l2().aadd(chave, _nova_geracao(), timeout=None)
+            valor = await _l2().aget(chave)
+        if _com_l1():
+            await _l1().aset(chave, valor, timeout=settings.CACHE_L1_TTL_SEGUNDOS)
+    return valor
+
+
+def invalidar(namespace):
+    """Descarta todos os valores do namespace (nova geração no L2)"""
+    chave = _chave_geracao(namespace)
+    _l2().set(chave, _nova_geracao(), timeout=None)
+    if _com_l1():
+        _l1().delete(chave)
+
+
+def _ler(chave_completa):
+    if _com_l1():
+        valor = _l1().get(chave_completa, _AUSENTE)
+        if valor is not _AUSENTE:
+            return valor
+    valor = _l2().get(chave_completa, _AUSENTE)
+    if valor is not _AUSENTE and _com_l1():
+        _l1().set(chave_completa, valor, timeout=settings.CACHE_L1_TTL_SEGUNDOS)
+    return valor
+
+
+async def _aler(chave_completa):
+    if _com_l1():
+        valor = await _l1().aget(chave_completa, _AUSENTE)
+        if valor is not _AUSENTE:
+            return valor
+    valor = await _l2().aget(chave_completa, _AUSENTE)
+    if valor is not _AUSENTE and _com_l1():
+        await _l1().aset(chave_completa, valor, timeout=settings.CACHE_L1_TTL_SEGUNDOS)
+    return valor
+
+
+def _gravar(chave_completa, valor, ttl):
+    _l2().set(chave_completa, valor, timeout=ttl or settings.CACHE_TTL_SEGUNDOS)
+    if _com_l1():
+        _l1().set(chave_completa, valor, timeout=settings.CACHE_L1_TTL_SEGUNDOS)
+
+
+async def _agravar(chave_completa, valor, ttl):
+    await _l2().aset(chave_completa, valor, timeout=ttl or settings.CACHE_TTL_SEGUNDOS)
+    if _com_l1():
+        await _l1().aset(chave_completa, valor, timeout=settings.CACHE_L1_TTL_SEGUNDOS)
+
+
+def obter(namespace, chave, calcular, ttl=None):
+    """
+    Valor da `chave` no namespace; na falta, executa `calcular()` (uma vez entre
+    todos os processos) e guarda o resultado por `ttl` segundos (padrão:
+    CACHE_TTL_SEGUNDOS). A chave pode ser qualquer valor com repr estável.
+    """
+    chave_completa = _chave(namespace, geracao(namespace), chave)
+    valor = _ler(chave_completa)
+    if valor is not _AUSENTE:
+        return valor
+
+    trava = _chave_trava(chave_completa)
+    limite = time.monotonic() + settings.CACHE_ESPERA_SEGUNDOS
+    while True:
+        if _l2().add(trava, 1, timeout=settings.CACHE_TRAVA_SEGUNDOS):
+            try:
+                valor = calcular()
+                _gravar(chave_completa, valor, ttl)
+            finally:
+                _l2().delete(trava)
+            return valor
+        time.sleep(INTERVALO_ESPERA_SEGUNDOS)
+        valor = _l2().get(chave_completa, _AUSENTE)
+        if valor is not _AUSENTE:
+            return valor
+        if time.monotonic() >= limite:
+            # Quem segura a trava está demorando: responde sem esperar o cache
+            return calcular()
+
+
+async def aobter(namespace, chave, calcular, ttl=None):
+    """Versão assíncrona de `obter`; `calcular` é uma função `async def`"""
+    chave_completa = _chave(namespace, await ageracao(namespace), chave)
+    valor = await _aler(chave_completa)
+    if valor is not _AUSENTE:
+        return valor
+
+    trava = _chave_trava(chave_completa)
+    limite = time.monotonic() + settings.CACHE_ESPERA_SEGUNDOS
+    while True:
+        if await _l2().aadd(trava, 1, timeout=settings.CACHE_TRAVA_SEGUNDOS):
+            try:
+                valor = await calcular()
+                await _agravar(chave_completa, valor, ttl)
+            finally:
+                await _l2().adelete(trava)
+            return valor
+        await asyncio.sleep(INTERVALO_ESPERA_SEGUNDOS)
+        valor = await _l2().aget(chave_completa, _AUSENTE)
+        if valor is not _AUSENTE:
+            return valor
+        if time.monotonic() >= limite:
+            return await calcular()
+
+
+def em_cache(namespace, ttl=None):
+    """
+    Decorator: guarda o retorno da função por argumentos. `namespace` é uma
+    string ou uma função dos mesmos argumentos (ex.: um namespace por restaurante,
+    para invalidar só os valores dele).
+    """
+    def decorator(funcao):
+        def argumentos(args, kwargs):
+            nome = namespace(*args, **kwargs) if callable(namespace) else namespace
+            return nome, (funcao.__module__, funcao.__qualname__, args, sorted(kwargs.items()))
+
+        if inspect.iscoroutinefunction(funcao):
+            @wraps(funcao)
+            async def wrapper_assincrono(*args, **kwargs):
+                nome, chave = argumentos(args, kwargs)
+                return await aobter(nome, chave, lambda: funcao(*args, **kwargs), ttl)
+            return wrapper_assincrono
+
+        @wraps(funcao)
+        def wrapper(*args, **kwargs):
+            nome, chave = argumentos(args, kwargs)
+            return obter(nome, chave, lambda: funcao(*args, **kwargs), ttl)
+        return wrapper
+    return decorator
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.compatibility, deploy=True)
+def verificar_worker_de_jobs(app_configs, **kwargs):
+    """
+    Sem JOBS_EXECUTAR_SINCRONO os jobs (e-mails de senha temporária, lista de espera,
+    relatórios) só rodam com um `run_worker`. Em produção a existência do worker
+    precisa ser declarada (JOBS_WORKER_ATIVO) para não enfileirar em uma fila que
+    ninguém consome.
+    """
+    if settings.JOBS_EXECUTAR_SINCRONO or settings.JOBS_WORKER_ATIVO:
+        return []
+    return [
+        Error(
+            'Jobs são enfileirados, mas nenhum worker foi declarado.',
+            hint=(
+                'Suba um serviço com `python manage.py run_worker` e defina JOBS_WORKER_ATIVO=True, '
+                'ou defina JOBS_EXECUTAR_SINCRONO=True para executar os jobs na própria requisição.'
+            ),
+            id='utils.E001',
+        )
+    ]
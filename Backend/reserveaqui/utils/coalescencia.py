@@ -0,0 +1,143 @@
+"""
+Coalescência de requisições idênticas (single-flight em memória do processo).
+
+Requisições simultâneas com a mesma chave compartilham um único cálculo: a
+primeira executa, as demais esperam o resultado dela (threads no WSGI, tarefas
+do event loop no ASGI). O resultado ainda é reaproveitado por um micro-TTL
+(COALESCENCIA_TTL_SEGUNDOS; 0 compartilha apenas os cálculos em andamento).
+
+As chaves são tuplas; `invalidar(*prefixo)` descarta os resultados guardados e
+desliga os cálculos em andamento das chaves com o prefixo, para que requisições
+posteriores a uma escrita recalculem. A invalidação vale para o processo; nos
+demais o resultado antigo dura no máximo o micro-TTL.
+"""
+
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+
+LIMITE_RECENTES = 1000
+
+_AUSENTE = object()
+
+
+class _Chamada:
+    def __init__(self):
+        self.evento = threading.Event()
+        self.valor = None
+        self.erro = None
+
+
+class Coalescedor:
+    """Single-flight por chave com micro-TTL (`ttl` em segundos; padrão COALESCENCIA_TTL_SEGUNDOS)"""
+
+    def __init__(self, ttl=None):
+        self._ttl = ttl
+        self._trava = threading.Lock()
+        self._recentes = {}
+        self._em_andamento = {}
+        self._em_andamento_async = {}
+
+    @property
+    def ttl(self):
+        return settings.COALESCENCIA_TTL_SEGUNDOS if self._ttl is None else self._ttl
+
+    def _recente(self, chave):
+        recente = self._recentes.get(chave)
+        if recente is not None and recente[0] > time.monotonic():
+            return recente[1]
+        return _AUSENTE
+
+    def _concluir(self, pendentes, chave, chamada, valor):
+        """Encerra o cálculo (com a trava) e guarda o valor se a chave não foi invalidada"""
+        if pendentes.get(chave) is not chamada:
+            return
+        del pendentes[chave]
+        if valor is not _AUSENTE and self.ttl > 0:
+            agora = time.monotonic()
+            if len(self._recentes) >= LIMITE_RECENTES:
+                self._recentes = {c: r for c, r in self._recentes.items() if r[0] > agora}
+            self._recentes[chave] = (agora + self.ttl, valor)
+
+    def executar(self, chave, calcular):
+        """Resultado de `calcular()` para a chave, compartilhado entre threads"""
+        with self._trava:
+            valor = self._recente(chave)
+            if valor is not _AUSENTE:
+                return valor
+            chamada = self._em_andamento.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = self._em_andamento[chave] = _Chamada()
+
+        if not lider:
+            chamada.evento.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.valor
+
+        valor = _AUSENTE
+        try:
+            valor = chamada.valor = calcular()
+        except Exception as exc:
+            chamada.erro = exc
+            raise
+        finally:
+            with self._trava:
+                self._concluir(self._em_andamento, chave, chamada, valor)
+            chamada.evento.set()
+        return valor
+
+    async def aexecutar(self, chave, calcular):
+        """Versão assíncrona de `executar`; `calcular` é uma função `async def`"""
+        loop = asyncio.get_running_loop()
+        with self._trava:
+            valor = self._recente(chave)
+            if valor is not _AUSENTE:
+                return valor
+            futuro = self._em_andamento_async.get(chave)
+            lider = futuro is None or futuro.get_loop() is not loop
+            if lider:
+                futuro = self._em_andamento_async[chave] = loop.create_future()
+
+        if not lider:
+            try:
+                # shield: o cancelamento de quem espera não cancela o cálculo compartilhado
+                return await asyncio.shield(futuro)
+            except asyncio.CancelledError:
+                if futuro.cancelled():
+                    return await self.aexecutar(chave, calcular)
+                raise
+
+        valor = _AUSENTE
+        try:
+            valor = await calcular()
+        except asyncio.CancelledError:
+            futuro.cancel()
+            raise
+        except Exception as exc:
+            futuro.set_exception(exc)
+            futuro.exception()  # marca como lida quando ninguém está esperando
+            raise
+        else:
+            futuro.set_result(valor)
+        finally:
+            with self._trava:
+                self._concluir(self._em_andamento_async, chave, futuro, valor)
+        return valor
+
+    def invalidar(self, *prefixo):
+        """Descarta resultados e cálculos em andamento das chaves que começam com `prefixo`"""
+        tamanho = len(prefixo)
+        with self._trava:
+            for dicionario in (self._recentes, self._em_andamento, self._em_andamento_async):
+                for chave in [chave for chave in dicionario if chave[:tamanho] == prefixo]:
+                    del dicionario[chave]
+
+    def limpar(self):
+        with self._trava:
+            self._recentes.clear()
+            self._em_andamento.clear()
+            self._em_andamento_async.clear()
@@ -0,0 +1,180 @@
+"""
+Instrumentação por requisição: consultas SQL, tempo de banco, da view e da
+serialização, enviados no cabeçalho Server-Timing e em uma linha de log
+(logger `reserveaqui.instrumentacao`).
+
+Apenas a fração INSTRUMENTACAO_AMOSTRAGEM das requisições é medida (0 remove o
+middleware da pilha). Nas demais o custo é um sorteio por requisição e, por
+consulta SQL, a leitura de uma ContextVar no execute_wrapper.
+
+Medidas (ms):
+
+- banco: soma do tempo das consultas (todas as conexões), com a quantidade;
+- view: do middleware até a view devolver a resposta (inclui o banco da view);
+- serializacao: renderização da resposta do DRF (JSONRenderer), quando houver;
+- total: tempo da requisição dentro do middleware.
+
+O middleware deve ser o último de MIDDLEWARE: assim ele roda no mesmo modo
+(síncrono ou assíncrono) do handler e o gancho de renderização não troca de thread.
+"""
+
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('reserveaqui.instrumentacao')
+
+_medicao_atual = ContextVar('medicao_atual', default=None)
+
+
+class Medicao:
+    __slots__ = ('inicio', 'fim_view', 'fim_serializacao', 'consultas', 'banco')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fim_view = None
+        self.fim_serializacao = None
+        self.consultas = 0
+        self.banco = 0.0
+
+    def marcar_serializacao(self, response):
+        # Callback pós-renderização: retornar None mantém a resposta
+        self.fim_serializacao = time.perf_counter()
+
+    def tempos(self):
+        """Tempos em milissegundos"""
+        fim = time.perf_counter()
+        fim_view = self.fim_view or fim
+        tempos = {
+            'banco': self.banco * 1000,
+            'view': (fim_view - self.inicio) * 1000,
+            'total': (fim - self.inicio) * 1000,
+        }
+        if self.fim_serializacao is not None:
+            tempos['serializacao'] = (self.fim_serializacao - fim_view) * 1000
+        return tempos
+
+
+def medir_consulta(execute, sql, params, many, context):
+    """execute_wrapper: soma as consultas na medição da requisição atual (se amostrada)"""
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicao.consultas += 1
+        medicao.banco += time.perf_counter() - inicio
+
+
+def instalar_medidor(conexao):
+    if medir_consulta not in conexao.execute_wrappers:
+        conexao.execute_wrappers.append(medir_consulta)
+
+
+def conexao_criada(sender, connection, **kwargs):
+    """Receiver de connection_created (registrado em UtilsConfig.ready)"""
+    instalar_medidor(connection)
+
+
+def server_timing(medicao, tempos):
+    """Valor do cabeçalho Server-Timing"""
+    partes = [f'banco;dur={tempos["banco"]:.2f};desc="{medicao.consultas} consultas"']
+    partes.extend(
+        f'{nome};dur={tempos[nome]:.2f}'
+        for nome in ('view', 'serializacao', 'total') if nome in tempos
+    )
+    return ', '.join(partes)
+
+
+class InstrumentacaoMiddleware:
+    """
+    Mede uma amostra das requisições (INSTRUMENTACAO_AMOSTRAGEM).
+    Funciona nas pilhas síncrona (WSGI) e assíncrona (ASGI).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.INSTRUMENTACAO_AMOSTRAGEM <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # No handler assíncrono um gancho síncrono seria executado em outra thread
+            self.process_template_response = self._aprocess_template_response
+
+    @staticmethod
+    def _amostrada():
+        return random.random() < settings.INSTRUMENTACAO_AMOSTRAGEM
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._amostrada():
+            return self.get_response(request)
+
+        # Conexões abertas antes do carregamento do middleware (connection_created já passou)
+        for conexao in connections.all(initialized_only=True):
+            instalar_medidor(conexao)
+        medicao = request._instrumentacao = Medicao()
+        token = _medicao_atual.set(medicao)
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicao_atual.reset(token)
+        return self._registrar(request, response, medicao)
+
+    async def __acall__(self, request):
+        if not self._amostrada():
+            return await self.get_response(request)
+
+        medicao = request._instrumentacao = Medicao()
+        token = _medicao_atual.set(medicao)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicao_atual.reset(token)
+        return self._registrar(request, response, medicao)
+
+    @staticmethod
+    def _marcar_renderizacao(request, response):
+        """Fim da view; a serialização termina no callback pós-renderização"""
+        medicao = getattr(request, '_instrumentacao', None)
+        if medicao is not None:
+            medicao.fim_view = time.perf_counter()
+            response.add_post_render_callback(medicao.marcar_serializacao)
+        return response
+
+    def process_template_response(self, request, response):
+        return self._marcar_renderizacao(request, response)
+
+    async def _aprocess_template_response(self, request, response):
+        return self._marcar_renderizacao(request, response)
+
+    def _registrar(self, request, response, medicao):
+        tempos = medicao.tempos()
+        response['Server-Timing'] = server_timing(medicao, tempos)
+
+        correspondencia = getattr(request, 'resolver_match', None)
+        dados = {
+            'metodo': request.method,
+            'rota': correspondencia.route if correspondencia else request.path,
+            'status': response.status_code,
+            'consultas': medicao.consultas,
+            **{f'{nome}_ms': round(valor, 2) for nome, valor in tempos.items()},
+        }
+        logger.info(
+            ' '.join(f'{chave}={valor}' for chave, valor in dados.items()),
+            extra={'instrumentacao': dados},
+        )
+        return response
@@ -0,0 +1,177 @@
+"""
+Fila de jobs persistida no banco de dados.
+
+Tarefas são registradas com o decorator `tarefa` em módulos `<app>/tarefas.py`
+(carregados automaticamente pelo app utils) e enfileiradas com `enfileirar`.
+O comando `run_worker` reivindica os jobs com `SELECT ... FOR UPDATE SKIP LOCKED`
+(no SQLite, que não tem lock de linha, a reivindicação é garantida pelo UPDATE
+condicional) e os executa em um pool de threads.
+"""
+
+import logging
+import random
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job, JobMorto
+
+logger = logging.getLogger('reserveaqui.jobs')
+
+_REGISTRO = {}
+_AO_ESGOTAR = {}
+
+
+def tarefa(nome, ao_esgotar=None):
+    """
+    Registra a função decorada como tarefa executável pela fila.
+    `ao_esgotar` é chamado com o mesmo payload quando o job vai para a fila de jobs mortos.
+    """
+    def decorator(funcao):
+        _REGISTRO[nome] = funcao
+        if ao_esgotar:
+            _AO_ESGOTAR[nome] = ao_esgotar
+        return funcao
+    return decorator
+
+
+def obter_tarefa(nome):
+    """Retorna a função registrada para a tarefa (ou None)"""
+    return _REGISTRO.get(nome)
+
+
+def enfileirar(nome, payload=None, atraso_segundos=0, max_tentativas=None):
+    """
+    Cria um job para a tarefa informada.
+    O payload deve ser serializável em JSON e é repassado como kwargs à tarefa.
+
+    Com JOBS_EXECUTAR_SINCRONO=True o job é executado imediatamente no próprio
+    processo (útil para desenvolvimento sem worker e para testes).
+    """
+    if nome not in _REGISTRO:
+        raise LookupError(f'Tarefa "{nome}" não registrada.')
+
+    job = Job.objects.create(
+        tarefa=nome,
+        payload=payload or {},
+        max_tentativas=max_tentativas or settings.JOBS_MAX_TENTATIVAS,
+        executar_em=timezone.now() + timedelta(seconds=atraso_segundos),
+    )
+
+    if settings.JOBS_EXECUTAR_SINCRONO:
+        job.status = 'executando'
+        job.tentativas = 1
+        job.worker = 'sincrono'
+        job.save(update_fields=['status', 'tentativas', 'worker'])
+        executar(job)
+        job.refresh_from_db()
+
+    return job
+
+
+def reivindicar(worker, limite=1):
+    """
+    Reivindica até `limite` jobs prontos para execução.
+
+    Considera pendentes cujo horário chegou e jobs em execução cujo prazo expirou
+    (worker que morreu no meio da execução).
+    """
+    agora = timezone.now()
+    prontos = Q(status='pendente', executar_em__lte=agora) | Q(
+        status='executando', bloqueado_ate__lt=agora
+    )
+
+    # Sem SKIP LOCKED (SQLite) a transação só causaria conflito de lock entre
+    # threads; o UPDATE condicional abaixo já garante a exclusividade.
+    usa_skip_locked = connection.features.has_select_for_update_skip_locked
+
+    with transaction.atomic() if usa_skip_locked else nullcontext():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(prontos)
+            .order_by('executar_em', 'id')
+            .values_list('id', flat=True)[:limite]
+        )
+        if not ids:
+            return []
+
+        # O filtro repetido torna o UPDATE condicional: se outro worker já
+        # reivindicou o job, nenhuma linha é alterada.
+        Job.objects.filter(prontos, id__in=ids).update(
+            status='executando',
+            worker=worker,
+            tentativas=F('tentativas') + 1,
+            data_inicio=agora,
+            bloqueado_ate=agora + timedelta(seconds=settings.JOBS_TIMEOUT_SEGUNDOS),
+        )
+
+    return list(Job.objects.filter(id__in=ids, worker=worker, status='executando'))
+
+
+def calcular_backoff(tentativas):
+    """Atraso exponencial com jitter para a próxima tentativa, em segundos"""
+    base = settings.JOBS_BACKOFF_BASE_SEGUNDOS * (2 ** max(tentativas - 1, 0))
+    atraso = min(base, settings.JOBS_BACKOFF_MAX_SEGUNDOS)
+    return atraso * random.uniform(0.8, 1.2)
+
+
+def executar(job):
+    """
+    Executa um job já reivindicado e registra o resultado.
+    Falhas reagendam o job com backoff; ao esgotar as tentativas ele vai para JobMorto.
+    """
+    funcao = obter_tarefa(job.tarefa)
+
+    try:
+        if funcao is None:
+            raise LookupError(f'Tarefa "{job.tarefa}" não registrada.')
+        funcao(**job.payload)
+    except Exception:
+        erro = traceback.format_exc()
+        logger.warning('Job %s (%s) falhou na tentativa %s', job.id, job.tarefa, job.tentativas)
+        _registrar_falha(job, erro)
+        return False
+
+    Job.objects.filter(id=job.id, worker=job.worker).update(
+        status='concluido',
+        data_conclusao=timezone.now(),
+        bloqueado_ate=None,
+        ultimo_erro='',
+    )
+    return True
+
+
+def _registrar_falha(job, erro):
+    if job.tentativas < job.max_tentativas:
+        Job.objects.filter(id=job.id, worker=job.worker).update(
+            status='pendente',
+            executar_em=timezone.now() + timedelta(seconds=calcular_backoff(job.tentativas)),
+            bloqueado_ate=None,
+            ultimo_erro=erro,
+        )
+        return
+
+    with transaction.atomic():
+        removidos, _ = Job.objects.filter(id=job.id, worker=job.worker).delete()
+        if removidos:
+            JobMorto.objects.create(
+                job_id=job.id,
+                tarefa=job.tarefa,
+                payload=job.payload,
+                tentativas=job.tentativas,
+                ultimo_erro=erro,
+                data_criacao_job=job.data_criacao,
+            )
+    logger.error('Job %s (%s) movido para a fila de jobs mortos', job.id, job.tarefa)
+
+    callback = _AO_ESGOTAR.get(job.tarefa)
+    if callback:
+        try:
+            callback(**job.payload)
+        except Exception:
+            logger.exception('Erro no callback ao_esgotar do job %s (%s)', job.id, job.tarefa)
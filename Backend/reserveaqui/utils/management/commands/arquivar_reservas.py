@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from reservas.arquivo import arquivar_dias, data_de_corte, dias_arquivaveis
+
+
+class Command(BaseCommand):
+    help = (
+        'Arquiva os dias de restaurante anteriores ao corte cujas reservas estão todas '
+        'concluídas ou canceladas: os totais vão para os resumos do arquivo (lidos pelos '
+        'relatórios) e as reservas, mesas vinculadas, notificações e mapas de ocupação são removidos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses',
+            type=int,
+            default=settings.ARQUIVO_RESERVAS_MESES,
+            help='Arquiva os dias anteriores ao início do mês de N meses atrás (padrão: ARQUIVO_RESERVAS_MESES)',
+        )
+        parser.add_argument(
+            '--tamanho-lote',
+            type=int,
+            default=200,
+            help='Quantidade de dias (restaurante/data) arquivados por transação (padrão: 200)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas conta os dias que seriam arquivados, sem gravar nada',
+        )
+
+    def handle(self, *args, **options):
+        tamanho_lote = max(options['tamanho_lote'], 1)
+        corte = data_de_corte(options['meses'], timezone.now().date())
+
+        if options['dry_run']:
+            self.stdout.write(
+                f'🔎 Dias que seriam arquivados (antes de {corte:%d/%m/%Y}): {len(dias_arquivaveis(corte))}'
+            )
+            return
+
+        dias_total = reservas_total = 0
+        while True:
+            dias = dias_arquivaveis(corte, limite=tamanho_lote)
+            if not dias:
+                break
+            reservas_total += arquivar_dias(dias)
+            dias_total += len(dias)
+            self.stdout.write(f'🗄️  Lote arquivado: {len(dias)} dia(s) até {dias[-1][1]:%d/%m/%Y}')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Arquivamento concluído (antes de {corte:%d/%m/%Y}): '
+                f'{dias_total} dia(s), {reservas_total} reserva(s).'
+            )
+        )
@@ -0,0 +1,124 @@
+import copy
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.utils import load_backend
+
+MODOS = ('persistente', 'sem_persistencia', 'pool')
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara o custo de obter conexões com o PostgreSQL em rajadas de requisições: '
+        'conexões persistentes por processo (CONN_MAX_AGE, comportamento sem pool), '
+        'uma conexão por requisição (CONN_MAX_AGE=0) e o pool do psycopg 3.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rajadas',
+            type=int,
+            default=5,
+            help='Quantidade de rajadas; cada rajada usa threads novas, como workers reciclados (padrão: 5)',
+        )
+        parser.add_argument(
+            '--concorrencia',
+            type=int,
+            default=20,
+            help='Requisições simultâneas (threads) por rajada (padrão: 20)',
+        )
+        parser.add_argument(
+            '--requisicoes',
+            type=int,
+            default=10,
+            help='Requisições feitas por cada thread (padrão: 10)',
+        )
+        parser.add_argument(
+            '--modos',
+            nargs='+',
+            choices=MODOS,
+            default=list(MODOS),
+            help='Modos comparados (padrão: todos)',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING('⚠️  O benchmark de conexões exige PostgreSQL.'))
+            return
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+        for modo in options['modos']:
+            if modo == 'pool' and not is_psycopg3:
+                self.stdout.write(self.style.WARNING('⚠️  O modo pool exige psycopg 3 (psycopg[pool]); ignorado.'))
+                continue
+            resultado = self._medir(modo, options['rajadas'], options['concorrencia'], options['requisicoes'])
+            tempos = sorted(resultado['tempos'])
+            self.stdout.write(f'\n📊 {modo}')
+            self.stdout.write(f'   Requisições: {len(tempos)} em {resultado["duracao"]:.2f}s')
+            self.stdout.write(f'   Conexões abertas no banco: {resultado["conexoes"]}')
+            self.stdout.write(
+                f'   Conexão + SELECT 1 (ms): média {statistics.mean(tempos):.2f}, '
+                f'p50 {tempos[len(tempos) // 2]:.2f}, p95 {tempos[int(len(tempos) * 0.95) - 1]:.2f}, '
+                f'máx {tempos[-1]:.2f}'
+            )
+
+    def _configuracao(self, modo):
+        configuracao = copy.deepcopy(connection.settings_dict)
+        configuracao['OPTIONS'].pop('pool', None)
+        if modo == 'persistente':
+            configuracao['CONN_MAX_AGE'] = 60
+        else:
+            configuracao['CONN_MAX_AGE'] = 0
+        if modo == 'pool':
+            configuracao['OPTIONS']['pool'] = dict(
+                settings.DATABASES['default'].get('OPTIONS', {}).get('pool') or {}
+            ) or {'min_size': 1, 'max_size': 4, 'timeout': 10}
+        return configuracao
+
+    def _medir(self, modo, rajadas, concorrencia, requisicoes):
+        configuracao = self._configuracao(modo)
+        backend = load_backend(configuracao['ENGINE'])
+        alias = f'benchmark_{modo}'
+        tempos = []
+        conexoes = [0]
+        trava = threading.Lock()
+
+        def worker():
+            banco = backend.DatabaseWrapper(configuracao, alias)
+            locais = []
+            abertas = 0
+            for _ in range(requisicoes):
+                inicio = time.perf_counter()
+                if banco.connection is None:
+                    abertas += 1
+                with banco.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                locais.append((time.perf_counter() - inicio) * 1000)
+                # Fim da requisição: o Django fecha (ou devolve ao pool) conforme o CONN_MAX_AGE
+                banco.close_if_unusable_or_obsolete()
+            # Fim da thread, como um worker reciclado
+            banco.close()
+            with trava:
+                tempos.extend(locais)
+                conexoes[0] += abertas
+
+        inicio = time.perf_counter()
+        for _ in range(rajadas):
+            threads = [threading.Thread(target=worker) for _ in range(concorrencia)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        duracao = time.perf_counter() - inicio
+
+        if modo == 'pool':
+            banco = backend.DatabaseWrapper(configuracao, alias)
+            # Com pool, as conexões físicas são as abertas pelo pool, não os empréstimos
+            conexoes[0] = banco.pool.get_stats().get('connections_num', 0)
+            banco.close_pool()
+
+        return {'tempos': tempos, 'conexoes': conexoes[0], 'duracao': duracao}
@@ -0,0 +1,111 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from usuarios.models import Usuario
+from restaurantes.models import Restaurante
+from reservas.views import ReservaViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede consultas SQL e latência do POST /api/reservas/ (criação com alocação de mesas). '
+        'Os dados são criados dentro de uma transação desfeita ao final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iteracoes',
+            type=int,
+            default=200,
+            help='Quantidade de reservas criadas (padrão: 200)',
+        )
+        parser.add_argument(
+            '--pessoas',
+            type=int,
+            default=6,
+            help='Quantidade de pessoas por reserva (padrão: 6, ou seja, 2 mesas)',
+        )
+
+    def handle(self, *args, **options):
+        iteracoes = max(options['iteracoes'], 1)
+        pessoas = options['pessoas']
+
+        with transaction.atomic():
+            tempos, consultas = self._executar(iteracoes, pessoas)
+            transaction.set_rollback(True)
+
+        tempos.sort()
+        self.stdout.write(f'Reservas criadas: {iteracoes} ({pessoas} pessoas cada)')
+        self.stdout.write(f'Consultas por criação: média {statistics.mean(consultas):.1f}, máx {max(consultas)}')
+        self.stdout.write(
+            f'Latência (ms): média {statistics.mean(tempos):.2f}, '
+            f'p50 {tempos[len(tempos) // 2]:.2f}, p95 {tempos[int(len(tempos) * 0.95) - 1]:.2f}'
+        )
+
+    def _executar(self, iteracoes, pessoas):
+        proprietario = Usuario.objects.create_user(
+            email='benchmark-prop@reserveaqui.local',
+            nome='Benchmark Proprietário',
+            username='benchmark_prop',
+            password=None,
+        )
+        cliente = Usuario.objects.create_user(
+            email='benchmark-cliente@reserveaqui.local',
+            nome='Benchmark Cliente',
+            username='benchmark_cliente',
+            password=None,
+        )
+        restaurante = Restaurante.objects.create(
+            nome='Restaurante Benchmark',
+            endereco='Rua Benchmark, 1',
+            cidade='Benchmark',
+            estado='BM',
+            cep='00000-000',
+            email='benchmark@reserveaqui.local',
+            proprietario=proprietario,
+            quantidade_mesas=40,
+        )
+
+        factory = APIRequestFactory()
+        view = ReservaViewSet.as_view({'post': 'create'})
+        data_base = timezone.now().date() + timedelta(days=2)
+
+        # Horários espaçados em 3h não conflitam entre si (janela de ±1h)
+        horarios = ['10:00', '13:00', '16:00', '19:00', '22:00']
+        reservas_por_horario = 40 // max((pessoas + 3) // 4, 1)
+
+        tempos = []
+        consultas = []
+        for indice in range(iteracoes):
+            slot = indice // reservas_por_horario
+            data_reserva = data_base + timedelta(days=slot // len(horarios))
+            horario = horarios[slot % len(horarios)]
+
+            request = factory.post('/api/reservas/', {
+                'restaurante': restaurante.id,
+                'data_reserva': data_reserva.isoformat(),
+                'horario': horario,
+                'quantidade_pessoas': pessoas,
+                'nome_cliente': 'Cliente Benchmark',
+                'telefone_cliente': '999999999',
+            }, format='json')
+            force_authenticate(request, user=cliente)
+
+            with CaptureQueriesContext(connection) as contexto:
+                inicio = time.perf_counter()
+                response = view(request)
+                response.render()
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            consultas.append(len(contexto.captured_queries))
+
+            if response.status_code != 201:
+                raise RuntimeError(f'Falha ao criar reserva: {response.status_code} {response.data}')
+
+        return tempos, consultas
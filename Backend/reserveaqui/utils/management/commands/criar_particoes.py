@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from reservas import particionamento
+
+
+class Command(BaseCommand):
+    help = (
+        'Cria as partições mensais da tabela de reservas (PostgreSQL): as do histórico '
+        'que ainda estão na partição padrão e as dos próximos meses.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses',
+            type=int,
+            default=settings.PARTICOES_MESES_A_FRENTE,
+            help='Quantos meses à frente do atual devem ter partição (padrão: PARTICOES_MESES_A_FRENTE)',
+        )
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Conta vínculos (ReservaMesa, Notificacao, ListaEspera) que apontam para reservas inexistentes',
+        )
+
+    def handle(self, *args, **options):
+        if particionamento.particionada():
+            self._criar_particoes(options['meses'])
+        else:
+            self.stdout.write(self.style.WARNING(
+                '⚠️  A tabela de reservas não está particionada (apenas PostgreSQL). Nenhuma partição criada.'
+            ))
+
+        if options['verificar']:
+            for modelo, quantidade in particionamento.vinculos_orfaos().items():
+                estilo = self.style.WARNING if quantidade else self.style.SUCCESS
+                self.stdout.write(estilo(f'   {modelo}: {quantidade} vínculo(s) órfão(s)'))
+
+    def _criar_particoes(self, meses_a_frente):
+        hoje = timezone.now().date()
+        ultimo = particionamento.inicio_do_mes(hoje)
+        for _ in range(meses_a_frente):
+            ultimo = particionamento.mes_seguinte(ultimo)
+        # Linhas antigas na partição padrão (por exemplo, logo após a migração) ganham partição própria
+        primeira = particionamento.primeira_data_na_padrao()
+        inicio = min(hoje, primeira) if primeira else hoje
+
+        criadas = 0
+        for mes in particionamento.meses(inicio, ultimo):
+            movidas = particionamento.criar_particao(mes)
+            if movidas is not None:
+                criadas += 1
+                self.stdout.write(
+                    f'📦 {particionamento.nome_particao(mes)} criada ({movidas} reserva(s) movida(s))'
+                )
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {criadas} partição(ões) criada(s).'))
+        for nome, limites in particionamento.particoes():
+            self.stdout.write(f'   {nome}: {limites}')
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from reservas.alocacao import STATUS_ATIVOS, liberar_ocupacao
+from reservas.models import OcupacaoMesaDia, Reserva
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstrói o mapa de ocupação das mesas (OcupacaoMesaDia) a partir das '
+        'reservas ativas. Use após cargas de dados feitas fora da API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--restaurante',
+            type=int,
+            help='Reconstrói apenas o restaurante informado',
+        )
+        parser.add_argument(
+            '--desde',
+            help='Data inicial (YYYY-MM-DD). Padrão: hoje',
+        )
+
+    def handle(self, *args, **options):
+        desde = options['desde'] or timezone.now().date().isoformat()
+
+        reservas = Reserva.objects.filter(data_reserva__gte=desde, status__in=STATUS_ATIVOS)
+        mapas = OcupacaoMesaDia.objects.filter(data__gte=desde)
+        if options['restaurante']:
+            reservas = reservas.filter(restaurante_id=options['restaurante'])
+            mapas = mapas.filter(restaurante_id=options['restaurante'])
+
+        # Dias com reservas ativas e dias com mapas gravados (que podem ter ficado vazios)
+        dias = set(reservas.values_list('restaurante_id', 'data_reserva').distinct())
+        dias |= set(mapas.values_list('restaurante_id', 'data').distinct())
+
+        for dia in sorted(dias):
+            liberar_ocupacao([dia])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Mapa de ocupação reconstruído para {len(dias)} restaurante(s)/dia(s).')
+        )
@@ -0,0 +1,92 @@
+import logging
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connections
+
+from utils.jobs import executar, reivindicar
+
+logger = logging.getLogger('reserveaqui.jobs')
+
+
+class Command(BaseCommand):
+    help = 'Executa os jobs da fila do banco de dados usando um pool de threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=2,
+            help='Quantidade de threads executando jobs em paralelo (padrão: 2)',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=1.0,
+            help='Segundos de espera quando a fila está vazia (padrão: 1.0)',
+        )
+        parser.add_argument(
+            '--uma-vez',
+            action='store_true',
+            help='Processa os jobs disponíveis e encerra quando a fila esvaziar',
+        )
+
+    def handle(self, *args, **options):
+        concorrencia = max(options['concurrency'], 1)
+        self.intervalo = options['intervalo']
+        self.uma_vez = options['uma_vez']
+        self.parar = threading.Event()
+        self.prefixo = f'{socket.gethostname()}:{os.getpid()}'
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self._sinal_parada)
+            signal.signal(signal.SIGINT, self._sinal_parada)
+
+        self.stdout.write(f'🚀 Worker iniciado com {concorrencia} thread(s)')
+
+        with ThreadPoolExecutor(max_workers=concorrencia) as pool:
+            futuros = [pool.submit(self._loop, indice) for indice in range(concorrencia)]
+            totais = [futuro.result() for futuro in futuros]
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Worker encerrado. Jobs processados: {sum(totais)}')
+        )
+
+    def _sinal_parada(self, signum, frame):
+        self.stdout.write('⏹️  Sinal recebido, finalizando após os jobs em andamento...')
+        self.parar.set()
+
+    def _loop(self, indice):
+        """Laço de uma thread: reivindica e executa um job por vez"""
+        worker = f'{self.prefixo}:{indice}'
+        processados = 0
+
+        try:
+            while not self.parar.is_set():
+                close_old_connections()
+                try:
+                    jobs = reivindicar(worker)
+                except OperationalError:
+                    # Falha transitória do banco (ex.: lock no SQLite); tenta de novo
+                    logger.warning('Worker %s não conseguiu reivindicar jobs', worker, exc_info=True)
+                    self.parar.wait(self.intervalo)
+                    continue
+
+                if not jobs:
+                    if self.uma_vez:
+                        break
+                    self.parar.wait(self.intervalo)
+                    continue
+
+                for job in jobs:
+                    executar(job)
+                    processados += 1
+        finally:
+            # Conexões são por thread; fecha a desta thread ao sair
+            connections.close_all()
+
+        return processados
@@ -1,3 +1,4 @@
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta, date, time
@@ -56,6 +57,9 @@ class Command(BaseCommand):
             self.stdout.write('📅 Criando reservas...')
             self._criar_reservas(restaurantes, clientes)
 
+            self.stdout.write('🗺️  Reconstruindo mapa de ocupação das mesas...')
+            call_command('reconstruir_ocupacao', desde=date.min.isoformat(), stdout=self.stdout)
+
             self.stdout.write(self.style.SUCCESS('✅ População concluída com sucesso!'))
             self._mostrar_resumo(admin, proprietarios, funcionarios, clientes, restaurantes)
 
@@ -0,0 +1,182 @@
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+MODOS = ('sync', 'gthread', 'uvicorn')
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga dos modos de worker do gunicorn (gunicorn.conf.py): sobe o gunicorn '
+        'em cada modo, dispara requisições simultâneas e compara vazão e latência.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modos',
+            nargs='+',
+            choices=MODOS,
+            default=list(MODOS),
+            help='Modos comparados (padrão: todos)',
+        )
+        parser.add_argument(
+            '--caminhos',
+            nargs='+',
+            default=['/api/restaurantes/'],
+            help='Caminhos requisitados em rodízio (padrão: /api/restaurantes/)',
+        )
+        parser.add_argument(
+            '--concorrencia',
+            type=int,
+            default=50,
+            help='Clientes simultâneos (padrão: 50)',
+        )
+        parser.add_argument(
+            '--duracao',
+            type=float,
+            default=15,
+            help='Segundos de carga por modo (padrão: 15)',
+        )
+        parser.add_argument(
+            '--porta',
+            type=int,
+            default=8765,
+            help='Porta local usada pelo gunicorn durante o teste (padrão: 8765)',
+        )
+        parser.add_argument(
+            '--cabecalho',
+            action='append',
+            default=[],
+            help='Cabeçalho enviado em todas as requisições, ex.: "Authorization: Bearer <token>"',
+        )
+
+    def handle(self, *args, **options):
+        cabecalhos = {}
+        for cabecalho in options['cabecalho']:
+            nome, _, valor = cabecalho.partition(':')
+            if not valor:
+                raise CommandError(f'Cabeçalho inválido: {cabecalho}')
+            cabecalhos[nome.strip()] = valor.strip()
+
+        base = f'http://127.0.0.1:{options["porta"]}'
+        resultados = {}
+        for modo in options['modos']:
+            self.stdout.write(f'\n🚀 {modo}: subindo o gunicorn...')
+            processo = self._subir_gunicorn(modo, options['porta'])
+            try:
+                if not self._aguardar(processo, base + options['caminhos'][0], cabecalhos):
+                    self.stdout.write(self.style.WARNING(
+                        f'⚠️  O gunicorn não subiu no modo {modo} (dependência ausente?); ignorado.'
+                    ))
+                    continue
+                resultados[modo] = self._carga(
+                    base, options['caminhos'], cabecalhos, options['concorrencia'], options['duracao']
+                )
+                self._imprimir(modo, resultados[modo])
+            finally:
+                self._derrubar(processo)
+
+        if resultados:
+            melhor = max(resultados, key=lambda modo: resultados[modo]['vazao'])
+            self.stdout.write(self.style.SUCCESS(
+                f'\n✅ Maior vazão: {melhor} ({resultados[melhor]["vazao"]:.1f} req/s). '
+                f'Use GUNICORN_WORKER_CLASS={melhor}.'
+            ))
+
+    def _subir_gunicorn(self, modo, porta):
+        ambiente = {
+            **os.environ,
+            'GUNICORN_WORKER_CLASS': modo,
+            'GUNICORN_BIND': f'127.0.0.1:{porta}',
+        }
+        return subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+            cwd=settings.BASE_DIR,
+            env=ambiente,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def _aguardar(self, processo, url, cabecalhos, limite=30):
+        fim = time.monotonic() + limite
+        while time.monotonic() < fim:
+            if processo.poll() is not None:
+                return False
+            try:
+                urllib.request.urlopen(urllib.request.Request(url, headers=cabecalhos), timeout=2).read()
+                return True
+            except urllib.error.HTTPError:
+                return True
+            except OSError:
+                time.sleep(0.3)
+        return False
+
+    def _derrubar(self, processo):
+        if processo.poll() is None:
+            processo.send_signal(signal.SIGTERM)
+            try:
+                processo.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                processo.kill()
+
+    def _carga(self, base, caminhos, cabecalhos, concorrencia, duracao):
+        tempos = []
+        erros = [0]
+        trava = threading.Lock()
+        fim = time.monotonic() + duracao
+
+        def cliente(indice):
+            locais = []
+            falhas = 0
+            contador = indice
+            while time.monotonic() < fim:
+                url = base + caminhos[contador % len(caminhos)]
+                contador += 1
+                inicio = time.perf_counter()
+                try:
+                    urllib.request.urlopen(urllib.request.Request(url, headers=cabecalhos), timeout=30).read()
+                    locais.append((time.perf_counter() - inicio) * 1000)
+                except (urllib.error.HTTPError, OSError):
+                    falhas += 1
+            with trava:
+                tempos.extend(locais)
+                erros[0] += falhas
+
+        inicio = time.perf_counter()
+        threads = [threading.Thread(target=cliente, args=(indice,)) for indice in range(concorrencia)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        decorrido = time.perf_counter() - inicio
+
+        tempos.sort()
+        return {
+            'requisicoes': len(tempos),
+            'erros': erros[0],
+            'vazao': len(tempos) / decorrido,
+            'tempos': tempos,
+        }
+
+    def _imprimir(self, modo, resultado):
+        tempos = resultado['tempos']
+        self.stdout.write(f'📊 {modo}')
+        self.stdout.write(
+            f'   Requisições: {resultado["requisicoes"]} ({resultado["vazao"]:.1f} req/s), '
+            f'erros: {resultado["erros"]}'
+        )
+        if tempos:
+            self.stdout.write(
+                f'   Latência (ms): média {statistics.mean(tempos):.1f}, '
+                f'p50 {tempos[len(tempos) // 2]:.1f}, p95 {tempos[int(len(tempos) * 0.95) - 1]:.1f}, '
+                f'p99 {tempos[int(len(tempos) * 0.99) - 1]:.1f}'
+            )
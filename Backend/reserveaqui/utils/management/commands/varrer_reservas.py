@@ -0,0 +1,173 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from restaurantes.models import Restaurante
+from reservas.alocacao import liberar_ocupacao
+from reservas.models import Reserva, ReservaMesa, Notificacao, ChaveIdempotencia, ListaEspera, Remocao
+
+
+class Command(BaseCommand):
+    help = (
+        'Conclui reservas confirmadas que já passaram e expira reservas pendentes '
+        'vencidas, em lotes, liberando as mesas ocupadas. Também remove as chaves '
+        'de idempotência expiradas, descarta os registros de remoção antigos e expira '
+        'entradas vencidas da lista de espera.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanho-lote',
+            type=int,
+            default=500,
+            help='Quantidade de reservas processadas por transação (padrão: 500)',
+        )
+        parser.add_argument(
+            '--minutos-conclusao',
+            type=int,
+            default=60,
+            help='Minutos após o horário para considerar uma reserva confirmada concluída (padrão: 60)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas conta as reservas que seriam alteradas, sem gravar nada',
+        )
+
+    def handle(self, *args, **options):
+        tamanho_lote = max(options['tamanho_lote'], 1)
+        agora = timezone.now()
+        limite_conclusao = agora - timedelta(minutes=options['minutos_conclusao'])
+
+        vencidas_conclusao = Reserva.objects.filter(
+            self._antes_de(limite_conclusao), status='confirmada'
+        )
+        vencidas_pendentes = Reserva.objects.filter(
+            self._antes_de(agora), status='pendente'
+        )
+        espera_vencida = ListaEspera.objects.filter(
+            Q(data_reserva__lt=agora.date()) | Q(data_reserva=agora.date(), horario_fim__lt=agora.time()),
+            status='aguardando',
+        )
+
+        if options['dry_run']:
+            self.stdout.write(
+                f'🔎 Seriam concluídas: {vencidas_conclusao.count()} | '
+                f'Seriam expiradas: {vencidas_pendentes.count()} | '
+                f'Chaves de idempotência expiradas: {ChaveIdempotencia.objects.filter(expira_em__lte=agora).count()} | '
+                f'Entradas da lista de espera vencidas: {espera_vencida.count()}'
+            )
+            return
+
+        concluidas = self._processar_em_lotes(
+            vencidas_conclusao,
+            status_destino='concluida',
+            tamanho_lote=tamanho_lote,
+            agora=agora,
+        )
+        expiradas = self._processar_em_lotes(
+            vencidas_pendentes,
+            status_destino='cancelada',
+            tamanho_lote=tamanho_lote,
+            agora=agora,
+        )
+        chaves_removidas, _ = ChaveIdempotencia.objects.filter(expira_em__lte=agora).delete()
+        remocoes_descartadas, _ = Remocao.objects.filter(
+            data_remocao__lt=agora - timedelta(days=settings.MUDANCAS_RETENCAO_DIAS)
+        ).delete()
+        espera_expirada = espera_vencida.update(status='expirada', data_atualizacao=agora)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Varredura concluída: {concluidas} reserva(s) concluída(s), '
+                f'{expiradas} reserva(s) pendente(s) expirada(s), '
+                f'{chaves_removidas} chave(s) de idempotência removida(s), '
+                f'{remocoes_descartadas} registro(s) de remoção descartado(s), '
+                f'{espera_expirada} entrada(s) da lista de espera expirada(s).'
+            )
+        )
+
+    @staticmethod
+    def _antes_de(momento):
+        """Reservas cuja data/hora (armazenada em UTC) é anterior ao momento informado"""
+        return Q(data_reserva__lt=momento.date()) | Q(
+            data_reserva=momento.date(), horario__lt=momento.time()
+        )
+
+    def _processar_em_lotes(self, queryset, status_destino, tamanho_lote, agora):
+        """
+        Aplica a transição com um UPDATE por lote.
+        Cada lote roda em sua própria transação para limitar o tempo de lock.
+        """
+        total = 0
+
+        while True:
+            with transaction.atomic():
+                lote = list(
+                    queryset.select_for_update(skip_locked=True, of=('self',))
+                    .order_by('id')
+                    .values('id', 'usuario_id', 'restaurante_id', 'data_reserva', 'horario')[:tamanho_lote]
+                )
+                if not lote:
+                    break
+
+                ids = [reserva['id'] for reserva in lote]
+                atualizadas = queryset.filter(id__in=ids).update(
+                    status=status_destino,
+                    data_atualizacao=agora,
+                )
+
+                if status_destino == 'cancelada':
+                    # RN03: Liberar mesas das reservas expiradas
+                    ReservaMesa.objects.filter(reserva_id__in=ids).delete()
+
+                liberar_ocupacao((reserva['restaurante_id'], reserva['data_reserva']) for reserva in lote)
+
+                self._notificar(lote, status_destino)
+                total += atualizadas
+
+        return total
+
+    def _notificar(self, lote, status_destino):
+        """Cria as notificações do lote com um único INSERT"""
+        com_usuario = [reserva for reserva in lote if reserva['usuario_id']]
+        if not com_usuario:
+            return
+
+        nomes = dict(
+            Restaurante.objects.filter(
+                id__in={reserva['restaurante_id'] for reserva in com_usuario}
+            ).values_list('id', 'nome')
+        )
+
+        notificacoes = []
+        for reserva in com_usuario:
+            nome = nomes.get(reserva['restaurante_id'], '')
+            if status_destino == 'concluida':
+                tipo = 'atualizacao'
+                titulo = f'Reserva Concluída - {nome}'
+                mensagem = (
+                    f'Sua reserva em {nome} para {reserva["data_reserva"]} às '
+                    f'{reserva["horario"]} foi marcada como concluída.'
+                )
+            else:
+                tipo = 'cancelamento'
+                titulo = f'Reserva Expirada - {nome}'
+                mensagem = (
+                    f'Sua reserva em {nome} para {reserva["data_reserva"]} às '
+                    f'{reserva["horario"]} expirou sem confirmação do restaurante.'
+                )
+
+            notificacoes.append(Notificacao(
+                usuario_id=reserva['usuario_id'],
+                reserva_id=reserva['id'],
+                tipo=tipo,
+                titulo=titulo,
+                mensagem=mensagem,
+            ))
+
+        Notificacao.objects.bulk_create(notificacoes)
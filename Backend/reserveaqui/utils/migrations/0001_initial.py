@@ -0,0 +1,57 @@
+# Generated by Django 6.0.2 on 2026-10-19 03:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobMorto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.BigIntegerField(verbose_name='ID do Job Original')),
+                ('tarefa', models.CharField(max_length=100, verbose_name='Tarefa')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Parâmetros')),
+                ('tentativas', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('ultimo_erro', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('data_criacao_job', models.DateTimeField(verbose_name='Data de Criação do Job')),
+                ('data_falha', models.DateTimeField(auto_now_add=True, verbose_name='Data da Falha')),
+            ],
+            options={
+                'verbose_name': 'Job Morto',
+                'verbose_name_plural': 'Jobs Mortos',
+                'ordering': ['-data_falha'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tarefa', models.CharField(max_length=100, verbose_name='Tarefa')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Parâmetros')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluido', 'Concluído')], default='pendente', max_length=20, verbose_name='Status')),
+                ('tentativas', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('max_tentativas', models.PositiveIntegerField(default=5, verbose_name='Máximo de Tentativas')),
+                ('executar_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Executar Em')),
+                ('bloqueado_ate', models.DateTimeField(blank=True, help_text='Fim do prazo de execução; após ele o job pode ser reivindicado por outro worker', null=True, verbose_name='Bloqueado Até')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('ultimo_erro', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('data_criacao', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('data_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Data de Início')),
+                ('data_conclusao', models.DateTimeField(blank=True, null=True, verbose_name='Data de Conclusão')),
+            ],
+            options={
+                'verbose_name': 'Job',
+                'verbose_name_plural': 'Jobs',
+                'ordering': ['executar_em', 'id'],
+                'indexes': [models.Index(fields=['status', 'executar_em'], name='utils_job_status_c85db6_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    Tarefa assíncrona persistida no banco de dados.
+    Executada pelo comando `run_worker`, com novas tentativas e backoff exponencial.
+    """
+
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('executando', 'Executando'),
+        ('concluido', 'Concluído'),
+    ]
+
+    tarefa = models.CharField(max_length=100, verbose_name='Tarefa')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Parâmetros')
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pendente',
+        verbose_name='Status'
+    )
+
+    # Controle de execução
+    tentativas = models.PositiveIntegerField(default=0, verbose_name='Tentativas')
+    max_tentativas = models.PositiveIntegerField(default=5, verbose_name='Máximo de Tentativas')
+    executar_em = models.DateTimeField(default=timezone.now, verbose_name='Executar Em')
+    bloqueado_ate = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Bloqueado Até',
+        help_text='Fim do prazo de execução; após ele o job pode ser reivindicado por outro worker'
+    )
+    worker = models.CharField(max_length=100, blank=True, verbose_name='Worker')
+    ultimo_erro = models.TextField(blank=True, verbose_name='Último Erro')
+
+    # Timestamps
+    data_criacao = models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')
+    data_inicio = models.DateTimeField(null=True, blank=True, verbose_name='Data de Início')
+    data_conclusao = models.DateTimeField(null=True, blank=True, verbose_name='Data de Conclusão')
+
+    class Meta:
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        ordering = ['executar_em', 'id']
+        indexes = [
+            models.Index(fields=['status', 'executar_em']),
+        ]
+
+    def __str__(self):
+        return f"{self.tarefa} #{self.id} ({self.get_status_display()})"
+
+
+class JobMorto(models.Model):
+    """
+    Fila de mensagens mortas (dead-letter).
+    Guarda os jobs que esgotaram as tentativas para inspeção e reprocessamento manual.
+    """
+
+    job_id = models.BigIntegerField(verbose_name='ID do Job Original')
+    tarefa = models.CharField(max_length=100, verbose_name='Tarefa')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Parâmetros')
+    tentativas = models.PositiveIntegerField(default=0, verbose_name='Tentativas')
+    ultimo_erro = models.TextField(blank=True, verbose_name='Último Erro')
+
+    # Timestamps
+    data_criacao_job = models.DateTimeField(verbose_name='Data de Criação do Job')
+    data_falha = models.DateTimeField(auto_now_add=True, verbose_name='Data da Falha')
+
+    class Meta:
+        verbose_name = 'Job Morto'
+        verbose_name_plural = 'Jobs Mortos'
+        ordering = ['-data_falha']
+
+    def __str__(self):
+        return f"{self.tarefa} #{self.job_id} (esgotado após {self.tentativas} tentativas)"
@@ -0,0 +1,180 @@
+"""
+Réplica de leitura.
+
+Com DATABASE_REPLICA_URL definida existe o alias de banco 'replica' e o
+RoteadorReplica passa a enviar para ele as leituras feitas dentro de
+`usando_replica()`. Fora desse contexto tudo continua no banco principal, e as
+escritas sempre vão para o principal.
+
+Quem abre o contexto:
+
+- LeituraReplicaMixin (ViewSets): requisições GET/HEAD anônimas
+  (`leitura_anonima_replica`) e as ações de relatório listadas em `acoes_replica`;
+- a tarefa de relatórios assíncronos, ao calcular os dados.
+
+Ler o que acabou de escrever: o FixacaoPrimarioMiddleware marca o usuário que
+fez uma escrita bem-sucedida e, por REPLICA_FIXACAO_SEGUNDOS, as leituras dele
+ficam no principal mesmo nas ações de relatório. A marcação fica no cache
+REPLICA_FIXACAO_CACHE_ALIAS, que precisa ser compartilhado entre os processos.
+
+Para testar localmente com dois arquivos SQLite, copie db.sqlite3 para outro
+arquivo e aponte DATABASE_REPLICA_URL=sqlite:////caminho/replica.sqlite3.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+ALIAS_REPLICA = 'replica'
+
+# Apps cujas tabelas nunca são lidas da réplica (a tabela de cache guarda bloqueios de mesas)
+APPS_SEMPRE_NO_PRIMARIO = {'django_cache'}
+
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+
+_usar_replica = ContextVar('usar_replica', default=False)
+
+
+def _banco(alias):
+    dados = connections[alias].settings_dict
+    return dados['HOST'], dados['PORT'], str(dados['NAME'])
+
+
+def replica_configurada():
+    """
+    Existe uma réplica distinta do principal. Nos testes a réplica espelha o banco
+    padrão (TEST MIRROR), e ler por outra conexão não veria os dados da transação do teste.
+    """
+    return ALIAS_REPLICA in settings.DATABASES and _banco(ALIAS_REPLICA) != _banco('default')
+
+
+@contextmanager
+def usando_replica():
+    """Envia as leituras do bloco para a réplica (quando configurada)"""
+    token = _usar_replica.set(True)
+    try:
+        yield
+    finally:
+        _usar_replica.reset(token)
+
+
+def _chave_fixacao(usuario_id):
+    return f'replica_fixacao:{usuario_id}'
+
+
+def fixar_no_primario(usuario_id):
+    """Mantém as leituras do usuário no banco principal por REPLICA_FIXACAO_SEGUNDOS"""
+    caches[settings.REPLICA_FIXACAO_CACHE_ALIAS].set(
+        _chave_fixacao(usuario_id), True, settings.REPLICA_FIXACAO_SEGUNDOS
+    )
+
+
+def fixado_no_primario(usuario_id):
+    return bool(caches[settings.REPLICA_FIXACAO_CACHE_ALIAS].get(_chave_fixacao(usuario_id)))
+
+
+class RoteadorReplica:
+    """DATABASE_ROUTERS: leituras na réplica apenas dentro de `usando_replica()`"""
+
+    def db_for_read(self, model, **hints):
+        if (
+            _usar_replica.get()
+            and replica_configurada()
+            and model._meta.app_label not in APPS_SEMPRE_NO_PRIMARIO
+        ):
+            return ALIAS_REPLICA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Principal e réplica têm os mesmos dados
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica recebe o schema pela replicação do banco
+        return db != ALIAS_REPLICA
+
+
+class LeituraReplicaMixin:
+    """
+    Mixin de ViewSet que lê da réplica nas requisições seguras elegíveis.
+    A decisão é tomada depois da autenticação e das permissões (que ficam no principal).
+    """
+
+    # Ações lidas da réplica também para usuários autenticados (relatórios)
+    acoes_replica = ()
+    # Leituras de usuários anônimos vão para a réplica
+    leitura_anonima_replica = False
+
+    def _pode_ler_da_replica(self, request):
+        if request.method not in METODOS_SEGUROS or not replica_configurada():
+            return False
+        usuario = request.user
+        if not usuario or not usuario.is_authenticated:
+            return self.leitura_anonima_replica
+        return self.action in self.acoes_replica and not fixado_no_primario(usuario.id)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self._pode_ler_da_replica(request):
+            self._token_replica = _usar_replica.set(True)
+
+    def dispatch(self, request, *args, **kwargs):
+        # finalize_response não é chamado quando a exceção não é tratada pelo DRF
+        self._token_replica = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._token_replica is not None:
+                _usar_replica.reset(self._token_replica)
+                self._token_replica = None
+
+
+class FixacaoPrimarioMiddleware:
+    """
+    Depois de uma escrita bem-sucedida, fixa as leituras do usuário no principal.
+    Funciona nas pilhas síncrona (WSGI) e assíncrona (ASGI).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self._escrita_bem_sucedida(request, response):
+            self._fixar(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self._escrita_bem_sucedida(request, response):
+            # request.user pode consultar a sessão no banco
+            await sync_to_async(self._fixar)(request)
+        return response
+
+    def _escrita_bem_sucedida(self, request, response):
+        return (
+            request.method not in METODOS_SEGUROS
+            and response.status_code < 400
+            and replica_configurada()
+        )
+
+    def _fixar(self, request):
+        # O DRF grava em request.user o usuário autenticado pelo JWT
+        usuario = getattr(request, 'user', None)
+        if usuario is not None and usuario.is_authenticated:
+            fixar_no_primario(usuario.id)
@@ -0,0 +1,434 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.cache.backends.db import BaseDatabaseCache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from django.utils import timezone
+from datetime import timedelta
+from usuarios.models import Papel, Usuario
+from .cache import em_cache, invalidar, obter
+from .coalescencia import Coalescedor
+from .instrumentacao import InstrumentacaoMiddleware
+from .jobs import tarefa, enfileirar, reivindicar, executar
+from .models import Job, JobMorto
+from .replica import FixacaoPrimarioMiddleware, RoteadorReplica, fixado_no_primario, usando_replica
+
+
+@tarefa('testes.soma')
+def _tarefa_soma(a, b):
+    return a + b
+
+
+@tarefa('testes.falha')
+def _tarefa_falha():
+    raise ValueError('falha proposital')
+
+
+class JobQueueTest(TestCase):
+    """Testes para a fila de jobs do banco de dados"""
+
+    def test_enfileirar_tarefa_nao_registrada(self):
+        """Teste que tarefas desconhecidas são rejeitadas"""
+        with self.assertRaises(LookupError):
+            enfileirar('testes.inexistente')
+
+    def test_reivindicar_e_executar(self):
+        """Teste do ciclo completo de um job bem-sucedido"""
+        job = enfileirar('testes.soma', {'a': 1, 'b': 2})
+
+        reivindicados = reivindicar('worker-1')
+        self.assertEqual([j.id for j in reivindicados], [job.id])
+
+        # Job já reivindicado não é entregue a outro worker
+        self.assertEqual(reivindicar('worker-2'), [])
+
+        self.assertTrue(executar(reivindicados[0]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'concluido')
+        self.assertEqual(job.tentativas, 1)
+
+    def test_job_agendado_no_futuro_nao_e_reivindicado(self):
+        """Teste que executar_em no futuro adia o job"""
+        enfileirar('testes.soma', {'a': 1, 'b': 2}, atraso_segundos=60)
+        self.assertEqual(reivindicar('worker-1'), [])
+
+    def test_falha_reagenda_com_backoff(self):
+        """Teste que uma falha devolve o job para a fila com atraso"""
+        job = enfileirar('testes.falha', max_tentativas=3)
+
+        self.assertFalse(executar(reivindicar('worker-1')[0]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pendente')
+        self.assertGreater(job.executar_em, timezone.now())
+        self.assertIn('falha proposital', job.ultimo_erro)
+
+    def test_job_esgotado_vai_para_fila_morta(self):
+        """Teste que o job vai para JobMorto ao esgotar as tentativas"""
+        job = enfileirar('testes.falha', max_tentativas=1)
+
+        executar(reivindicar('worker-1')[0])
+
+        self.assertFalse(Job.objects.filter(id=job.id).exists())
+        morto = JobMorto.objects.get(job_id=job.id)
+        self.assertEqual(morto.tarefa, 'testes.falha')
+        self.assertEqual(morto.tentativas, 1)
+
+    def test_job_com_prazo_expirado_e_reivindicado_novamente(self):
+        """Teste que jobs de workers mortos voltam a ser executados"""
+        job = enfileirar('testes.soma', {'a': 1, 'b': 2})
+        reivindicar('worker-morto')
+        Job.objects.filter(id=job.id).update(bloqueado_ate=timezone.now() - timedelta(seconds=1))
+
+        reivindicados = reivindicar('worker-1')
+        self.assertEqual(reivindicados[0].worker, 'worker-1')
+        self.assertEqual(reivindicados[0].tentativas, 2)
+
+    @override_settings(JOBS_EXECUTAR_SINCRONO=True)
+    def test_tarefa_enviar_senha_generica(self):
+        """Teste que o job de email define a senha temporária e envia o email"""
+        usuario = Usuario.objects.create_user(
+            email='funcionario@test.com',
+            nome='Funcionário',
+            username='func_test',
+            password=None
+        )
+
+        job = enfileirar('usuarios.enviar_senha_generica', {
+            'usuario_id': usuario.id,
+            'tipo_usuario': 'Funcionário',
+        })
+
+        self.assertEqual(job.status, 'concluido')
+        usuario.refresh_from_db()
+        self.assertTrue(usuario.has_usable_password())
+        self.assertTrue(usuario.precisa_trocar_senha)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+
+class ReplicaLeituraTest(TestCase):
+    """Testes para o roteamento de leituras para a réplica"""
+
+    def setUp(self):
+        caches[settings.REPLICA_FIXACAO_CACHE_ALIAS].clear()
+        self.usuario = Usuario.objects.create_user(
+            email='replica@teste.com', username='replica', password='senha123', nome='Réplica'
+        )
+        self.roteador = RoteadorReplica()
+
+    def test_roteador_so_usa_replica_no_contexto(self):
+        """Teste que as leituras só vão para a réplica dentro de usando_replica()"""
+        # Sem réplica configurada tudo fica no principal
+        with usando_replica():
+            self.assertEqual(self.roteador.db_for_read(Job), 'default')
+
+        with mock.patch('utils.replica.replica_configurada', return_value=True):
+            self.assertEqual(self.roteador.db_for_read(Job), 'default')
+            with usando_replica():
+                self.assertEqual(self.roteador.db_for_read(Job), 'replica')
+                self.assertEqual(self.roteador.db_for_write(Job), 'default')
+                # A tabela de cache (bloqueios de mesas) nunca é lida da réplica
+                cache_entry = BaseDatabaseCache('reserveaqui_cache_bloqueios', {}).cache_model_class
+                self.assertEqual(self.roteador.db_for_read(cache_entry), 'default')
+            self.assertEqual(self.roteador.db_for_read(Job), 'default')
+
+        self.assertFalse(self.roteador.allow_migrate('replica', 'reservas'))
+        self.assertTrue(self.roteador.allow_migrate('default', 'reservas'))
+
+    def test_escrita_fixa_usuario_no_primario(self):
+        """Teste que uma escrita bem-sucedida mantém as leituras do usuário no principal"""
+        from reservas.views import ReservaViewSet
+        fabrica = RequestFactory()
+
+        def requisicao(metodo, usuario):
+            request = getattr(fabrica, metodo)('/api/reservas/')
+            request.user = usuario
+            return request
+
+        view = ReservaViewSet()
+        view.action = 'ocupacao'
+        with mock.patch('utils.replica.replica_configurada', return_value=True):
+            self.assertTrue(view._pode_ler_da_replica(requisicao('get', self.usuario)))
+
+            # Escrita com erro não fixa
+            FixacaoPrimarioMiddleware(lambda r: HttpResponse(status=400))(requisicao('post', self.usuario))
+            self.assertFalse(fixado_no_primario(self.usuario.id))
+
+            FixacaoPrimarioMiddleware(lambda r: HttpResponse(status=201))(requisicao('post', self.usuario))
+            self.assertTrue(fixado_no_primario(self.usuario.id))
+            self.assertFalse(view._pode_ler_da_replica(requisicao('get', self.usuario)))
+
+            # Ações fora dos relatórios continuam no principal para usuários autenticados
+            caches[settings.REPLICA_FIXACAO_CACHE_ALIAS].clear()
+            view.action = 'list'
+            self.assertFalse(view._pode_ler_da_replica(requisicao('get', self.usuario)))
+            self.assertFalse(view._pode_ler_da_replica(requisicao('get', AnonymousUser())))
+
+        # Leituras anônimas de restaurantes vão para a réplica
+        from restaurantes.views import RestauranteViewSet
+        view = RestauranteViewSet()
+        view.action = 'list'
+        self.assertFalse(view._pode_ler_da_replica(requisicao('get', AnonymousUser())))
+        with mock.patch('utils.replica.replica_configurada', return_value=True):
+            self.assertTrue(view._pode_ler_da_replica(requisicao('get', AnonymousUser())))
+            self.assertFalse(view._pode_ler_da_replica(requisicao('post', AnonymousUser())))
+
+
+class VerificarWorkerDeJobsTest(TestCase):
+    """Testes para o check de deploy da fila de jobs (utils.E001)"""
+
+    def test_fila_sem_worker_falha_no_deploy(self):
+        """Teste que o check acusa a fila sem worker e aceita worker declarado ou modo síncrono"""
+        from .checks import verificar_worker_de_jobs
+
+        with override_settings(JOBS_EXECUTAR_SINCRONO=False, JOBS_WORKER_ATIVO=False):
+            self.assertEqual([erro.id for erro in verificar_worker_de_jobs(None)], ['utils.E001'])
+        with override_settings(JOBS_EXECUTAR_SINCRONO=False, JOBS_WORKER_ATIVO=True):
+            self.assertEqual(verificar_worker_de_jobs(None), [])
+        with override_settings(JOBS_EXECUTAR_SINCRONO=True, JOBS_WORKER_ATIVO=False):
+            self.assertEqual(verificar_worker_de_jobs(None), [])
+
+
+class MetricasBancoApiTest(TestCase):
+    """Testes para GET /api/metricas/banco/"""
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            email='metricas@teste.com', username='metricas', password='senha123', nome='Métricas'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_apenas_admin_sistema(self):
+        """Teste que só o admin_sistema consulta as métricas do banco"""
+        response = self.client.get('/api/metricas/banco/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_estado_das_conexoes(self):
+        """Teste que o estado de cada banco é informado (sem pool no SQLite)"""
+        papel, _ = Papel.objects.get_or_create(tipo='admin_sistema')
+        self.usuario.papeis.add(papel)
+
+        response = self.client.get('/api/metricas/banco/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('pid', response.data)
+        banco = response.data['bancos']['default']
+        self.assertEqual(banco['vendor'], connection.vendor)
+        self.assertEqual(banco['pool'], connection.settings_dict['OPTIONS'].get('pool') is not None)
+        if not banco['pool']:
+            self.assertIsNone(banco['estatisticas'])
+
+
+@override_settings(CACHES={
+    # O algoritmo é testado com threads; a tabela de cache no SQLite dos testes não aceita escritas concorrentes
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'bloqueios': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bloqueios-teste'},
+    'compartilhado': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'compartilhado-teste'},
+})
+class CacheAplicacaoTest(TestCase):
+    """Testes para o cache da aplicação em dois níveis (utils.cache)"""
+
+    def setUp(self):
+        caches[settings.CACHE_L1_ALIAS].clear()
+        caches[settings.CACHE_COMPARTILHADO_ALIAS].clear()
+        self.chamadas = []
+
+    def _calcular(self, valor='valor', espera=0):
+        def calcular():
+            self.chamadas.append(valor)
+            time.sleep(espera)
+            return valor
+        return calcular
+
+    def test_calcula_uma_vez_e_invalida(self):
+        """Teste que o valor é guardado até a invalidação do namespace"""
+        self.assertEqual(obter('testes', 'chave', self._calcular('a')), 'a')
+        self.assertEqual(obter('testes', 'chave', self._calcular('b')), 'a')
+        # Outro processo: só o L2 compartilhado tem o valor
+        caches[settings.CACHE_L1_ALIAS].clear()
+        self.assertEqual(obter('testes', 'chave', self._calcular('b')), 'a')
+
+        invalidar('testes')
+        self.assertEqual(obter('testes', 'chave', self._calcular('c')), 'c')
+        self.assertEqual(self.chamadas, ['a', 'c'])
+
+    def test_recomputacao_unica(self):
+        """Teste que requisições simultâneas pela mesma chave calculam o valor uma só vez"""
+        resultados = []
+        threads = [
+            threading.Thread(target=lambda: resultados.append(obter('testes', 'quente', self._calcular(espera=0.2))))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(resultados, ['valor'] * 5)
+        self.assertEqual(len(self.chamadas), 1)
+
+    def test_decorator_sincrono_e_assincrono(self):
+        """Teste que em_cache guarda por argumentos, com namespace por argumento"""
+        @em_cache(lambda restaurante_id, data: f'testes:{restaurante_id}')
+        def contar(restaurante_id, data):
+            self.chamadas.append((restaurante_id, data))
+            return len(self.chamadas)
+
+        @em_cache('testes:assincrono')
+        async def acontar(valor):
+            self.chamadas.append(valor)
+            return valor * 2
+
+        self.assertEqual(contar(1, 'hoje'), 1)
+        self.assertEqual(contar(1, 'hoje'), 1)
+        self.assertEqual(contar(2, 'hoje'), 2)
+        invalidar('testes:1')
+        self.assertEqual(contar(1, 'hoje'), 3)
+        self.assertEqual(contar(2, 'hoje'), 2)
+
+        self.assertEqual(async_to_sync(acontar)(21), 42)
+        self.assertEqual(async_to_sync(acontar)(21), 42)
+        self.assertEqual(self.chamadas.count(21), 1)
+
+
+class CoalescenciaTest(TestCase):
+    """Testes para a coalescência de requisições idênticas (utils.coalescencia)"""
+
+    def setUp(self):
+        self.chamadas = []
+
+    def _calcular(self, valor='valor', espera=0):
+        def calcular():
+            self.chamadas.append(valor)
+            time.sleep(espera)
+            return valor
+        return calcular
+
+    def test_requisicoes_simultaneas_compartilham_o_calculo(self):
+        """Teste que threads com a mesma chave esperam o cálculo da primeira"""
+        coalescedor = Coalescedor(ttl=0)
+        resultados = []
+        threads = [
+            threading.Thread(target=lambda: resultados.append(
+                coalescedor.executar((1, 'hoje'), self._calcular(espera=0.2))
+            ))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(resultados, ['valor'] * 5)
+        self.assertEqual(len(self.chamadas), 1)
+        # Sem micro-TTL, a próxima requisição recalcula
+        coalescedor.executar((1, 'hoje'), self._calcular('novo'))
+        self.assertEqual(self.chamadas, ['valor', 'novo'])
+
+    def test_micro_ttl_e_invalidacao_por_prefixo(self):
+        """Teste que o resultado é reaproveitado até a invalidação das chaves do prefixo"""
+        coalescedor = Coalescedor(ttl=60)
+        coalescedor.executar((1, 'hoje', '19:00'), self._calcular('a'))
+        coalescedor.executar((2, 'hoje', '19:00'), self._calcular('b'))
+        self.assertEqual(coalescedor.executar((1, 'hoje', '19:00'), self._calcular('c')), 'a')
+
+        coalescedor.invalidar(1, 'hoje')
+        self.assertEqual(coalescedor.executar((1, 'hoje', '19:00'), self._calcular('c')), 'c')
+        self.assertEqual(coalescedor.executar((2, 'hoje', '19:00'), self._calcular('d')), 'b')
+
+    def test_tarefas_assincronas_compartilham_o_calculo(self):
+        """Teste que tarefas simultâneas do event loop compartilham o cálculo e os erros"""
+        coalescedor = Coalescedor(ttl=0)
+
+        async def calcular():
+            self.chamadas.append('async')
+            await asyncio.sleep(0.1)
+            return 42
+
+        async def falhar():
+            self.chamadas.append('falha')
+            await asyncio.sleep(0.1)
+            raise ValueError('falha')
+
+        async def cenario():
+            resultados = await asyncio.gather(*[coalescedor.aexecutar(('k',), calcular) for _ in range(5)])
+            erros = await asyncio.gather(
+                *[coalescedor.aexecutar(('k',), falhar) for _ in range(3)], return_exceptions=True
+            )
+            return resultados, erros
+
+        resultados, erros = async_to_sync(cenario)()
+        self.assertEqual(resultados, [42] * 5)
+        self.assertTrue(all(isinstance(erro, ValueError) for erro in erros))
+        self.assertEqual(self.chamadas, ['async', 'falha'])
+
+
+class InstrumentacaoMiddlewareTest(TestCase):
+    """Testes para o Server-Timing e o log das requisições amostradas"""
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            email='instrumentacao@teste.com', username='instrumentacao', password='senha123', nome='Instr'
+        )
+        papel, _ = Papel.objects.get_or_create(tipo='admin_sistema')
+        self.usuario.papeis.add(papel)
+
+    def _cliente(self):
+        # O cliente monta a pilha de middlewares com as configurações do momento
+        cliente = APIClient()
+        cliente.force_authenticate(self.usuario)
+        return cliente
+
+    @override_settings(INSTRUMENTACAO_AMOSTRAGEM=1)
+    def test_requisicao_amostrada(self):
+        """Teste que consultas, banco, view, serialização e total vão no cabeçalho e no log"""
+        cliente = self._cliente()
+        with self.assertLogs('reserveaqui.instrumentacao', 'INFO') as logs:
+            with CaptureQueriesContext(connection) as consultas:
+                response = cliente.get('/api/metricas/banco/')
+
+        self.assertEqual(response.status_code, 200)
+        cabecalho = response['Server-Timing']
+        self.assertIn(f'desc="{len(consultas)} consultas"', cabecalho)
+        for nome in ('banco;dur=', 'view;dur=', 'serializacao;dur=', 'total;dur='):
+            self.assertIn(nome, cabecalho)
+
+        dados = logs.records[0].instrumentacao
+        self.assertEqual(dados['rota'], 'api/metricas/banco/')
+        self.assertEqual(dados['consultas'], len(consultas))
+        self.assertGreaterEqual(dados['total_ms'], dados['view_ms'])
+        self.assertIn('metodo=GET rota=api/metricas/banco/ status=200', logs.output[0])
+
+    @override_settings(INSTRUMENTACAO_AMOSTRAGEM=1)
+    async def test_requisicao_amostrada_assincrona(self):
+        """Teste que as consultas das views assíncronas (ASGI) também são medidas"""
+        with self.assertLogs('reserveaqui.instrumentacao', 'INFO') as logs:
+            response = await AsyncClient().get('/api/restaurantes/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('total;dur=', response['Server-Timing'])
+        self.assertGreater(logs.records[0].instrumentacao['consultas'], 0)
+
+    @override_settings(INSTRUMENTACAO_AMOSTRAGEM=0.1)
+    def test_requisicao_fora_da_amostra(self):
+        """Teste que requisições não sorteadas não recebem o cabeçalho"""
+        with mock.patch('utils.instrumentacao.random.random', return_value=0.5):
+            response = self._cliente().get('/api/metricas/banco/')
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(INSTRUMENTACAO_AMOSTRAGEM=0)
+    def test_amostragem_zero_remove_o_middleware(self):
+        """Teste que com amostragem 0 o middleware sai da pilha"""
+        with self.assertRaises(MiddlewareNotUsed):
+            InstrumentacaoMiddleware(lambda request: HttpResponse())
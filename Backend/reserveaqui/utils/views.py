@@ -0,0 +1,37 @@
+import os
+
+from django.db import connections
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from restaurantes.permissions import IsAdminSystemOnly
+
+
+def estado_das_conexoes():
+    """
+    Estado das conexões de cada banco configurado neste processo. Com o pool do
+    psycopg 3 inclui as estatísticas do pool (get_stats); sem pool, o CONN_MAX_AGE.
+    """
+    bancos = {}
+    for alias in connections:
+        conexao = connections[alias]
+        pool = getattr(conexao, 'pool', None)
+        bancos[alias] = {
+            'vendor': conexao.vendor,
+            'pool': pool is not None,
+            'conn_max_age': conexao.settings_dict['CONN_MAX_AGE'],
+            'estatisticas': pool.get_stats() if pool is not None else None,
+        }
+    return bancos
+
+
+class MetricasBancoView(APIView):
+    """
+    GET /api/metricas/banco/ - Saúde do pool de conexões (apenas admin_sistema).
+    Os pools são por processo: o pid indica qual worker respondeu.
+    """
+
+    permission_classes = [IsAdminSystemOnly]
+
+    def get(self, request):
+        return Response({'pid': os.getpid(), 'bancos': estado_das_conexoes()})